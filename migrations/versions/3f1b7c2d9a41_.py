@@ -0,0 +1,28 @@
+"""event range indexes
+
+Revision ID: 3f1b7c2d9a41
+Revises: 946b6a10bf3c
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1b7c2d9a41'
+down_revision = '946b6a10bf3c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.create_index('ix_event_user_start', ['user_id', 'start_date'], unique=False)
+        batch_op.create_index('ix_event_user_end', ['user_id', 'end_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_user_end')
+        batch_op.drop_index('ix_event_user_start')
@@ -0,0 +1,40 @@
+"""recurrence rules on event and task
+
+Revision ID: 5a9e0c4b7f12
+Revises: d82c7703a10d
+Create Date: 2026-10-18 12:26:09.830415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a9e0c4b7f12'
+down_revision = 'd82c7703a10d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('recurrence_rule', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('recurrence_exdates', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('recurrence_end', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_event_user_recurrence', ['user_id', 'recurrence_rule'], unique=False)
+
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('recurrence_rule', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('recurrence_exdates', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_column('recurrence_exdates')
+        batch_op.drop_column('recurrence_rule')
+
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_user_recurrence')
+        batch_op.drop_column('recurrence_end')
+        batch_op.drop_column('recurrence_exdates')
+        batch_op.drop_column('recurrence_rule')
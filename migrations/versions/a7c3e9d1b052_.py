@@ -0,0 +1,53 @@
+"""event.long_span: events longer than MAX_EVENT_SPAN stored before the limit
+
+Revision ID: a7c3e9d1b052
+Revises: f3b8d2c6a715
+Create Date: 2026-10-18 19:41:07.203518
+
+"""
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e9d1b052'
+down_revision = 'f3b8d2c6a715'
+branch_labels = None
+depends_on = None
+
+# routesEvent.MAX_EVENT_SPAN en el momento de esta migración
+MAX_EVENT_SPAN = timedelta(days=92)
+CHUNK = 500
+
+event = sa.table(
+    'event',
+    sa.column('id', sa.Integer),
+    sa.column('start_date', sa.DateTime),
+    sa.column('end_date', sa.DateTime),
+    sa.column('long_span', sa.Boolean),
+)
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('long_span', sa.Boolean(), nullable=False,
+                                      server_default=sa.false()))
+        batch_op.create_index('ix_event_user_long_span', ['user_id', 'start_date'], unique=False,
+                              sqlite_where=sa.text('long_span = 1'),
+                              postgresql_where=sa.text('long_span'))
+
+    # La resta de fechas no es portable entre SQLite y Postgres: se calcula aquí
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(event.c.id, event.c.start_date, event.c.end_date))
+    long_ids = [row.id for row in rows if row.end_date - row.start_date > MAX_EVENT_SPAN]
+    for i in range(0, len(long_ids), CHUNK):
+        conn.execute(sa.update(event).where(event.c.id.in_(long_ids[i:i + CHUNK]))
+                     .values(long_span=True))
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_user_long_span')
+        batch_op.drop_column('long_span')
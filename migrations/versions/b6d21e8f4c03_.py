@@ -0,0 +1,55 @@
+"""change log and updated_at for delta sync
+
+Revision ID: b6d21e8f4c03
+Revises: 5a9e0c4b7f12
+Create Date: 2026-10-18 13:02:44.518207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d21e8f4c03'
+down_revision = '5a9e0c4b7f12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_log',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.create_index('ix_change_log_user_seq', ['user_id', 'seq'], unique=False)
+        batch_op.create_index('ix_change_log_entity', ['user_id', 'entity', 'entity_id'], unique=False)
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sync_seq', sa.Integer(), server_default='0', nullable=False))
+
+    for table in ('event', 'task', 'task_group', 'calendar'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    for table in ('calendar', 'task_group', 'task', 'event'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('sync_seq')
+
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_change_log_entity')
+        batch_op.drop_index('ix_change_log_user_seq')
+
+    op.drop_table('change_log')
@@ -0,0 +1,29 @@
+"""partial index on recurring series by recurrence_end
+
+Revision ID: b8d4f0e2c163
+Revises: a7c3e9d1b052
+Create Date: 2026-10-18 20:12:55.871046
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d4f0e2c163'
+down_revision = 'a7c3e9d1b052'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.create_index('ix_event_user_recurrence_end', ['user_id', 'recurrence_end'],
+                              unique=False,
+                              sqlite_where=sa.text('recurrence_rule IS NOT NULL'),
+                              postgresql_where=sa.text('recurrence_rule IS NOT NULL'))
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_user_recurrence_end')
@@ -0,0 +1,30 @@
+"""per-user data versions for conditional GET
+
+Revision ID: c4e8a2f61d95
+Revises: b6d21e8f4c03
+Create Date: 2026-10-18 13:41:07.203961
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a2f61d95'
+down_revision = 'b6d21e8f4c03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('data_version',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('resource', sa.String(length=20), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'resource')
+    )
+
+
+def downgrade():
+    op.drop_table('data_version')
@@ -0,0 +1,29 @@
+"""event.ical_uid: UID of imported VEVENTs
+
+Revision ID: c5e1a8f3d276
+Revises: b8d4f0e2c163
+Create Date: 2026-10-18 21:03:18.550917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e1a8f3d276'
+down_revision = 'b8d4f0e2c163'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ical_uid', sa.String(length=255), nullable=True))
+        batch_op.create_index('ix_event_calendar_ical_uid', ['calendar_id', 'ical_uid'],
+                              unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_calendar_ical_uid')
+        batch_op.drop_column('ical_uid')
@@ -0,0 +1,43 @@
+"""ON DELETE CASCADE on user and task_group foreign keys
+
+Revision ID: d1f7b3a9e024
+Revises: c4e8a2f61d95
+Create Date: 2026-10-18 16:02:44.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1f7b3a9e024'
+down_revision = 'c4e8a2f61d95'
+branch_labels = None
+depends_on = None
+
+# (tabla, columna, tabla referenciada); event.calendar_id ya es CASCADE (c9f9a13ed10b)
+FOREIGN_KEYS = (
+    ('event', 'user_id', 'user'),
+    ('task', 'user_id', 'user'),
+    ('task', 'task_group_id', 'task_group'),
+    ('task_group', 'user_id', 'user'),
+    ('calendar', 'user_id', 'user'),
+    ('change_log', 'user_id', 'user'),
+    ('data_version', 'user_id', 'user'),
+)
+
+
+def _recreate(ondelete):
+    for table, column, referent in FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(name, referent, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _recreate('CASCADE')
+
+
+def downgrade():
+    _recreate(None)
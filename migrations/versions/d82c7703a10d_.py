@@ -0,0 +1,26 @@
+"""task keyset index
+
+Revision ID: d82c7703a10d
+Revises: 3f1b7c2d9a41
+Create Date: 2026-10-18 11:03:47.551902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd82c7703a10d'
+down_revision = '3f1b7c2d9a41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.create_index('ix_task_user_date', ['user_id', 'date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_user_date')
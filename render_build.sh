@@ -7,4 +7,10 @@ npm run build
 pip install pipenv
 pipenv install
 
+# Variantes .gz/.br de dist/ para servirlas precomprimidas
+pipenv run compress-static
+
 pipenv run upgrade
+
+# El camino rápido de los listados (api/rowserialize.py) debe dar el mismo JSON que serialize()
+pipenv run verify-row-serializers
@@ -0,0 +1,165 @@
+"""
+Servidor de ficheros estáticos del build de Vite (dist/).
+Al arrancar se recorre dist/ una vez y se guarda un manifiesto en memoria
+(ruta → tamaño, tipo, ETag y variantes precomprimidas), así que servir un fichero
+no cuesta ningún stat ni os.path.isfile.
+- assets/ con hash en el nombre (index-BfT3k9aZ.js): Cache-Control immutable, 1 año
+- index.html: no-cache (siempre se revalida; apunta a los bundles de la versión actual)
+- el resto (favicon, robots.txt...): max-age corto + ETag
+Si existe <fichero>.br o <fichero>.gz se sirve según Accept-Encoding (Vary: Accept-Encoding).
+Las variantes se generan tras `npm run build` con `flask compress-static`.
+Los cambios en dist/ no se ven hasta reiniciar el proceso (o llamar a AssetManifest.build()).
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import Response, request
+from werkzeug.wsgi import wrap_file
+
+try:
+    import brotli
+except ImportError:  # opcional: sin él solo se generan/sirven .gz
+    brotli = None
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+DEFAULT_MAX_AGE = 3600
+INDEX = "index.html"
+# Vite añade un hash de 8+ caracteres (base64url) antes de la extensión
+HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+COMPRESSIBLE = re.compile(r"\.(js|mjs|css|html|svg|json|map|txt|xml|ico|wasm)$")
+MIN_COMPRESS_SIZE = 1024
+# (Content-Encoding, extensión) por orden de preferencia
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class Asset:
+    __slots__ = ("path", "size", "etag", "mimetype", "cache_control", "variants")
+
+    def __init__(self, path: str, size: int, etag: str, mimetype: str, cache_control: str):
+        self.path = path
+        self.size = size
+        self.etag = etag
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.variants = {}   # encoding → (path, size)
+
+
+def _digest(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()[:20]
+
+
+def _cache_control(name: str) -> str:
+    if name == INDEX:
+        return "no-cache"
+    if name.startswith("assets/") and HASHED_NAME.search(name):
+        return f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return f"public, max-age={DEFAULT_MAX_AGE}"
+
+
+class AssetManifest:
+    def __init__(self, root: str):
+        self.root = os.path.realpath(root)
+        self.assets = {}
+        self.build()
+
+    def build(self) -> None:
+        assets = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if name.endswith((".br", ".gz")) and os.path.isfile(path[:-3]):
+                    continue   # variante: se asocia a su original más abajo
+                mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                asset = Asset(path, os.path.getsize(path), _digest(path), mimetype,
+                              _cache_control(name))
+                for encoding, ext in ENCODINGS:
+                    if os.path.isfile(path + ext):
+                        asset.variants[encoding] = (path + ext, os.path.getsize(path + ext))
+                assets[name] = asset
+        self.assets = assets
+
+    def _negotiate(self, asset: Asset):
+        if not asset.variants:
+            return None
+        accepted = request.accept_encodings
+        for encoding, _ in ENCODINGS:
+            if encoding in asset.variants and accepted[encoding] > 0:
+                return encoding
+        return None
+
+    def response(self, name: str) -> Response:
+        """
+        Respuesta para `name`; si no existe se devuelve index.html (rutas del SPA),
+        salvo bajo assets/, donde un bundle que falta es un 404 y no HTML.
+        """
+        asset = self.assets.get(name)
+        if asset is None:
+            if name.startswith("assets/") or INDEX not in self.assets:
+                return Response("Not Found", status=404, mimetype="text/plain")
+            asset = self.assets[INDEX]
+
+        encoding = self._negotiate(asset)
+        path, size = asset.variants[encoding] if encoding else (asset.path, asset.size)
+        etag = f"{asset.etag}-{encoding}" if encoding else asset.etag
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            f = open(path, "rb")
+            response = Response(wrap_file(request.environ, f), mimetype=asset.mimetype,
+                                direct_passthrough=True)
+            response.content_length = size
+            if encoding:
+                response.content_encoding = encoding
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = asset.cache_control
+        if asset.variants:
+            response.vary.add("Accept-Encoding")
+        return response
+
+
+def compress_directory(root: str, force: bool = False) -> list:
+    """
+    Escribe <fichero>.gz (y .br si está instalado brotli) junto a cada fichero comprimible
+    de más de MIN_COMPRESS_SIZE bytes. Solo guarda la variante si ocupa menos que el original.
+    Devuelve [(ruta, tamaño original, {encoding: tamaño})].
+    """
+    written = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if not COMPRESSIBLE.search(filename):
+                continue
+            size = os.path.getsize(path)
+            if size < MIN_COMPRESS_SIZE:
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            sizes = {}
+            for encoding, ext in ENCODINGS:
+                target = path + ext
+                if not force and os.path.isfile(target) \
+                        and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                if encoding == "br":
+                    if brotli is None:
+                        continue
+                    compressed = brotli.compress(data, quality=11)
+                else:
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(compressed) >= size:
+                    continue
+                with open(target, "wb") as f:
+                    f.write(compressed)
+                sizes[encoding] = len(compressed)
+            if sizes:
+                written.append((path, size, sizes))
+    return written
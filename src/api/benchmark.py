@@ -0,0 +1,387 @@
+"""
+Benchmark de endpoints (`flask benchmark`) con comparación contra una línea base.
+Para cada tamaño de dataset (número de usuarios):
+- crea una app aislada (mismos blueprints que la real, ver querybudget._budget_app)
+  sobre un SQLite temporal en disco, o sobre --database-url si se indica
+- la siembra con seed.seed_database() (misma semilla → mismos datos)
+- lanza cada escenario de SCENARIOS con el test client, con usuarios al azar,
+  y mide p50/p95/media por petición y peticiones por segundo
+Las mutaciones se encadenan (crear → actualizar → borrar) para que el tamaño del
+dataset no cambie entre escenarios. El tiempo incluye el test client de werkzeug
+pero no la red ni gunicorn: sirve para comparar versiones en la misma máquina.
+
+compare() marca una regresión cuando p50/p95 crecen más de `threshold` (relativo)
+y más de MIN_DELTA_MS (absoluto, para no saltar por ruido en endpoints de 1 ms),
+o cuando las peticiones por segundo caen más de `threshold`.
+"""
+import math
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, inspect, select
+
+from .models import db, User, Calendar
+from .seed import seed_database
+
+MIN_DELTA_MS = 1.0
+DEFAULT_THRESHOLD = 0.25
+WARMUP = 5
+PASSWORD = "benchmark"
+
+
+class _Context:
+    """Datos sembrados que necesitan los escenarios y lo creado por las mutaciones."""
+
+    def __init__(self, users: list, calendars: dict, now: datetime):
+        self.users = users            # [(id, email)]
+        self.calendars = calendars    # user_id → calendar_id
+        self.now = now
+        self.created = {"event": [], "task": []}   # [(user_id, id)]
+        self._headers = {}
+
+    def headers(self, user_id: int) -> dict:
+        from .routes import create_token
+
+        if user_id not in self._headers:
+            token = create_token({"user_id": user_id})
+            self._headers[user_id] = {"Authorization": "Bearer " + token}
+        return self._headers[user_id]
+
+
+# ---------- Escenarios ----------
+# Cada uno devuelve (método, ruta, body, user_id) para una petición al azar, o None
+# si no hay con qué hacerla (p. ej. actualizar cuando no se creó ningún evento).
+
+def _window(ctx, rng, days: int) -> str:
+    start = (ctx.now + timedelta(days=rng.randint(-180, 180))).date()
+    return f"start={start.isoformat()}&end={(start + timedelta(days=days)).isoformat()}"
+
+
+def _login(ctx, rng):
+    user_id, email = rng.choice(ctx.users)
+    return "POST", "/api/login", {"email": email, "password": PASSWORD}, None
+
+
+def _events_week(ctx, rng):
+    user_id = rng.choice(ctx.users)[0]
+    return "GET", f"/api/events?{_window(ctx, rng, 7)}", None, user_id
+
+
+def _events_month(ctx, rng):
+    user_id = rng.choice(ctx.users)[0]
+    return "GET", f"/api/events?{_window(ctx, rng, 31)}", None, user_id
+
+
+def _task_groups(ctx, rng):
+    return "GET", "/api/task-groups", None, rng.choice(ctx.users)[0]
+
+
+def _user_groups(ctx, rng):
+    user_id = rng.choice(ctx.users)[0]
+    return "GET", f"/api/users/{user_id}/groups", None, user_id
+
+
+def _create_event(ctx, rng):
+    user_id = rng.choice(list(ctx.calendars))
+    start = (ctx.now + timedelta(days=rng.randint(-30, 30))).replace(hour=rng.randint(8, 18))
+    body = {"title": "Benchmark", "calendar_id": ctx.calendars[user_id],
+            "start_date": start.isoformat(timespec="minutes"),
+            "end_date": (start + timedelta(hours=1)).isoformat(timespec="minutes")}
+    return "POST", "/api/events", body, user_id
+
+
+def _update_event(ctx, rng):
+    if not ctx.created["event"]:
+        return None
+    user_id, event_id = rng.choice(ctx.created["event"])
+    return "PUT", f"/api/events/{event_id}", {"title": f"Benchmark {rng.randint(1, 999)}"}, user_id
+
+
+def _delete_event(ctx, rng):
+    if not ctx.created["event"]:
+        return None
+    user_id, event_id = ctx.created["event"].pop()
+    return "DELETE", f"/api/events/{event_id}", None, user_id
+
+
+def _create_task(ctx, rng):
+    user_id = rng.choice(ctx.users)[0]
+    body = {"title": "Benchmark", "status": False, "recurrencia": 0, "color": "#000000"}
+    return "POST", f"/api/users/{user_id}/tasks", body, user_id
+
+
+def _update_task(ctx, rng):
+    if not ctx.created["task"]:
+        return None
+    user_id, task_id = rng.choice(ctx.created["task"])
+    return "PUT", f"/api/users/{user_id}/tasks/{task_id}", {"status": True}, user_id
+
+
+def _delete_task(ctx, rng):
+    if not ctx.created["task"]:
+        return None
+    user_id, task_id = ctx.created["task"].pop()
+    return "DELETE", f"/api/users/{user_id}/tasks/{task_id}", None, user_id
+
+
+# (nombre, generador, entidad creada o None, fracción de --requests)
+# login es caro a propósito (hash de la contraseña), por eso lleva menos peticiones.
+SCENARIOS = [
+    ("login", _login, None, 0.2),
+    ("list_events_week", _events_week, None, 1.0),
+    ("list_events_month", _events_month, None, 1.0),
+    ("list_task_groups", _task_groups, None, 1.0),
+    ("get_user_groups", _user_groups, None, 1.0),
+    ("create_event", _create_event, "event", 0.5),
+    ("update_event", _update_event, None, 0.5),
+    ("delete_event", _delete_event, None, 0.5),
+    ("create_task", _create_task, "task", 0.5),
+    ("update_task", _update_task, None, 0.5),
+    ("delete_task", _delete_task, None, 0.5),
+]
+
+
+# ---------- Ejecución ----------
+
+def _percentile(sorted_samples: list, p: float) -> float:
+    """Percentil por rango más cercano."""
+    rank = max(1, math.ceil(p * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+
+def _summary(samples: list, elapsed: float, errors: int) -> dict:
+    if not samples:
+        # Ninguna petición lanzada: sin tiempos que medir ni comparar
+        return {"requests": 0, "errors": errors, "p50_ms": None, "p95_ms": None,
+                "mean_ms": None, "rps": 0.0}
+    ordered = sorted(samples)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def _run_scenario(client, ctx, rng, build, creates, count: int) -> dict:
+    samples, errors = [], 0
+    started = time.perf_counter()
+    for i in range(WARMUP + count):
+        spec = build(ctx, rng)
+        if spec is None:
+            # Sin filas creadas (falló el escenario de creación): cuenta como error
+            if i >= WARMUP:
+                errors += 1
+            continue
+        method, path, body, user_id = spec
+        headers = ctx.headers(user_id) if user_id is not None else None
+        t0 = time.perf_counter()
+        resp = client.open(path, method=method, json=body, headers=headers)
+        elapsed = time.perf_counter() - t0
+        if creates and resp.status_code == 201:
+            ctx.created[creates].append((user_id, resp.get_json()["id"]))
+        if i < WARMUP:
+            started = time.perf_counter()
+            continue
+        samples.append(elapsed)
+        if resp.status_code >= 400:
+            errors += 1
+    return _summary(samples, time.perf_counter() - started, errors)
+
+
+def _load_context(now: datetime) -> _Context:
+    users = db.session.execute(select(User.id, User.email).order_by(User.id)).all()
+    calendars = dict(db.session.execute(
+        select(Calendar.user_id, func.min(Calendar.id)).group_by(Calendar.user_id)).all())
+    return _Context([tuple(u) for u in users], calendars, now)
+
+
+def run_size(source_app, users: int, requests: int, events_per_user: float = 150,
+             tasks_per_user: float = 25, seed: int = 42, database_url=None,
+             progress=None) -> dict:
+    """Siembra un dataset de `users` usuarios y ejecuta SCENARIOS; devuelve {escenario: resumen}."""
+    from .querybudget import _budget_app
+    from .hashing import hash_password
+
+    workdir = None
+    if database_url is None:
+        workdir = tempfile.mkdtemp(prefix="api-bench-")
+        database_url = "sqlite:///" + os.path.join(workdir, "bench.db")
+    app = _budget_app(source_app, database_url, {})
+    app.config.update({k: v for k, v in source_app.config.items() if k.startswith("PASSWORD_HASH_")})
+
+    results = {}
+    try:
+        with app.app_context():
+            engine = db.engine
+            if workdir is None and inspect(engine).has_table(User.__tablename__) \
+                    and db.session.scalar(select(func.count(User.id))):
+                raise RuntimeError("La base de datos del benchmark debe estar vacía")
+            db.create_all()
+            now = datetime.utcnow().replace(microsecond=0)
+            seed_database(engine, users, events_per_user, tasks_per_user,
+                          password_hash=hash_password(PASSWORD), seed=seed, now=now)
+            ctx = _load_context(now)
+            client = app.test_client()
+            rng = random.Random(seed)
+            for name, build, creates, share in SCENARIOS:
+                count = max(10, int(requests * share))
+                results[name] = _run_scenario(client, ctx, rng, build, creates, count)
+                if progress and not results[name]["requests"]:
+                    progress(f"{users:>7} usuarios  {name:20} sin peticiones: "
+                             f"no había filas creadas ({results[name]['errors']} errores)")
+                elif progress:
+                    r = results[name]
+                    progress(f"{users:>7} usuarios  {name:20} p50 {r['p50_ms']:8.2f} ms  "
+                             f"p95 {r['p95_ms']:8.2f} ms  {r['rps']:8.1f} req/s"
+                             + (f"  {r['errors']} errores" if r["errors"] else ""))
+            db.session.remove()
+            if workdir is None:
+                db.drop_all()
+            engine.dispose()
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def run_benchmarks(source_app, sizes: list, requests: int, progress=None, **options) -> dict:
+    """Ejecuta run_size() para cada tamaño; el resultado se guarda tal cual como JSON."""
+    report = {
+        "meta": {
+            "created": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": "sqlite" if options.get("database_url") is None
+                        else options["database_url"].split(":", 1)[0],
+            "requests": requests,
+            **{k: v for k, v in options.items() if k != "database_url"},
+        },
+        "results": {},
+    }
+    for users in sizes:
+        report["results"][str(users)] = run_size(source_app, users, requests,
+                                                 progress=progress, **options)
+    return report
+
+
+# ---------- Borrado en cascada ----------
+
+DELETE_MODES = ("orm", "cascade", "purge")
+
+
+def _delete_calendar(mode: str, calendar_id: int, chunk: int) -> None:
+    from .purge import purge
+
+    if mode == "purge":
+        purge("calendar", calendar_id, chunk)
+        return
+    cal = db.session.get(Calendar, calendar_id)
+    if mode == "orm":
+        # Como antes de passive_deletes: el ORM carga los hijos y los borra uno a uno
+        len(cal.events)
+    db.session.delete(cal)
+    db.session.commit()
+
+
+def run_delete(source_app, children: int, chunk: int = 2000, database_url=None) -> dict:
+    """
+    Borra un calendario con `children` eventos de tres formas sobre el mismo dataset:
+    orm (hijos cargados y borrados por el ORM), cascade (ON DELETE CASCADE) y purge
+    (lotes de `chunk`). Devuelve {modo: {"ms", "peak_kb", "remaining"}}.
+    """
+    import tracemalloc
+    from sqlalchemy import insert
+    from .models import Event
+    from .querybudget import _budget_app
+
+    workdir = None
+    if database_url is None:
+        workdir = tempfile.mkdtemp(prefix="api-bench-")
+        database_url = "sqlite:///" + os.path.join(workdir, "bench.db")
+    app = _budget_app(source_app, database_url, {})
+
+    results = {}
+    try:
+        with app.app_context():
+            if workdir is None and inspect(db.engine).has_table(User.__tablename__) \
+                    and db.session.scalar(select(func.count(User.id))):
+                raise RuntimeError("La base de datos del benchmark debe estar vacía")
+            db.create_all()
+            user = User(email="delete@example.com", password="x", name="Delete",
+                        display_name="Delete", is_active=True, profile_pic="",
+                        last_session=datetime.utcnow())
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            start = datetime.utcnow().replace(microsecond=0)
+            for mode in DELETE_MODES:
+                cal = Calendar(user_id=user_id, title=mode, color="#000000")
+                db.session.add(cal)
+                db.session.commit()
+                db.session.execute(insert(Event), [{
+                    "user_id": user_id, "calendar_id": cal.id, "title": f"Evento {i}",
+                    "start_date": start + timedelta(hours=i), "all_day": False,
+                    "end_date": start + timedelta(hours=i, minutes=30),
+                } for i in range(children)])
+                db.session.commit()
+                calendar_id = cal.id
+                db.session.expunge_all()
+
+                tracemalloc.start()
+                started = time.perf_counter()
+                _delete_calendar(mode, calendar_id, chunk)
+                elapsed = time.perf_counter() - started
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                db.session.expunge_all()
+                results[mode] = {
+                    "ms": round(elapsed * 1000, 1),
+                    "peak_kb": round(peak / 1024),
+                    "remaining": db.session.scalar(select(func.count(Event.id))
+                                                   .where(Event.calendar_id == calendar_id)),
+                }
+            db.session.remove()
+            if workdir is None:
+                db.drop_all()
+            db.engine.dispose()
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+# ---------- Comparación ----------
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """
+    Compara dos informes de run_benchmarks() por (tamaño, escenario).
+    Devuelve [{size, scenario, metric, baseline, current, change, regression}]; los
+    pares que solo están en uno de los dos informes se ignoran.
+    """
+    rows = []
+    for size, scenarios in current["results"].items():
+        for name, now in scenarios.items():
+            before = baseline.get("results", {}).get(size, {}).get(name)
+            if before is None:
+                continue
+            for metric in ("p50_ms", "p95_ms", "rps"):
+                old, new = before[metric], now[metric]
+                if old is None or new is None or not before["requests"] or not now["requests"]:
+                    continue
+                change = (new - old) / old if old else 0.0
+                if metric == "rps":
+                    regression = change < -threshold
+                else:
+                    regression = change > threshold and new - old > MIN_DELTA_MS
+                rows.append({"size": size, "scenario": name, "metric": metric,
+                             "baseline": old, "current": new, "change": change,
+                             "regression": regression})
+    return rows
@@ -0,0 +1,98 @@
+"""
+Registro automático de cambios para la sincronización incremental.
+Tras cada flush de la sesión se anota en ChangeLog qué eventos, tareas, grupos de
+tareas y calendarios se crearon/modificaron ("upsert") o borraron ("delete"),
+con un número de secuencia por usuario. La secuencia se obtiene incrementando
+User.sync_seq con UPDATE ... RETURNING: la fila del usuario queda bloqueada hasta
+el commit, así que el orden de las secuencias coincide con el orden de commit y
+un cliente que sincroniza con `since=<seq>` nunca se salta un cambio.
+Con la misma secuencia se actualiza DataVersion por recurso, de donde salen
+los ETag de los listados (conditional.py).
+
+Las operaciones masivas que no pasan por la unidad de trabajo del ORM
+(DELETE/INSERT por lotes) deben llamar a record_changes explícitamente.
+
+Los eventos de un calendario y las tareas de un grupo los borra la base de datos
+(ON DELETE CASCADE), sin pasar por el ORM: no tienen lápida propia (el cliente descarta
+los hijos al recibir la del padre), pero el borrado del padre sube también la versión
+de los recursos hijos (CASCADES) para que sus ETag y la caché de respuestas cambien.
+"""
+from collections import defaultdict
+from typing import Iterable
+
+from sqlalchemy import event, insert, update
+from sqlalchemy.orm import Session
+
+from .models import db, User, Event, Task, TaskGroup, Calendar, ChangeLog, DataVersion
+
+TRACKED = {Event: "event", Task: "task", TaskGroup: "task_group", Calendar: "calendar"}
+# Recursos que la base de datos borra en cascada al borrar uno de estos
+CASCADES = {"calendar": ("event",), "task_group": ("task",)}
+
+
+def _next_seq(connection, user_id: int):
+    user = User.__table__
+    return connection.execute(
+        update(user).where(user.c.id == user_id)
+        .values(sync_seq=user.c.sync_seq + 1)
+        .returning(user.c.sync_seq)
+    ).scalar()
+
+
+def _bump_versions(connection, user_id: int, resources: set, seq: int) -> None:
+    # La fila del usuario ya está bloqueada por _next_seq: UPDATE y si no existe, INSERT
+    table = DataVersion.__table__
+    for resource in resources:
+        updated = connection.execute(
+            update(table).where(table.c.user_id == user_id, table.c.resource == resource)
+            .values(version=seq))
+        if updated.rowcount == 0:
+            connection.execute(insert(table).values(
+                user_id=user_id, resource=resource, version=seq))
+
+
+def _write(connection, changes: dict) -> None:
+    """changes: {user_id: [(entity, entity_id, op), ...]}"""
+    for user_id, entries in changes.items():
+        if not entries:
+            continue
+        seq = _next_seq(connection, user_id)
+        if seq is None:   # el usuario se está borrando: no hay nada que sincronizar
+            continue
+        connection.execute(insert(ChangeLog.__table__), [
+            {"user_id": user_id, "seq": seq, "entity": entity,
+             "entity_id": entity_id, "op": op}
+            for entity, entity_id, op in entries
+        ])
+        resources = set()
+        for entity, _, op in entries:
+            resources.add(entity)
+            if op == "delete":
+                resources.update(CASCADES.get(entity, ()))
+        _bump_versions(connection, user_id, resources, seq)
+
+
+def record_changes(user_id: int, entity: str, ids: Iterable[int], op: str) -> None:
+    """Anota cambios hechos fuera del ORM (p. ej. DELETE masivos) en la transacción actual."""
+    entries = [(entity, entity_id, op) for entity_id in ids]
+    if entries:
+        _write(db.session.connection(), {user_id: entries})
+
+
+@event.listens_for(Session, "after_flush")
+def _track_changes(session, flush_context):
+    changes = defaultdict(list)
+    for obj in session.new:
+        entity = TRACKED.get(type(obj))
+        if entity:
+            changes[obj.user_id].append((entity, obj.id, "upsert"))
+    for obj in session.dirty:
+        entity = TRACKED.get(type(obj))
+        if entity and session.is_modified(obj, include_collections=False):
+            changes[obj.user_id].append((entity, obj.id, "upsert"))
+    for obj in session.deleted:
+        entity = TRACKED.get(type(obj))
+        if entity:
+            changes[obj.user_id].append((entity, obj.id, "delete"))
+    if changes:
+        _write(session.connection(), changes)
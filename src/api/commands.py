@@ -1,6 +1,10 @@
 
+import re
 import click
-from api.models import db, User
+from datetime import datetime, timedelta
+from api.models import db, User, Event, Calendar
+from api.hashing import hash_password
+from api.seed import seed_database
 
 """
 In this file, you can add as many commands as you want using the @app.cli.command decorator
@@ -18,17 +22,383 @@ def setup_commands(app):
     @click.argument("count") # argument of out command
     def insert_test_users(count):
         print("Creating test users")
+        # Un solo hash para todos: el hash es caro a propósito
+        password_hash = hash_password("123456")
         for x in range(1, int(count) + 1):
-            user = User()
-            user.email = "test_user" + str(x) + "@test.com"
-            user.password = "123456"
-            user.is_active = True
+            email = "test_user" + str(x) + "@test.com"
+            user = User(email=email, password=password_hash, name="Test User " + str(x),
+                        display_name="test_user" + str(x), is_active=True, profile_pic="",
+                        last_session=datetime.utcnow())
             db.session.add(user)
-            db.session.commit()
             print("User: ", user.email, " created.")
+        db.session.commit()
 
         print("All test users created")
 
     @app.cli.command("insert-test-data")
     def insert_test_data():
-        pass
\ No newline at end of file
+        """Unos pocos usuarios con datos de ejemplo (contraseña 123456). Ver `flask seed`."""
+        totals = seed_database(db.engine, users=5, events_per_user=40, tasks_per_user=15,
+                               password_hash=hash_password("123456"), progress=print)
+        print("Filas insertadas:", totals)
+
+    @app.cli.command("seed")
+    @click.option("--users", type=int, default=1000, help="Número de usuarios a generar")
+    @click.option("--events-per-user", type=float, default=150, help="Media de eventos por usuario")
+    @click.option("--tasks-per-user", type=float, default=25, help="Media de tareas por usuario")
+    @click.option("--password", default="123456", help="Contraseña de todos los usuarios generados")
+    @click.option("--seed", "random_seed", type=int, default=42, help="Semilla (mismos datos con la misma semilla)")
+    @click.option("--batch", type=int, default=10000, help="Filas por COPY/executemany")
+    def seed(users, events_per_user, tasks_per_user, password, random_seed, batch):
+        """
+        Genera datos sintéticos para pruebas de carga con inserciones masivas
+        (COPY en Postgres, executemany en SQLite). Los emails son seed<id>@example.com.
+        Ejemplo: $ flask seed --users 50000 --events-per-user 180
+        """
+        started = datetime.utcnow()
+        totals = seed_database(db.engine, users=users, events_per_user=events_per_user,
+                               tasks_per_user=tasks_per_user, password_hash=hash_password(password),
+                               seed=random_seed, batch=batch, progress=print)
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        for table, count in totals.items():
+            print(f"  {table:12} {count:>12}")
+        print(f"{sum(totals.values())} filas en {elapsed:.1f}s")
+
+    @app.cli.command("explain-events")
+    @click.option("--user-id", type=int, default=1, help="Usuario cuyas consultas se analizan")
+    @click.option("--synthetic", type=int, default=0,
+                  help="Si > 0, genera ese número de eventos en un SQLite en memoria y analiza ahí")
+    def explain_events(user_id, synthetic):
+        """
+        Muestra el plan de las consultas de vista semanal y mensual de /api/events (las
+        tres que puede lanzar list_events: sin expandir, eventos simples y series
+        recurrentes) y falla si alguna recorre la tabla event completa o si algún acceso
+        por índice no está acotado por los dos lados (p. ej. solo start_date < fin),
+        salvo en los índices parciales, que solo tienen las filas de su condición.
+        Ejemplo: $ flask explain-events --synthetic 50000
+        """
+        from sqlalchemy import create_engine, insert
+        from api.routesEvent import events_in_range
+
+        anchor = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        windows = {
+            "week": (anchor, anchor + timedelta(days=7)),
+            "month": (anchor.replace(day=1), anchor.replace(day=1) + timedelta(days=31)),
+        }
+        # Consultas de list_events: expand=0, y con expand los simples y las series
+        queries = {"overlap": None, "simples": False, "series": True}
+        partial = {index.name for index in Event.__table__.indexes
+                   if any(index.dialect_options[d]["where"] is not None
+                          for d in ("sqlite", "postgresql"))}
+
+        if synthetic > 0:
+            engine = create_engine("sqlite://")
+            db.metadata.create_all(engine)
+            with engine.begin() as conn:
+                # Con las claves foráneas activas hacen falta el usuario y el calendario
+                conn.execute(insert(User), [{
+                    "id": user_id, "display_name": "explain", "name": "explain",
+                    "is_active": True, "email": "explain@example.com", "password": "",
+                    "profile_pic": "", "last_session": anchor,
+                }])
+                conn.execute(insert(Calendar), [{"id": 1, "user_id": user_id, "title": "explain",
+                                                 "color": "#000000"}])
+                first = anchor - timedelta(days=synthetic // 10)
+                rows = [{
+                    "user_id": user_id, "calendar_id": 1, "title": f"Evento {i}",
+                    "start_date": first + timedelta(hours=i * 2.4),
+                    "end_date": first + timedelta(hours=i * 2.4 + 1),
+                    "all_day": False,
+                    "recurrence_rule": None, "recurrence_end": None,
+                } for i in range(synthetic)]
+                # Una de cada 50 es una serie semanal de 10 semanas
+                for row in rows[::50]:
+                    row["recurrence_rule"] = "FREQ=WEEKLY;COUNT=10"
+                    row["recurrence_end"] = row["end_date"] + timedelta(weeks=9)
+                conn.execute(insert(Event), rows)
+                conn.exec_driver_sql("ANALYZE")
+        else:
+            engine = db.engine
+
+        failed = False
+        with engine.connect() as conn:
+            for name, (start_dt, end_dt) in windows.items():
+                for query, recurring in queries.items():
+                    stmt = events_in_range(user_id, start_dt, end_dt, recurring=recurring).statement
+                    plan = _explain(conn, stmt)
+                    if any(_is_full_scan(line) for line in plan):
+                        verdict = "FULL SCAN"
+                    elif not _is_bounded_range(plan, partial):
+                        verdict = "RANGO ABIERTO (el índice se recorre desde el primer evento)"
+                    else:
+                        verdict = "index, rango acotado"
+                    failed = failed or not verdict.startswith("index")
+                    print(f"[{name}/{query}] {verdict}")
+                    for line in plan:
+                        print("   ", line)
+
+        if failed:
+            raise SystemExit(1)
+        print("Todas las vistas usan un rango acotado de índice")
+
+    @app.cli.command("check-query-budgets")
+    @click.option("--verbose", is_flag=True, help="Muestra las sentencias de los que fallan")
+    def check_query_budgets(verbose):
+        """
+        Cuenta las sentencias SQL de cada endpoint de querybudget.BUDGETS sobre una
+        base SQLite en memoria y falla si alguno supera su máximo (p. ej. por un N+1).
+        Ejemplo: $ flask check-query-budgets --verbose
+        """
+        from api.querybudget import run_budgets
+
+        failed = False
+        for result in run_budgets(app):
+            mark = "ok  " if result["ok"] else "FAIL"
+            print(f"[{mark}] {result['method']:6} {result['path']:50} "
+                  f"{result['statements']:>3}/{result['budget']} ({result['status']})")
+            if not result["ok"]:
+                failed = True
+                if verbose:
+                    for statement in result["sql"]:
+                        print("       ", " ".join(statement.split())[:160])
+
+        if failed:
+            raise SystemExit(1)
+        print("Todos los endpoints dentro de su presupuesto de consultas")
+
+    @app.cli.command("benchmark")
+    @click.option("--sizes", default="100,1000", help="Tamaños del dataset en usuarios, separados por comas")
+    @click.option("--requests", "n_requests", type=int, default=200, help="Peticiones por escenario")
+    @click.option("--events-per-user", type=float, default=150, help="Media de eventos por usuario")
+    @click.option("--tasks-per-user", type=float, default=25, help="Media de tareas por usuario")
+    @click.option("--seed", "random_seed", type=int, default=42, help="Semilla del dataset y de las peticiones")
+    @click.option("--database-url", default=None,
+                  help="Base de datos VACÍA a usar en lugar de un SQLite temporal (se borra al terminar)")
+    @click.option("--output", type=click.Path(dir_okay=False), default=None, help="Guarda el resultado en JSON")
+    @click.option("--baseline", type=click.Path(exists=True, dir_okay=False), default=None,
+                  help="JSON de una ejecución anterior con el que comparar")
+    @click.option("--threshold", type=float, default=0.25, help="Empeoramiento relativo que cuenta como regresión")
+    def benchmark(sizes, n_requests, events_per_user, tasks_per_user, random_seed, database_url,
+                  output, baseline, threshold):
+        """
+        Mide p50/p95 y peticiones/s de login, listados y mutaciones sobre datasets
+        sembrados de varios tamaños. Con --baseline termina con código 1 si hay regresiones.
+        Ejemplo: $ flask benchmark --sizes 100,2000 --output bench.json --baseline base.json
+        """
+        import json
+        from api.benchmark import run_benchmarks
+
+        report = run_benchmarks(app, [int(s) for s in sizes.split(",") if s.strip()], n_requests,
+                                progress=print, events_per_user=events_per_user,
+                                tasks_per_user=tasks_per_user, seed=random_seed,
+                                database_url=database_url)
+        if output:
+            with open(output, "w") as f:
+                json.dump(report, f, indent=2)
+            print("Resultados guardados en", output)
+        if baseline:
+            with open(baseline) as f:
+                _print_comparison(json.load(f), report, threshold)
+
+    @app.cli.command("benchmark-compare")
+    @click.argument("baseline", type=click.Path(exists=True, dir_okay=False))
+    @click.argument("current", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--threshold", type=float, default=0.25, help="Empeoramiento relativo que cuenta como regresión")
+    def benchmark_compare(baseline, current, threshold):
+        """
+        Compara dos JSON de `flask benchmark` sin volver a ejecutarlo.
+        Ejemplo: $ flask benchmark-compare base.json bench.json
+        """
+        import json
+
+        with open(baseline) as f, open(current) as g:
+            _print_comparison(json.load(f), json.load(g), threshold)
+
+    @app.cli.command("benchmark-delete")
+    @click.option("--children", type=int, default=20000, help="Eventos del calendario que se borra")
+    @click.option("--chunk", type=int, default=2000, help="Filas por lote en el modo purge")
+    @click.option("--database-url", default=None,
+                  help="Base de datos VACÍA a usar en lugar de un SQLite temporal (se borra al terminar)")
+    def benchmark_delete(children, chunk, database_url):
+        """
+        Compara el borrado de un calendario grande con el ORM cargando los eventos,
+        con ON DELETE CASCADE y por lotes (purge.py).
+        Ejemplo: $ flask benchmark-delete --children 50000
+        """
+        from api.benchmark import run_delete
+
+        for mode, r in run_delete(app, children, chunk, database_url).items():
+            print(f"{mode:8} {r['ms']:10.1f} ms  pico {r['peak_kb']:8} KB  "
+                  f"quedan {r['remaining']} eventos")
+
+    @app.cli.command("purge")
+    @click.argument("entity", type=click.Choice(["calendar", "task_group"]))
+    @click.argument("parent_id", type=int)
+    @click.option("--chunk", type=int, default=0, help="Filas por lote (por defecto PURGE_CHUNK)")
+    def purge_command(entity, parent_id, chunk):
+        """
+        Borra un calendario o un grupo con sus hijos por lotes, un commit por lote.
+        Ejemplo: $ flask purge calendar 12
+        """
+        from api.purge import purge
+
+        deleted = purge(entity, parent_id, chunk)
+        print(f"{entity} {parent_id}: {deleted} hijos borrados")
+
+    @app.cli.command("compress-static")
+    @click.option("--force", is_flag=True, help="Regenera también las variantes que ya están al día")
+    def compress_static(force):
+        """
+        Genera los .gz (y .br si está instalado brotli) de dist/ que sirve api/assets.py.
+        Se lanza después de `npm run build`. Ejemplo: $ flask compress-static
+        """
+        import os
+        from api.assets import compress_directory
+
+        root = os.path.join(app.root_path, "..", "dist")
+        written = compress_directory(root, force=force)
+        for path, size, sizes in written:
+            variants = ", ".join(f"{enc} {n}" for enc, n in sizes.items())
+            print(f"  {os.path.relpath(path, root):50} {size:>9} → {variants}")
+        print(f"{len(written)} ficheros comprimidos")
+
+    @app.cli.command("verify-row-serializers")
+    @click.option("--batch", type=int, default=1000, help="Filas por consulta")
+    def verify_row_serializers(batch):
+        """
+        Comprueba que el camino rápido de los listados (api/rowserialize.py) produce
+        exactamente el mismo JSON que Model.serialize() para todas las filas.
+        Ejemplo: $ flask verify-row-serializers
+        """
+        from api.rowserialize import verify
+
+        failed = False
+        for name, (checked, mismatched) in verify(batch).items():
+            mark = "ok  " if not mismatched else "FAIL"
+            print(f"[{mark}] {name:18} {checked:>9} filas comprobadas")
+            if mismatched:
+                failed = True
+                print("       ids distintos:", ", ".join(map(str, mismatched[:20])),
+                      "..." if len(mismatched) > 20 else "")
+        if failed:
+            raise SystemExit(1)
+        print("Mismo JSON por los dos caminos")
+
+    @app.cli.command("response-cache")
+    @click.option("--clear", is_flag=True, help="Vacía la caché (solo afecta a este proceso si es \"memory\")")
+    def response_cache_command(clear):
+        """
+        Estado de la caché de respuestas (RESPONSE_CACHE=memory|sqlite|off).
+        Ejemplo: $ RESPONSE_CACHE=sqlite flask response-cache --clear
+        """
+        from api.responsecache import response_cache
+
+        cache = response_cache()
+        if cache is None:
+            print("Caché de respuestas desactivada")
+            return
+        if clear:
+            cache.clear()
+        print(cache.stats())
+
+    @app.cli.command("compact-change-log")
+    def compact_change_log():
+        """
+        Borra del ChangeLog las entradas que ya tienen otra posterior para la misma
+        entidad: /api/sync solo devuelve la última operación, así que el resultado
+        para cualquier cursor es el mismo. Ejemplo: $ flask compact-change-log
+        """
+        from sqlalchemy import delete, exists
+        from sqlalchemy.orm import aliased
+        from api.models import ChangeLog
+
+        newer = aliased(ChangeLog)
+        superseded = exists().where(
+            newer.user_id == ChangeLog.user_id,
+            newer.entity == ChangeLog.entity,
+            newer.entity_id == ChangeLog.entity_id,
+            newer.seq > ChangeLog.seq,
+        )
+        result = db.session.execute(delete(ChangeLog).where(superseded),
+                                    execution_options={"synchronize_session": False})
+        db.session.commit()
+        print(f"{result.rowcount} entradas del change log eliminadas")
+
+    @app.cli.command("compact-idempotency-keys")
+    def compact_idempotency_keys():
+        """
+        Borra las respuestas guardadas por Idempotency-Key que ya han caducado
+        (IDEMPOTENCY_TTL). Ejemplo: $ flask compact-idempotency-keys
+        """
+        from api.idempotency import compact
+
+        deleted = compact()
+        db.session.commit()
+        print(f"{deleted} claves de idempotencia caducadas eliminadas")
+
+
+def _print_comparison(baseline: dict, current: dict, threshold: float) -> None:
+    from api.benchmark import compare
+
+    rows = compare(baseline, current, threshold)
+    for row in rows:
+        mark = "REGR" if row["regression"] else "ok  "
+        print(f"[{mark}] {row['size']:>7} {row['scenario']:20} {row['metric']:7} "
+              f"{row['baseline']:>10.2f} → {row['current']:>10.2f} ({row['change']:+.0%})")
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"{len(regressions)} regresiones (umbral {threshold:.0%})")
+        raise SystemExit(1)
+    print(f"Sin regresiones en {len(rows)} métricas (umbral {threshold:.0%})")
+
+
+def _explain(conn, stmt):
+    """Ejecuta EXPLAIN (Postgres) o EXPLAIN QUERY PLAN (SQLite) sobre una sentencia."""
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    rows = conn.exec_driver_sql(prefix + str(compiled), params).fetchall()
+    return [str(row[-1]) for row in rows]
+
+
+def _is_full_scan(line: str) -> bool:
+    line = line.strip()
+    # SQLite: "SCAN event" sin índice; Postgres: "Seq Scan on event"
+    if line.startswith("SCAN event"):
+        return "INDEX" not in line
+    return "Seq Scan on event" in line
+
+
+# Comparación columna-cota en un plan: "start_date>?" (SQLite), "(start_date < '...')" (Postgres)
+_BOUND = re.compile(r"(\w+)\s*([<>])=?\s*[?'($\w]")
+
+
+# Índice usado en una línea del plan (SQLite: "USING INDEX x"; Postgres: "Index Scan using x")
+_INDEX = re.compile(r"(?:USING (?:COVERING )?INDEX|Scan using|Index Scan on) (\w+)")
+
+
+def _is_bounded_range(plan: list, partial: set = frozenset()) -> bool:
+    """
+    True si todos los accesos por índice a event acotan una misma columna por arriba y
+    por abajo, o usan uno de los índices parciales de `partial` (solo tienen las pocas
+    filas de su condición: eventos largos antiguos, series recurrentes).
+    """
+    index, seen = None, False
+    for line in plan:
+        line = line.strip()
+        match = _INDEX.search(line)
+        if match:
+            index = match.group(1)
+        if not (line.startswith("SEARCH event") or line.startswith("Index Cond:")):
+            continue
+        seen = True
+        if index in partial:
+            continue
+        sides = {}
+        for column, op in _BOUND.findall(line):
+            sides.setdefault(column, set()).add(op)
+        if not any(len(ops) == 2 for ops in sides.values()):
+            return False
+    return seen
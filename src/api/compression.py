@@ -0,0 +1,128 @@
+"""
+Compresión gzip/brotli de las respuestas de /api según Accept-Encoding.
+- Solo tipos de texto (JSON, iCalendar, CSV...) y cuerpos de al menos COMPRESSION_MIN_SIZE
+  bytes: por debajo de ~1 KB la cabecera y la CPU cuestan más de lo que se ahorra
+- brotli si está instalado y el cliente lo acepta; si no, gzip
+- las respuestas en streaming (?stream=1, export.ics) se comprimen trozo a trozo sin
+  acumular el cuerpo; el tamaño original no se conoce, así que no se aplica el mínimo
+- no toca respuestas que ya traen Content-Encoding ni las marcadas con no-transform
+Configuración (app.config o entorno): COMPRESSION (1/0), COMPRESSION_MIN_SIZE,
+COMPRESSION_LEVEL (gzip 1-9) y COMPRESSION_BROTLI_QUALITY (0-11).
+Bytes antes/después y CPU por endpoint van a /metrics; con SERVER_TIMING también "compress".
+"""
+import gzip
+import os
+import time
+import zlib
+
+from flask import request
+
+from .metrics import metrics
+from .timing import add_timing
+
+try:
+    import brotli
+except ImportError:  # opcional: sin él solo gzip
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/problem+json", "text/calendar",
+                      "text/csv", "text/plain", "text/html")
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 4
+
+
+def _setting(app, name: str, default):
+    return type(default)(app.config.get(name, os.environ.get(name, default)))
+
+
+def _negotiate() -> str:
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"] > 0:
+        return "br"
+    if accepted["gzip"] > 0:
+        return "gzip"
+    return ""
+
+
+def _compressor(encoding: str, level: int, quality: int):
+    """(process, finish) de un compresor incremental."""
+    if encoding == "br":
+        c = brotli.Compressor(quality=quality)
+        return c.process, c.finish
+    c = zlib.compressobj(level, zlib.DEFLATED, 31)   # wbits 31 → formato gzip
+    return c.compress, c.flush
+
+
+def _streamed(chunks, encoding: str, level: int, quality: int, method: str, endpoint: str):
+    process, finish = _compressor(encoding, level, quality)
+    original = compressed = 0
+    cpu = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            original += len(chunk)
+            started = time.thread_time()
+            out = process(chunk)
+            cpu += time.thread_time() - started
+            if out:
+                compressed += len(out)
+                yield out
+        started = time.thread_time()
+        out = finish()
+        cpu += time.thread_time() - started
+        compressed += len(out)
+        yield out
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+        metrics.record_compression(method, endpoint, encoding, original, compressed, cpu)
+
+
+def setup_compression(app):
+    if str(_setting(app, "COMPRESSION", "1")).lower() not in ("1", "true", "yes"):
+        return
+    min_size = _setting(app, "COMPRESSION_MIN_SIZE", DEFAULT_MIN_SIZE)
+    level = _setting(app, "COMPRESSION_LEVEL", DEFAULT_LEVEL)
+    quality = _setting(app, "COMPRESSION_BROTLI_QUALITY", DEFAULT_BROTLI_QUALITY)
+
+    @app.after_request
+    def _compress_response(response):
+        if not request.path.startswith("/api/") or request.method == "HEAD":
+            return response
+        if response.status_code < 200 or response.status_code in (204, 206, 304) \
+                or response.direct_passthrough or "Content-Encoding" in response.headers \
+                or response.mimetype not in COMPRESSIBLE_TYPES \
+                or "no-transform" in response.headers.get("Cache-Control", ""):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = _negotiate()
+        if not encoding:
+            return response
+
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        if response.is_streamed:
+            response.response = _streamed(response.response, encoding, level, quality,
+                                          request.method, endpoint)
+            response.headers.pop("Content-Length", None)
+        else:
+            body = response.get_data()
+            if len(body) < min_size:
+                return response
+            started, cpu_started = time.perf_counter(), time.thread_time()
+            if encoding == "br":
+                data = brotli.compress(body, quality=quality)
+            else:
+                data = gzip.compress(body, compresslevel=level, mtime=0)
+            cpu = time.thread_time() - cpu_started
+            add_timing("compress", time.perf_counter() - started)
+            response.set_data(data)
+            metrics.record_compression(request.method, endpoint, encoding, len(body), len(data), cpu)
+
+        response.content_encoding = encoding
+        # Un ETag fuerte identifica bytes exactos: el cuerpo comprimido es otro distinto
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{encoding}")
+        return response
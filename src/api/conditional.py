@@ -0,0 +1,87 @@
+"""
+GET condicionales para los listados (ETag / If-None-Match).
+El ETag se calcula con las versiones de DataVersion de los recursos de los que
+depende el listado, el usuario y la URL completa (filtros, cursor...). Si el
+cliente envía un If-None-Match que coincide se responde 304 sin consultar
+ni serializar nada más; el sondeo periódico sin cambios cuesta una lectura
+por clave primaria. Con cache=True el cuerpo se guarda además en la caché de
+respuestas (responsecache.py) bajo esa misma clave, para el resto de clientes.
+"""
+import hashlib
+from functools import wraps
+
+from flask import Response, make_response, request
+from sqlalchemy import select
+
+from .models import db, DataVersion
+from .responsecache import response_cache, max_body
+
+
+def resource_versions(user_id: int, resources: tuple) -> dict:
+    """Versión actual de cada recurso (0 si el usuario nunca lo ha modificado)."""
+    rows = db.session.execute(
+        select(DataVersion.resource, DataVersion.version)
+        .where(DataVersion.user_id == user_id, DataVersion.resource.in_(resources))
+    ).all()
+    versions = dict.fromkeys(resources, 0)
+    versions.update(rows)
+    return versions
+
+
+def compute_etag(user_id: int, resources: tuple) -> str:
+    versions = resource_versions(user_id, resources)
+    raw = "|".join([str(user_id), request.full_path] +
+                   [f"{name}:{versions[name]}" for name in resources])
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def _cached(etag: str):
+    cache = response_cache()
+    return cache.get(etag) if cache is not None else None
+
+
+def _store(etag: str, resp: Response) -> None:
+    if resp.is_streamed or resp.mimetype != "application/json":
+        return
+    body = resp.get_data()
+    if len(body) <= max_body():
+        response_cache().set(etag, body)
+
+
+def conditional_get(*resources: str, cache: bool = False):
+    """
+    Decorador para listados: añade un ETag débil y responde 304 si no ha cambiado.
+    El usuario se toma de auth_payload (token_required) o del user_id de la URL.
+    cache=True sirve el cuerpo desde la caché de respuestas si ya se generó para
+    ese ETag (cabecera X-Cache: hit/miss).
+    Uso:
+        @api.route("/calendars", methods=["GET"])
+        @token_required
+        @conditional_get("calendar", cache=True)
+        def list_calendars(auth_payload): ...
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            auth_payload = kwargs.get("auth_payload") or {}
+            user_id = auth_payload.get("user_id", kwargs.get("user_id"))
+            etag = compute_etag(user_id, resources)
+
+            if request.if_none_match.contains_weak(etag):
+                resp = Response(status=304)
+            elif cache and (body := _cached(etag)) is not None:
+                resp = Response(body, mimetype="application/json")
+                resp.headers["X-Cache"] = "hit"
+            else:
+                resp = make_response(fn(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+                if cache and response_cache() is not None:
+                    _store(etag, resp)
+                    resp.headers["X-Cache"] = "miss"
+            resp.set_etag(etag, weak=True)
+            # El navegador puede guardar la respuesta pero debe revalidarla siempre
+            resp.headers["Cache-Control"] = "private, no-cache"
+            return resp
+        return wrapper
+    return decorator
@@ -0,0 +1,108 @@
+"""
+Hash y verificación de contraseñas fuera del hilo de la petición.
+PBKDF2/scrypt son caros a propósito: se ejecutan en un pool de procesos acotado y,
+si ya hay demasiadas operaciones en cola, se responde 503 en lugar de bloquear
+al resto de endpoints del worker.
+
+Configuración (app.config o variables de entorno):
+- PASSWORD_HASH_METHOD       método de werkzeug, p. ej. "scrypt:32768:8:1" o "pbkdf2:sha256:600000"
+- PASSWORD_HASH_WORKERS      procesos del pool (0 = en línea, sin pool)
+- PASSWORD_HASH_MAX_PENDING  operaciones simultáneas admitidas (en curso + en cola)
+- PASSWORD_HASH_TIMEOUT      segundos máximos de espera por operación
+Los hashes guardados con otro método se rehacen en el siguiente login (needs_rehash).
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from flask import current_app, has_app_context
+from werkzeug.security import (DEFAULT_PBKDF2_ITERATIONS, generate_password_hash,
+                               check_password_hash)
+
+from .utils import APIException
+
+DEFAULT_METHOD = "scrypt:32768:8:1"
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT = 10
+
+_pool = None
+_pool_pid = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _setting(name: str, default):
+    if has_app_context() and name in current_app.config:
+        return current_app.config[name]
+    return type(default)(os.environ.get(name, default))
+
+
+def hash_method() -> str:
+    return _setting("PASSWORD_HASH_METHOD", DEFAULT_METHOD)
+
+
+def _executor():
+    """Pool y semáforo por proceso: tras el fork de gunicorn cada worker crea los suyos."""
+    global _pool, _pool_pid, _slots
+    workers = _setting("PASSWORD_HASH_WORKERS", DEFAULT_WORKERS)
+    if workers <= 0:
+        return None, None
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(
+                _setting("PASSWORD_HASH_MAX_PENDING", workers * 4))
+        return _pool, _slots
+
+
+def _run(fn, *args):
+    pool, slots = _executor()
+    if pool is None:
+        return fn(*args)
+    if not slots.acquire(blocking=False):
+        raise APIException("Servidor ocupado, inténtalo de nuevo en unos segundos", 503)
+    try:
+        future = pool.submit(fn, *args)
+    except BaseException:
+        slots.release()
+        raise
+    # El hueco se libera cuando el proceso termina, no cuando dejamos de esperar:
+    # tras un timeout el trabajo sigue ocupando el pool
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=_setting("PASSWORD_HASH_TIMEOUT", DEFAULT_TIMEOUT))
+    except FutureTimeout:
+        raise APIException("Servidor ocupado, inténtalo de nuevo en unos segundos", 503)
+
+
+def hash_password(raw_password: str) -> str:
+    return _run(generate_password_hash, raw_password, hash_method())
+
+
+def verify_password(password_hash: str, raw_password: str) -> bool:
+    if not password_hash:
+        return False
+    return _run(check_password_hash, password_hash, raw_password)
+
+
+def _method_params(method: str) -> tuple:
+    """
+    Método de werkzeug con todos sus parámetros, como queda guardado en el hash:
+    "scrypt" → ("scrypt", "32768", "8", "1"), "pbkdf2" → ("pbkdf2", "sha256", "<iteraciones>").
+    """
+    name, *args = method.split(":")
+    if name == "scrypt" and not args:
+        args = [str(2**15), "8", "1"]
+    elif name == "pbkdf2":
+        args = (args or ["sha256"])[:2]
+        if len(args) == 1:
+            args.append(str(DEFAULT_PBKDF2_ITERATIONS))
+    return (name, *args)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True si el hash se generó con un método o parámetros distintos de los configurados."""
+    if not password_hash:
+        return False
+    return _method_params(password_hash.split("$", 1)[0]) != _method_params(hash_method())
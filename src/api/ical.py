@@ -0,0 +1,195 @@
+"""
+Lectura y escritura de iCalendar (RFC 5545), solo lo necesario para VEVENT.
+- vevent_lines / calendar_lines: generan las líneas ya plegadas (75 octetos) para exportar
+- iter_vevents: recorre un .ics línea a línea y va entregando cada VEVENT como dict,
+  sin cargar el fichero entero en memoria
+Las fechas se tratan como hora local "flotante" igual que el resto de la API:
+los valores en UTC (sufijo Z) se guardan en UTC y el parámetro TZID se ignora.
+"""
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
+
+PRODID = "-//Calendar App//ES"
+FOLD_AT = 75
+
+
+# ---------- Escritura ----------
+
+def escape_text(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold(line: str) -> str:
+    """Pliega una línea de contenido en trozos de como mucho 75 octetos (UTF-8)."""
+    raw = line.encode("utf-8")
+    if len(raw) <= FOLD_AT:
+        return line + "\r\n"
+    chunks, limit = [], FOLD_AT
+    while raw:
+        cut = min(limit, len(raw))
+        # No partir un carácter multibyte
+        while cut < len(raw) and (raw[cut] & 0xC0) == 0x80:
+            cut -= 1
+        chunks.append(raw[:cut].decode("utf-8"))
+        raw = raw[cut:]
+        limit = FOLD_AT - 1   # las líneas de continuación empiezan con un espacio
+    return "\r\n ".join(chunks) + "\r\n"
+
+
+def _format_datetime(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def vevent_lines(ev, uid_domain: str) -> Iterator[str]:
+    """Líneas (sin plegar) de un VEVENT a partir de un Event."""
+    yield "BEGIN:VEVENT"
+    yield f"UID:{ev.ical_uid or f'{ev.id}@{uid_domain}'}"
+    stamp = ev.updated_at or datetime.utcnow()
+    yield f"DTSTAMP:{stamp.strftime('%Y%m%dT%H%M%SZ')}"
+    if ev.all_day:
+        # DTEND es exclusivo: el día siguiente al último día del evento
+        yield f"DTSTART;VALUE=DATE:{ev.start_date.strftime('%Y%m%d')}"
+        end_day = ev.end_date.date() + timedelta(days=1)
+        yield f"DTEND;VALUE=DATE:{end_day.strftime('%Y%m%d')}"
+    else:
+        yield f"DTSTART:{_format_datetime(ev.start_date)}"
+        yield f"DTEND:{_format_datetime(ev.end_date)}"
+    yield f"SUMMARY:{escape_text(ev.title or '')}"
+    if ev.description:
+        yield f"DESCRIPTION:{escape_text(ev.description)}"
+    if ev.status:
+        yield f"STATUS:{ev.status.upper()}"
+    if ev.color:
+        yield f"COLOR:{escape_text(ev.color)}"
+    if ev.recurrence_rule:
+        yield f"RRULE:{ev.recurrence_rule}"
+        if ev.recurrence_exdates:
+            exdates = [datetime.fromisoformat(v) for v in ev.recurrence_exdates.split(",") if v]
+            yield "EXDATE:" + ",".join(_format_datetime(v) for v in exdates)
+    yield "END:VEVENT"
+
+
+def calendar_lines(events: Iterable, name: str, uid_domain: str) -> Iterator[str]:
+    """Documento VCALENDAR completo, una línea plegada (con CRLF) cada vez."""
+    yield fold("BEGIN:VCALENDAR")
+    yield fold("VERSION:2.0")
+    yield fold(f"PRODID:{PRODID}")
+    yield fold("CALSCALE:GREGORIAN")
+    yield fold(f"X-WR-CALNAME:{escape_text(name or '')}")
+    for ev in events:
+        for line in vevent_lines(ev, uid_domain):
+            yield fold(line)
+    yield fold("END:VCALENDAR")
+
+
+# ---------- Lectura ----------
+
+def unescape_text(value: str) -> str:
+    out, i = [], 0
+    while i < len(value):
+        ch = value[i]
+        if ch == "\\" and i + 1 < len(value):
+            nxt = value[i + 1]
+            out.append("\n" if nxt in "nN" else nxt)
+            i += 2
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def _unfold(lines: Iterable[str]) -> Iterator[str]:
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def _split_property(line: str) -> tuple[str, dict, str]:
+    """'DTSTART;VALUE=DATE:20250908' → ('DTSTART', {'VALUE': 'DATE'}, '20250908')"""
+    head, _, value = line.partition(":")
+    name, *params = head.split(";")
+    parsed = {}
+    for param in params:
+        key, _, val = param.partition("=")
+        parsed[key.upper()] = val.strip('"')
+    return name.upper(), parsed, value
+
+
+def iter_vevents(lines: Iterable[str]) -> Iterator[dict]:
+    """
+    Entrega cada VEVENT como {NOMBRE: (params, valor)}; EXDATE acumula una lista.
+    Los componentes anidados (VALARM...) se ignoran.
+    """
+    current, depth = None, 0
+    for line in _unfold(lines):
+        if not line:
+            continue
+        name, params, value = _split_property(line)
+        if name == "BEGIN":
+            if value.upper() == "VEVENT" and current is None:
+                current, depth = {}, 0
+            elif current is not None:
+                depth += 1
+        elif name == "END":
+            if current is None:
+                continue
+            if depth:
+                depth -= 1
+            elif value.upper() == "VEVENT":
+                yield current
+                current = None
+        elif current is not None and not depth:
+            if name == "EXDATE":
+                current.setdefault(name, []).append((params, value))
+            else:
+                current.setdefault(name, (params, value))
+
+
+def to_iso(value: str) -> tuple[str, bool]:
+    """
+    Convierte un DATE o DATE-TIME de iCalendar a ISO 8601 para _parse_iso_datetime.
+    Devuelve (iso, es_solo_fecha). Lanza ValueError si no tiene el formato esperado.
+    """
+    value = value.strip()
+    value = value.rstrip("Z")
+    try:
+        if "T" not in value:
+            return datetime.strptime(value, "%Y%m%d").date().isoformat(), True
+        parsed = datetime.strptime(value, "%Y%m%dT%H%M%S")
+    except ValueError as e:
+        raise ValueError(f"Fecha iCalendar inválida: {value}") from e
+    # Los valores UTC se guardan tal cual (sin zona), como el resto de fechas
+    return parsed.isoformat(), False
+
+
+def parse_duration(value: str) -> Optional[timedelta]:
+    """DURATION de iCalendar (P1D, PT1H30M, P2W...). None si no se reconoce."""
+    value = value.strip().upper()
+    sign = -1 if value.startswith("-") else 1
+    value = value.lstrip("+-")
+    if not value.startswith("P"):
+        return None
+    total, number, in_time = timedelta(0), "", False
+    units = {"W": timedelta(weeks=1), "D": timedelta(days=1)}
+    time_units = {"H": timedelta(hours=1), "M": timedelta(minutes=1), "S": timedelta(seconds=1)}
+    for ch in value[1:]:
+        if ch == "T":
+            in_time = True
+        elif ch.isdigit():
+            number += ch
+        else:
+            unit = (time_units if in_time else units).get(ch)
+            if unit is None or not number:
+                return None
+            total += int(number) * unit
+            number = ""
+    return sign * total
@@ -0,0 +1,192 @@
+"""
+Cabecera Idempotency-Key en los POST que crean recursos (eventos, tareas, grupos,
+calendarios). Un reintento con la misma clave (mismo usuario) devuelve la respuesta
+guardada de la primera petición, con Idempotent-Replayed: true, sin volver a validar
+ni insertar nada.
+
+- la clave se reserva (fila con status_code NULL) y se hace commit ANTES de ejecutar la
+  vista; el índice único (user_id, key) decide qué petición gana si llegan a la vez
+- mientras la primera sigue en curso, otra con la misma clave recibe 409
+- durante la vista db.session.commit() solo hace flush: lo que crea la vista y la
+  respuesta guardada van en la MISMA transacción. Si el proceso muere a mitad no queda
+  ni el recurso ni la respuesta, y la reserva caduca a los IDEMPOTENCY_LOCK_TIMEOUT
+  segundos. Si la vista tarda más que eso y otra petición se ha quedado la clave, la
+  primera deshace su trabajo y responde 409 en lugar de crear un duplicado
+- solo se guardan respuestas 2xx; con un error la clave se libera para poder corregir
+  y reintentar
+- la misma clave con otro método, ruta o cuerpo → 422
+- las respuestas caducan a los IDEMPOTENCY_TTL segundos (24 h por defecto). Cada
+  COMPACT_EVERY respuestas guardadas el proceso borra las caducadas; también
+  `flask compact-idempotency-keys`
+Sin la cabecera el endpoint se comporta igual que siempre.
+"""
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import Response, current_app, make_response, request
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from .models import db, IdempotencyKey
+from .utils import APIException
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+DEFAULT_TTL = 24 * 3600
+DEFAULT_LOCK_TIMEOUT = 60
+COMPACT_EVERY = 500
+
+_lock = threading.Lock()
+_stored = 0
+
+
+def _setting(app, name: str, default):
+    return type(default)(app.config.get(name, os.environ.get(name, default)))
+
+
+def _fingerprint() -> str:
+    h = hashlib.sha256()
+    h.update(f"{request.method}\0{request.path}\0".encode())
+    h.update(request.get_data())
+    return h.hexdigest()
+
+
+def _find(user_id: int, key: str):
+    return db.session.execute(
+        select(IdempotencyKey.fingerprint, IdempotencyKey.status_code,
+               IdempotencyKey.body, IdempotencyKey.created_at)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    ).first()
+
+
+def _claim(user_id: int, key: str, fingerprint: str):
+    """
+    Reserva la clave. Devuelve (None, instante de la reserva), o (fila existente, None)
+    si ya estaba reservada.
+    """
+    table = IdempotencyKey.__table__
+    now = datetime.utcnow()
+    row = _find(user_id, key)
+    if row is not None:
+        expired = row.created_at < now - timedelta(
+            seconds=_setting(current_app, "IDEMPOTENCY_TTL", DEFAULT_TTL))
+        abandoned = row.status_code is None and row.created_at < now - timedelta(
+            seconds=_setting(current_app, "IDEMPOTENCY_LOCK_TIMEOUT", DEFAULT_LOCK_TIMEOUT))
+        if not (expired or abandoned):
+            return row, None
+        db.session.execute(delete(table).where(table.c.user_id == user_id, table.c.key == key))
+    try:
+        db.session.execute(insert(table).values(
+            user_id=user_id, key=key, fingerprint=fingerprint, created_at=now))
+        db.session.commit()
+    except IntegrityError:
+        # Otra petición con la misma clave la ha reservado entre la lectura y el INSERT...
+        db.session.rollback()
+        row = _find(user_id, key)
+        if row is None:
+            # ...o no hay tal carrera y el INSERT falla por la FK: el usuario no existe
+            raise APIException("Usuario no encontrado", 404)
+        return row, None
+    return None, now
+
+
+def _replay(row, fingerprint: str) -> Response:
+    if row.fingerprint != fingerprint:
+        raise APIException(f"{HEADER} ya usada con otra petición", 422)
+    if row.status_code is None:
+        raise APIException(f"La petición con esta {HEADER} sigue en curso", 409)
+    resp = Response(row.body, status=row.status_code, mimetype="application/json")
+    resp.headers[REPLAYED_HEADER] = "true"
+    resp.headers["Access-Control-Expose-Headers"] = REPLAYED_HEADER
+    return resp
+
+
+@contextmanager
+def _deferred_commit():
+    """Mientras dura, db.session.commit() hace flush y deja la transacción abierta."""
+    session = db.session()
+    session.commit = session.flush
+    try:
+        yield
+    finally:
+        del session.commit
+
+
+def _complete(user_id: int, key: str, claimed_at: datetime, resp: Response) -> None:
+    """Guarda la respuesta y hace commit junto con el trabajo de la vista."""
+    global _stored
+    table = IdempotencyKey.__table__
+    result = db.session.execute(
+        update(table).where(table.c.user_id == user_id, table.c.key == key,
+                            table.c.created_at == claimed_at, table.c.status_code.is_(None))
+        .values(status_code=resp.status_code, body=resp.get_data(as_text=True)))
+    if result.rowcount != 1:
+        # La reserva caducó y otra petición con la misma clave se la ha quedado
+        db.session.rollback()
+        raise APIException(f"La reserva de la {HEADER} caducó mientras se procesaba la petición", 409)
+    with _lock:
+        _stored += 1
+        due = _stored % COMPACT_EVERY == 0
+    if due:
+        compact()
+    db.session.commit()
+
+
+def _release(user_id: int, key: str) -> None:
+    db.session.rollback()
+    table = IdempotencyKey.__table__
+    db.session.execute(delete(table).where(table.c.user_id == user_id, table.c.key == key))
+    db.session.commit()
+
+
+def compact() -> int:
+    """Borra las respuestas caducadas (sin commit). Devuelve cuántas filas se borraron."""
+    ttl = _setting(current_app, "IDEMPOTENCY_TTL", DEFAULT_TTL)
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+    result = db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff),
+                                execution_options={"synchronize_session": False})
+    return result.rowcount
+
+
+def idempotent(fn):
+    """
+    Decorador para los POST de creación. El usuario se toma de auth_payload
+    (token_required) o del user_id de la URL, igual que conditional_get.
+    Uso:
+        @api.route("/events", methods=["POST"])
+        @token_required
+        @idempotent
+        def create_event(auth_payload): ...
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return fn(*args, **kwargs)
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise APIException(f"{HEADER} debe tener entre 1 y {MAX_KEY_LENGTH} caracteres", 400)
+        auth_payload = kwargs.get("auth_payload") or {}
+        user_id = auth_payload.get("user_id", kwargs.get("user_id"))
+        fingerprint = _fingerprint()
+
+        row, claimed_at = _claim(user_id, key, fingerprint)
+        if row is not None:
+            return _replay(row, fingerprint)
+        try:
+            with _deferred_commit():
+                resp = make_response(fn(*args, **kwargs))
+        except Exception:
+            _release(user_id, key)
+            raise
+        if 200 <= resp.status_code < 300 and not resp.is_streamed:
+            _complete(user_id, key, claimed_at, resp)
+        else:
+            _release(user_id, key)
+        return resp
+    return wrapper
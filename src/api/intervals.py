@@ -0,0 +1,99 @@
+"""
+Utilidades de intervalos [inicio, fin) sobre datetimes:
+- merge_intervals: barrido (sweep-line) que une intervalos solapados, O(n log n)
+- free_slots: huecos libres de una duración mínima entre intervalos ocupados
+- IntervalIndex: búsqueda de solapes en memoria (detección de conflictos)
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
+
+
+def merge_intervals(intervals: Iterable[tuple[datetime, datetime]]) -> list[tuple[datetime, datetime]]:
+    """Ordena por inicio y une los intervalos que se solapan o se tocan."""
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def clip(intervals: Iterable[tuple[datetime, datetime]], window_start: datetime,
+         window_end: datetime) -> list[tuple[datetime, datetime]]:
+    """Recorta los intervalos a la ventana y descarta los que quedan fuera."""
+    return [(max(s, window_start), min(e, window_end))
+            for s, e in intervals if s < window_end and e > window_start]
+
+
+def free_slots(busy: list[tuple[datetime, datetime]], window_start: datetime,
+               window_end: datetime, duration: timedelta,
+               step: Optional[timedelta] = None) -> Iterator[tuple[datetime, datetime]]:
+    """
+    Genera huecos libres de `duration` dentro de la ventana, en orden.
+    `busy` debe venir ya unido con merge_intervals. Dentro de un hueco largo
+    se ofrecen huecos consecutivos cada `step` (por defecto, la propia duración).
+    """
+    step = step or duration
+    cursor = window_start
+    for start, end in busy + [(window_end, window_end)]:
+        gap_end = min(start, window_end)
+        while cursor + duration <= gap_end:
+            yield cursor, cursor + duration
+            cursor += step
+        cursor = max(cursor, end)
+        if cursor >= window_end:
+            return
+
+
+class IntervalIndex:
+    """
+    Índice de intervalos sobre un array ordenado por inicio (bisect).
+    Para encontrar los que se solapan con [s, e) basta mirar los que empiezan
+    en [s - duración máxima, e); los intervalos muy largos (más de `long_span`)
+    van aparte para no inflar esa duración máxima. Consulta O(log n + k).
+    """
+
+    def __init__(self, items: Iterable[tuple[datetime, datetime, object]] = (),
+                 long_span: timedelta = timedelta(days=1)):
+        self._long_span = long_span
+        self._starts = []
+        self._items = []
+        self._long = []
+        self._max_span = timedelta(0)
+        for start, end, value in sorted(items, key=lambda t: (t[0], t[1])):
+            self._append(start, end, value)
+
+    def _append(self, start, end, value):
+        span = end - start
+        if span > self._long_span:
+            self._long.append((start, end, value))
+            return
+        self._starts.append(start)
+        self._items.append((start, end, value))
+        self._max_span = max(self._max_span, span)
+
+    def add(self, start: datetime, end: datetime, value: object) -> None:
+        span = end - start
+        if span > self._long_span:
+            self._long.append((start, end, value))
+            return
+        pos = bisect_right(self._starts, start)
+        self._starts.insert(pos, start)
+        self._items.insert(pos, (start, end, value))
+        self._max_span = max(self._max_span, span)
+
+    def overlapping(self, start: datetime, end: datetime) -> list:
+        """Valores de los intervalos que se solapan con [start, end)."""
+        lo = bisect_left(self._starts, start - self._max_span)
+        hi = bisect_left(self._starts, end)
+        found = [v for s, e, v in self._items[lo:hi] if e > start]
+        found.extend(v for s, e, v in self._long if s < end and e > start)
+        return found
+
+    def __len__(self) -> int:
+        return len(self._items) + len(self._long)
@@ -0,0 +1,312 @@
+"""
+Métricas de la API en formato de texto de Prometheus (GET /metrics).
+Por endpoint (regla de URL) y método se registran:
+- http_requests_total{status}            peticiones por código de respuesta
+- http_request_duration_seconds          histograma de latencia
+- http_response_size_bytes               histograma de tamaño de respuesta (si se conoce)
+- http_request_db_statements             histograma de sentencias SQL por petición
+- db_time_seconds_total                  tiempo total en la base de datos
+- http_response_{uncompressed,compressed}_bytes_total{encoding} y
+  compression_cpu_seconds_total{encoding} de compression.py (ratio = comprimido / original)
+Las sentencias y su duración se miden con eventos del engine de SQLAlchemy.
+
+Varios workers de gunicorn: cada proceso vuelca su estado a un fichero JSON en
+METRICS_DIR (como mucho cada SNAPSHOT_INTERVAL segundos, y al terminar) y /metrics suma
+los de todos los procesos vivos más retired.json, donde se acumulan los totales de los
+workers que ya terminaron: al reciclar un worker los contadores no retroceden. Las respuestas en streaming cuentan hasta que empiezan a enviarse.
+Si METRICS_TOKEN está definido, /metrics exige "Authorization: Bearer <METRICS_TOKEN>".
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    import fcntl
+except ImportError:  # sin flock (Windows): el traspaso a retired.json no se serializa
+    fcntl = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SNAPSHOT_INTERVAL = 5.0
+RETIRED = "retired.json"
+
+HISTOGRAMS = {
+    "http_request_duration_seconds": ("Latencia de las peticiones HTTP", LATENCY_BUCKETS),
+    "http_response_size_bytes": ("Tamaño del cuerpo de la respuesta", SIZE_BUCKETS),
+    "http_request_db_statements": ("Sentencias SQL por petición", STATEMENT_BUCKETS),
+}
+
+
+class Metrics:
+    """Contadores e histogramas del proceso actual (seguros entre hilos)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}       # (method, endpoint, status) → n
+        self.db_time = {}        # (method, endpoint) → segundos
+        self.compression = {}    # (method, endpoint, encoding) → [original, comprimido, cpu]
+        # nombre → {(method, endpoint): [n por bucket..., n en +Inf, suma, total]}
+        self.histograms = {name: {} for name in HISTOGRAMS}
+
+    def _observe(self, name: str, key: tuple, value: float) -> None:
+        buckets = HISTOGRAMS[name][1]
+        series = self.histograms[name].get(key)
+        if series is None:
+            series = self.histograms[name][key] = [0] * (len(buckets) + 3)
+        series[bisect_left(buckets, value)] += 1   # el último hueco de buckets es +Inf
+        series[-2] += value
+        series[-1] += 1
+
+    def record(self, method: str, endpoint: str, status: int, duration: float,
+               size, statements: int, db_time: float) -> None:
+        key = (method, endpoint)
+        with self._lock:
+            status_key = (method, endpoint, str(status))
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            self.db_time[key] = self.db_time.get(key, 0.0) + db_time
+            self._observe("http_request_duration_seconds", key, duration)
+            self._observe("http_request_db_statements", key, statements)
+            if size is not None:
+                self._observe("http_response_size_bytes", key, size)
+
+    def record_compression(self, method: str, endpoint: str, encoding: str,
+                           original: int, compressed: int, cpu: float) -> None:
+        key = (method, endpoint, encoding)
+        with self._lock:
+            totals = self.compression.setdefault(key, [0, 0, 0.0])
+            totals[0] += original
+            totals[1] += compressed
+            totals[2] += cpu
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": [[*k, v] for k, v in self.requests.items()],
+                "db_time": [[*k, v] for k, v in self.db_time.items()],
+                "compression": [[*k, list(v)] for k, v in self.compression.items()],
+                "histograms": {name: [[*k, list(v)] for k, v in series.items()]
+                               for name, series in self.histograms.items()},
+            }
+
+
+metrics = Metrics()
+_last_snapshot = 0.0
+_exit_hook = False
+
+
+# ---------- Ficheros por worker ----------
+
+def metrics_dir() -> str:
+    return os.environ.get("METRICS_DIR") or os.path.join(tempfile.gettempdir(), "api-metrics")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _write_json(directory: str, filename: str, data: dict) -> None:
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, os.path.join(directory, filename))
+
+
+def _read_json(path: str):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot() -> None:
+    """Vuelca el estado de este proceso a METRICS_DIR/<pid>.json (escritura atómica)."""
+    global _last_snapshot, _exit_hook
+    directory = metrics_dir()
+    os.makedirs(directory, exist_ok=True)
+    _write_json(directory, f"{os.getpid()}.json", metrics.snapshot())
+    _last_snapshot = time.monotonic()
+    if not _exit_hook:
+        # Último volcado al salir (gunicorn recicla workers con una salida normal)
+        atexit.register(write_snapshot)
+        _exit_hook = True
+
+
+def _empty() -> dict:
+    return {"requests": {}, "db_time": {}, "compression": {},
+            "histograms": {name: {} for name in HISTOGRAMS}}
+
+
+def _fold(totals: dict, data: dict) -> None:
+    """Suma un volcado (formato de Metrics.snapshot) a los acumulados."""
+    for *key, value in data["requests"]:
+        totals["requests"][tuple(key)] = totals["requests"].get(tuple(key), 0) + value
+    for *key, value in data["db_time"]:
+        totals["db_time"][tuple(key)] = totals["db_time"].get(tuple(key), 0.0) + value
+    for *key, values in data.get("compression", []):
+        current = totals["compression"].get(tuple(key), [0, 0, 0.0])
+        totals["compression"][tuple(key)] = [a + b for a, b in zip(current, values)]
+    for name, series in data["histograms"].items():
+        for *key, values in series:
+            current = totals["histograms"][name].get(tuple(key), [0] * len(values))
+            totals["histograms"][name][tuple(key)] = [a + b for a, b in zip(current, values)]
+
+
+def _as_snapshot(totals: dict) -> dict:
+    return {
+        "requests": [[*k, v] for k, v in totals["requests"].items()],
+        "db_time": [[*k, v] for k, v in totals["db_time"].items()],
+        "compression": [[*k, v] for k, v in totals["compression"].items()],
+        "histograms": {name: [[*k, v] for k, v in series.items()]
+                       for name, series in totals["histograms"].items()},
+    }
+
+
+def _retire(directory: str, dead: list) -> None:
+    """
+    Pasa los volcados de procesos muertos a retired.json y los borra. Con flock, un
+    solo proceso a la vez: el que llega después ya no encuentra los ficheros.
+    """
+    with open(os.path.join(directory, ".lock"), "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        found = [os.path.join(directory, f) for f in dead
+                 if os.path.exists(os.path.join(directory, f))]
+        if not found:
+            return
+        totals = _empty()
+        retired = _read_json(os.path.join(directory, RETIRED))
+        if retired is not None:
+            _fold(totals, retired)
+        for path in found:
+            data = _read_json(path)
+            if data is not None:
+                _fold(totals, data)
+        _write_json(directory, RETIRED, _as_snapshot(totals))
+        for path in found:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def merged_snapshots() -> dict:
+    """Suma retired.json y los ficheros de los workers vivos (retirando antes los muertos)."""
+    directory = metrics_dir()
+    names = [f for f in os.listdir(directory) if f.endswith(".json") and f[:-5].isdigit()]
+    dead = [f for f in names if not _pid_alive(int(f[:-5]))]
+    if dead:
+        _retire(directory, dead)
+
+    totals = _empty()
+    for filename in [RETIRED] + [f for f in names if f not in dead]:
+        data = _read_json(os.path.join(directory, filename))
+        if data is not None:
+            _fold(totals, data)
+    return totals
+
+
+# ---------- Formato de texto ----------
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(method: str, endpoint: str, **extra) -> str:
+    pairs = {"method": method, "endpoint": endpoint, **extra}
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in pairs.items())
+
+
+def render(data: dict) -> str:
+    lines = ["# HELP http_requests_total Peticiones HTTP por endpoint, método y estado",
+             "# TYPE http_requests_total counter"]
+    for (method, endpoint, status), value in sorted(data["requests"].items()):
+        lines.append(f"http_requests_total{{{_labels(method, endpoint, status=status)}}} {value}")
+
+    lines += ["# HELP db_time_seconds_total Tiempo total en la base de datos",
+              "# TYPE db_time_seconds_total counter"]
+    for (method, endpoint), value in sorted(data["db_time"].items()):
+        lines.append(f"db_time_seconds_total{{{_labels(method, endpoint)}}} {value:.6f}")
+
+    for index, (name, help_text) in enumerate((
+            ("http_response_uncompressed_bytes_total", "Bytes de las respuestas comprimidas antes de comprimir"),
+            ("http_response_compressed_bytes_total", "Bytes de las respuestas comprimidas tras comprimir"),
+            ("compression_cpu_seconds_total", "Tiempo de CPU dedicado a comprimir respuestas"))):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (method, endpoint, encoding), values in sorted(data.get("compression", {}).items()):
+            value = f"{values[index]:.6f}" if index == 2 else values[index]
+            lines.append(f"{name}{{{_labels(method, endpoint, encoding=encoding)}}} {value}")
+
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (method, endpoint), values in sorted(data["histograms"][name].items()):
+            cumulative = 0
+            for le, count in zip([*buckets, "+Inf"], values[:-2]):
+                cumulative += count
+                lines.append(f"{name}_bucket{{{_labels(method, endpoint, le=le)}}} {cumulative}")
+            lines.append(f"{name}_sum{{{_labels(method, endpoint)}}} {values[-2]:.6f}")
+            lines.append(f"{name}_count{{{_labels(method, endpoint)}}} {values[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------- Integración con Flask / SQLAlchemy ----------
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_start")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    if has_request_context() and "metrics_start" in g:
+        g.metrics_statements += 1
+        g.metrics_db_time += elapsed
+
+
+def setup_metrics(app):
+    @app.before_request
+    def _start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        g.metrics_statements = 0
+        g.metrics_db_time = 0.0
+
+    @app.after_request
+    def _record_request_metrics(response):
+        if "metrics_start" not in g or request.endpoint == "metrics_endpoint":
+            return response
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        size = None if response.is_streamed else response.calculate_content_length()
+        metrics.record(request.method, endpoint, response.status_code,
+                       time.perf_counter() - g.metrics_start, size,
+                       g.metrics_statements, g.metrics_db_time)
+        if time.monotonic() - _last_snapshot >= SNAPSHOT_INTERVAL:
+            write_snapshot()
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics_endpoint():
+        token = os.environ.get("METRICS_TOKEN")
+        if token and request.headers.get("Authorization", "") != f"Bearer {token}":
+            return Response("unauthorized\n", status=401, mimetype="text/plain")
+        write_snapshot()
+        return Response(render(merged_snapshots()),
+                        mimetype="text/plain; version=0.0.4; charset=utf-8")
@@ -1,13 +1,26 @@
+import sqlite3
+
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import String, Boolean, ForeignKey, Integer, DateTime, Text
+from sqlalchemy import (String, Boolean, ForeignKey, Integer, DateTime, Text, Index, event,
+                        false, text)
+from sqlalchemy.engine import Engine
 from datetime import datetime
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from werkzeug.security import generate_password_hash, check_password_hash
+from .hashing import hash_password, verify_password
+from .recurrence import exdates_to_list
 
 db = SQLAlchemy()
 
 
+@event.listens_for(Engine, "connect")
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite solo aplica las claves foráneas (y sus ON DELETE CASCADE) si se activan
+    # en cada conexión; PostgreSQL siempre las aplica
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+
 class User(db.Model):
     __tablename__ = 'user'
 
@@ -29,30 +42,29 @@ class User(db.Model):
         String(255), nullable=True)
     google_access_token: Mapped[str] = mapped_column(
         String(255), nullable=True)
+    # Último número de secuencia de cambios del usuario (ver ChangeLog / changes.py)
+    sync_seq: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default='0')
 
-    # Relaciones
+    # Relaciones. passive_deletes: los hijos los borra la base de datos (ON DELETE
+    # CASCADE); el ORM no los carga para borrarlos uno a uno
     events = relationship("Event", back_populates="user",
-                          cascade="all, delete-orphan")
+                          cascade="all, delete-orphan", passive_deletes=True)
     tasks = relationship("Task", back_populates="user",
-                         cascade="all, delete-orphan")
+                         cascade="all, delete-orphan", passive_deletes=True)
     task_groups = relationship("TaskGroup", back_populates="user",
-                               cascade="all, delete-orphan")
+                               cascade="all, delete-orphan", passive_deletes=True)
 
     calendars = relationship(
-        "Calendar", back_populates="user", cascade="all, delete-orphan")
+        "Calendar", back_populates="user", cascade="all, delete-orphan",
+        passive_deletes=True)
 
-    def set_password(self, password):
-        self.password = generate_password_hash(password)
-
-    def check_password(self, password):
-        return check_password_hash(self.password, password)
-
-    # Helpers de seguridad
+    # Helpers de seguridad (el hash se calcula en el pool de hashing.py)
     def set_password(self, raw_password: str):
-        self.password = generate_password_hash(raw_password)
+        self.password = hash_password(raw_password)
 
     def check_password(self, raw_password: str) -> bool:
-        return check_password_hash(self.password, raw_password)
+        return verify_password(self.password, raw_password)
 
     def serialize(self):
         return {
@@ -70,10 +82,28 @@ class User(db.Model):
 
 class Event(db.Model):
     __tablename__ = 'event'
+    # Índices compuestos para las consultas por rango de la agenda:
+    # el planner elige el que acote más según la ventana pedida.
+    __table_args__ = (
+        Index('ix_event_user_start', 'user_id', 'start_date'),
+        Index('ix_event_user_end', 'user_id', 'end_date'),
+        Index('ix_event_user_recurrence', 'user_id', 'recurrence_rule'),
+        # Eventos anteriores al límite de duración (MAX_EVENT_SPAN): pocos, aparte.
+        # La condición se escribe como la compila SQLAlchemy en cada dialecto, para
+        # que el planner reconozca el índice parcial
+        Index('ix_event_user_long_span', 'user_id', 'start_date',
+              sqlite_where=text('long_span = 1'), postgresql_where=text('long_span')),
+        # Series recurrentes por el fin de su última ocurrencia (None = sin fin)
+        Index('ix_event_user_recurrence_end', 'user_id', 'recurrence_end',
+              sqlite_where=text('recurrence_rule IS NOT NULL'),
+              postgresql_where=text('recurrence_rule IS NOT NULL')),
+        # Reimportar el mismo .ics en un calendario no duplica sus eventos
+        Index('ix_event_calendar_ical_uid', 'calendar_id', 'ical_uid'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey('user.id'), nullable=False)
+        Integer, ForeignKey('user.id', ondelete="CASCADE"), nullable=False)
     calendar_id: Mapped[int] = mapped_column(   # Enlaza con Calendar
         Integer, ForeignKey('calendar.id', ondelete="CASCADE"), nullable=False
     )
@@ -85,7 +115,20 @@ class Event(db.Model):
     color: Mapped[str] = mapped_column(String(50), nullable=True)
     all_day: Mapped[bool] = mapped_column(Boolean, default=False)
     google_event_id: Mapped[str] = mapped_column(String(255), nullable=True)
+    # UID del VEVENT importado (routesIcal); la exportación lo conserva
+    ical_uid: Mapped[str] = mapped_column(String(255), nullable=True)
     status: Mapped[str] = mapped_column(String(50), default="confirmed")
+    # Recurrencia (subconjunto de RRULE, ver recurrence.py). start_date/end_date
+    # son la primera ocurrencia y recurrence_end el fin de la última (None = sin fin).
+    recurrence_rule: Mapped[str] = mapped_column(String(255), nullable=True)
+    recurrence_exdates: Mapped[str] = mapped_column(Text, nullable=True)
+    recurrence_end: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    # True solo en eventos guardados antes del límite MAX_EVENT_SPAN que duran más;
+    # las consultas por rango los buscan aparte (events_in_range)
+    long_span: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, server_default=false())
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
 
     # Relaciones
     user = relationship("User", back_populates="events")
@@ -104,19 +147,24 @@ class Event(db.Model):
             "description": self.description,
             "color": self.color,
             "google_event_id": self.google_event_id,
-            "status": self.status
+            "status": self.status,
+            "recurrence_rule": self.recurrence_rule,
+            "recurrence_exdates": exdates_to_list(self.recurrence_exdates),
         }
 
 
 class Task(db.Model):
     __tablename__ = 'task'
+    __table_args__ = (
+        Index('ix_task_user_date', 'user_id', 'date'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey('user.id'), nullable=False)
+        Integer, ForeignKey('user.id', ondelete="CASCADE"), nullable=False)
     task_group_id: Mapped[int] = mapped_column(
         # Cambiado a nullable True para pruebas
-        Integer, ForeignKey('task_group.id'), nullable=True
+        Integer, ForeignKey('task_group.id', ondelete="CASCADE"), nullable=True
     )
 
     title: Mapped[str] = mapped_column(String(200), nullable=False)
@@ -125,6 +173,11 @@ class Task(db.Model):
         DateTime, nullable=True)  # Cambiado a True para pruebas y deberia ser True por el apartado sinFechas
     recurrencia: Mapped[int] = mapped_column(Integer, default=0)
     color: Mapped[str] = mapped_column(String(50))
+    # Recurrencia a partir de `date` (mismo formato que Event.recurrence_rule)
+    recurrence_rule: Mapped[str] = mapped_column(String(255), nullable=True)
+    recurrence_exdates: Mapped[str] = mapped_column(Text, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
 
     # Relaciones
     user = relationship("User", back_populates="tasks")
@@ -140,7 +193,9 @@ class Task(db.Model):
             "status": self.status,
             "date": self.date.isoformat() if self.date else None,
             "recurrencia": self.recurrencia,
-            "color": self.color
+            "color": self.color,
+            "recurrence_rule": self.recurrence_rule,
+            "recurrence_exdates": exdates_to_list(self.recurrence_exdates),
         }
 
 
@@ -149,20 +204,29 @@ class TaskGroup(db.Model):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey('user.id'), nullable=False)
+        Integer, ForeignKey('user.id', ondelete="CASCADE"), nullable=False)
     title: Mapped[str] = mapped_column(String(200), nullable=False)
     color: Mapped[str] = mapped_column(String(50))
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
 
     user = relationship("User", back_populates="task_groups")
+    # order_by: mismo orden que rowserialize.groups_with_tasks()
     tasks = relationship("Task", back_populates="task_groups",
-                         cascade="all, delete-orphan")
+                         cascade="all, delete-orphan", passive_deletes=True,
+                         order_by="Task.id")
 
-    def serialize_with_tasks(self):
+    def serialize(self):
         return {
             "id": self.id,
             "user_id": self.user_id,
             "title": self.title,
             "color": self.color,
+        }
+
+    def serialize_with_tasks(self):
+        return {
+            **self.serialize(),
             "tasks": [task.serialize() for task in self.tasks]
         }
 
@@ -172,14 +236,16 @@ class Calendar(db.Model):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey('user.id'), nullable=False)
+        Integer, ForeignKey('user.id', ondelete="CASCADE"), nullable=False)
     title: Mapped[str] = mapped_column(String(200), nullable=False)
     color: Mapped[str] = mapped_column(String(50))
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
 
     # Relaciones
     user = relationship("User", back_populates="calendars")
     events = relationship("Event", back_populates="calendar",
-                          cascade="all, delete-orphan")
+                          cascade="all, delete-orphan", passive_deletes=True)
 
     def serialize(self):
         return {
@@ -189,3 +255,63 @@ class Calendar(db.Model):
             "color": self.color
 
         }
+
+
+class ChangeLog(db.Model):
+    """
+    Registro de cambios para la sincronización incremental (GET /api/sync).
+    `seq` es la secuencia por usuario (User.sync_seq) en el momento del cambio;
+    las filas con op="delete" son las lápidas de los borrados.
+    """
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        Index('ix_change_log_user_seq', 'user_id', 'seq'),
+        Index('ix_change_log_entity', 'user_id', 'entity', 'entity_id'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey('user.id', ondelete="CASCADE"), nullable=False)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False)
+    entity: Mapped[str] = mapped_column(String(20), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    op: Mapped[str] = mapped_column(String(10), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False)
+
+
+class DataVersion(db.Model):
+    """
+    Versión de los datos de un usuario por recurso ("event", "task", "task_group",
+    "calendar"). Se actualiza con la secuencia de ChangeLog en cada cambio y sirve
+    para generar los ETag de los listados (ver conditional.py).
+    """
+    __tablename__ = 'data_version'
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey('user.id', ondelete="CASCADE"), primary_key=True)
+    resource: Mapped[str] = mapped_column(String(20), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class IdempotencyKey(db.Model):
+    """
+    Respuesta guardada de un POST con cabecera Idempotency-Key (ver idempotency.py).
+    status_code NULL: la petición original todavía se está procesando.
+    """
+    __tablename__ = 'idempotency_key'
+    __table_args__ = (
+        Index('ix_idempotency_key_user_key', 'user_id', 'key', unique=True),
+        Index('ix_idempotency_key_created', 'created_at'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey('user.id', ondelete="CASCADE"), nullable=False)
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    # sha256 de método, ruta y cuerpo: la misma clave con otra petición es un error
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int] = mapped_column(Integer, nullable=True)
+    body: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,116 @@
+"""
+Paginación por cursor (keyset) y salida JSON en streaming para listados grandes.
+- ?limit=N&cursor=XYZ → página de N elementos; el siguiente cursor va en X-Next-Cursor
+- ?stream=1           → array JSON enviado por trozos desde un cursor de servidor
+"""
+import base64
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Iterable, Optional
+
+from flask import Response, request, stream_with_context, json
+from sqlalchemy import and_, or_
+
+from .utils import APIException
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+STREAM_BATCH = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(value: Optional[datetime], row_id: int) -> str:
+    """Cursor opaco con la última clave (valor, id) devuelta."""
+    raw = f"{value.isoformat() if value else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[Optional[datetime], int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        value, row_id = raw.rsplit("|", 1)
+        return (datetime.fromisoformat(value) if value else None), int(row_id)
+    except Exception:
+        raise APIException("Cursor inválido", 400)
+
+
+def page_args() -> tuple[Optional[int], Optional[str], bool]:
+    """Lee limit, cursor y stream de la query string."""
+    limit_qs = request.args.get("limit")
+    cursor = request.args.get("cursor") or None
+    stream = (request.args.get("stream") or "").lower() in ("1", "true", "yes")
+
+    limit = None
+    if limit_qs is not None or cursor:
+        try:
+            limit = int(limit_qs) if limit_qs is not None else DEFAULT_LIMIT
+        except ValueError:
+            raise APIException("limit debe ser un entero", 400)
+        if limit < 1 or limit > MAX_LIMIT:
+            raise APIException(f"limit debe estar entre 1 y {MAX_LIMIT}", 400)
+    return limit, cursor, stream
+
+
+def keyset_order(q, column, id_column, nullable: bool = False):
+    """Orden estable (column, id); los NULL van al final."""
+    if nullable:
+        return q.order_by(column.asc().nulls_last(), id_column.asc())
+    return q.order_by(column.asc(), id_column.asc())
+
+
+def keyset_filter(q, column, id_column, cursor: Optional[str], nullable: bool = False):
+    """Filtra las filas posteriores al cursor según el orden de keyset_order."""
+    if not cursor:
+        return q
+    value, last_id = decode_cursor(cursor)
+    if value is None:
+        if not nullable:
+            raise APIException("Cursor inválido", 400)
+        return q.filter(and_(column.is_(None), id_column > last_id))
+
+    after = or_(column > value, and_(column == value, id_column > last_id))
+    if nullable:
+        after = or_(after, column.is_(None))
+    return q.filter(after)
+
+
+def paginated_response(items: Iterable, key: Callable, serialize: Callable, limit: int) -> Response:
+    """
+    Devuelve una página como array JSON (misma forma que el listado completo)
+    y el cursor de la siguiente en la cabecera X-Next-Cursor.
+    `items` ya viene ordenado y filtrado por cursor (p. ej. q.limit(limit + 1));
+    `key(obj)` devuelve la tupla (valor, id) del último elemento.
+    """
+    rows = list(islice(items, limit + 1))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    resp = Response(json.dumps([serialize(r) for r in rows]),
+                    mimetype="application/json")
+    if has_more and rows:
+        resp.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+    resp.headers["Access-Control-Expose-Headers"] = NEXT_CURSOR_HEADER
+    return resp
+
+
+def stream_json_array(items: Iterable, serialize: Callable, batch: int = STREAM_BATCH) -> Response:
+    """
+    Emite un array JSON por trozos. Con `q.yield_per(STREAM_BATCH)` como `items`
+    el resultado se lee desde un cursor de servidor y nunca se materializa completo.
+    """
+    def generate():
+        yield "["
+        first = True
+        chunk = []
+        for obj in items:
+            chunk.append(json.dumps(serialize(obj)))
+            if len(chunk) >= batch:
+                yield ("" if first else ",") + ",".join(chunk)
+                first = False
+                chunk = []
+        if chunk:
+            yield ("" if first else ",") + ",".join(chunk)
+        yield "]"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
@@ -0,0 +1,127 @@
+"""
+Borrado por lotes de calendarios y grupos con muchos hijos.
+Con ON DELETE CASCADE, borrar el padre borra sus eventos/tareas en la misma sentencia,
+sin cargarlos en el ORM. Con decenas de miles de hijos eso es una única transacción
+larga que bloquea todas esas filas; purge() los borra en lotes de PURGE_CHUNK filas,
+cada lote en su propia transacción, y al final borra el padre (con su lápida normal).
+
+Mientras dura, el padre sigue existiendo con parte de sus hijos: cada lote anota una
+lápida por hijo (record_changes) en su misma transacción, así que la sincronización
+incremental, los ETag y la caché de respuestas ven cada lote en cuanto se confirma. Si
+el proceso muere a mitad, los clientes tienen los hijos ya borrados fuera y basta con
+repetir el borrado.
+
+En segundo plano (DELETE ...?background=1 → 202) los purgados van a un hilo por proceso,
+de uno en uno; con SQLite en memoria (una sola conexión) se hacen en la propia petición.
+También: `flask purge calendar <id>`.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from flask import current_app
+from sqlalchemy import delete, func, select
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+
+from .changes import record_changes
+from .models import db, Event, Task, TaskGroup, Calendar
+
+DEFAULT_CHUNK = 2000
+# entidad → (modelo padre, modelo hijo, FK del hijo, entidad hijo en ChangeLog)
+PARENTS = {
+    "calendar": (Calendar, Event, Event.calendar_id, "event"),
+    "task_group": (TaskGroup, Task, Task.task_group_id, "task"),
+}
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_pid = None
+_lock = threading.Lock()
+_running = set()
+
+
+def _setting(app, name: str, default):
+    return type(default)(app.config.get(name, os.environ.get(name, default)))
+
+
+def child_count(entity: str, parent_id: int) -> int:
+    _, child, fk, _ = PARENTS[entity]
+    return db.session.scalar(select(func.count()).select_from(child).where(fk == parent_id))
+
+
+def purge(entity: str, parent_id: int, chunk: int = 0) -> int:
+    """
+    Borra los hijos de `parent_id` por lotes y después el padre. Hace commit de cada
+    lote. Devuelve el número de hijos borrados (0 si el padre ya no existe).
+    """
+    parent_model, child, fk, child_entity = PARENTS[entity]
+    chunk = chunk or _setting(current_app, "PURGE_CHUNK", DEFAULT_CHUNK)
+    user_id = db.session.scalar(select(parent_model.user_id).where(parent_model.id == parent_id))
+    if user_id is None:
+        return 0
+
+    deleted = 0
+    while True:
+        # Primero los ids: DELETE ... LIMIT no es portable
+        ids = db.session.scalars(select(child.id).where(fk == parent_id)
+                                 .order_by(child.id).limit(chunk)).all()
+        if not ids:
+            break
+        db.session.execute(delete(child).where(child.id.in_(ids)),
+                           execution_options={"synchronize_session": False})
+        record_changes(user_id, child_entity, ids, "delete")
+        db.session.commit()
+        deleted += len(ids)
+
+    parent = db.session.get(parent_model, parent_id)
+    if parent is not None:
+        db.session.delete(parent)
+        db.session.commit()
+    return deleted
+
+
+def _executor(app):
+    """Un hilo por proceso (tras el fork de gunicorn cada worker crea el suyo)."""
+    global _pool, _pool_pid
+    if isinstance(db.engine.pool, (StaticPool, SingletonThreadPool)):
+        return None
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="purge")
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _run(app, entity: str, parent_id: int) -> int:
+    with app.app_context():
+        try:
+            deleted = purge(entity, parent_id)
+            logger.info("purge %s %s: %d hijos borrados", entity, parent_id, deleted)
+            return deleted
+        except Exception:
+            db.session.rollback()
+            logger.exception("purge %s %s", entity, parent_id)
+            raise
+        finally:
+            db.session.remove()
+            with _lock:
+                _running.discard((entity, parent_id))
+
+
+def purge_in_background(entity: str, parent_id: int) -> Future:
+    """Encola purge(); si ya hay uno en marcha para el mismo padre no se encola otro."""
+    app = current_app._get_current_object()
+    pool = _executor(app)
+    if pool is None:
+        future = Future()
+        future.set_result(purge(entity, parent_id))
+        return future
+    with _lock:
+        if (entity, parent_id) in _running:
+            future = Future()
+            future.set_result(0)
+            return future
+        _running.add((entity, parent_id))
+    return pool.submit(_run, app, entity, parent_id)
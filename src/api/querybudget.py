@@ -0,0 +1,143 @@
+"""
+Presupuesto de consultas SQL por endpoint, para detectar N+1 antes de producción.
+- count_queries(): context manager que anota cada sentencia ejecutada por db.engine
+- run_budgets(): crea una app aislada sobre SQLite en memoria, siembra varios grupos
+  con tareas y calendarios con eventos, llama a cada endpoint de BUDGETS y compara
+  el número de sentencias con su máximo
+Se lanza con `flask check-query-budgets` (termina con código 1 si alguno se pasa).
+El número de consultas no debe depender de cuántos grupos/tareas haya: si una
+relación se carga de forma perezosa el recuento crece con los datos sembrados.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+
+from .models import db, User, Calendar, Event, Task, TaskGroup
+
+SEED_GROUPS = 10
+SEED_TASKS_PER_GROUP = 5
+SEED_EVENTS = 20
+
+# (método, ruta, body, máximo de sentencias). {uid}, {gid} y {cid} se rellenan al sembrar.
+# Las escrituras incluyen las del registro de cambios (UPDATE user + INSERT change_log
+# + UPDATE data_version) que hace changes.py en cada flush.
+BUDGETS = [
+    ("GET", "/api/task-groups", None, 3),
+    ("GET", "/api/task-groups?include=&fields=id,title", None, 2),
+    ("GET", "/api/users/{uid}/groups", None, 3),
+    ("GET", "/api/users/{uid}/groups/{gid}", None, 3),
+    ("GET", "/api/users/{uid}/tasks", None, 2),
+    ("GET", "/api/calendars", None, 2),
+    ("GET", "/api/events?start=2026-01-01&end=2026-02-01", None, 3),
+    ("GET", "/api/sync", None, 5),
+    ("GET", "/api/bootstrap?start=2026-01-01&end=2026-02-01", None, 7),
+    ("POST", "/api/task-groups", {"title": "Nuevo", "color": "#123456"}, 5),
+    ("PUT", "/api/task-groups/{gid}", {"title": "Renombrado"}, 6),
+    ("POST", "/api/users/{uid}/groups", {"title": "Nuevo", "color": "#123456"}, 5),
+    ("PUT", "/api/users/{uid}/groups/{gid}", {"title": "Otra vez"}, 6),
+]
+
+
+@contextmanager
+def count_queries(engine=None):
+    """
+    with count_queries() as statements:
+        ...
+    len(statements) → número de sentencias ejecutadas dentro del bloque
+    """
+    engine = engine or db.engine
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _budget_app(source_app, database_uri: str = "sqlite://", engine_options=None) -> Flask:
+    """
+    App con los mismos blueprints y manejadores de error sobre otra base de datos
+    (por defecto SQLite en memoria). También la usa benchmark.py.
+    """
+    from .routes import api
+    from .routesEvent import apiEvent
+    from .routesTasks import task
+    from .routesLateral import lateral
+
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY=source_app.config["SECRET_KEY"],
+        SQLALCHEMY_DATABASE_URI=database_uri,
+        SQLALCHEMY_ENGINE_OPTIONS=engine_options if engine_options is not None else {
+            "poolclass": StaticPool, "connect_args": {"check_same_thread": False}},
+    )
+    db.init_app(app)
+    for blueprint in (api, apiEvent, task, lateral):
+        app.register_blueprint(blueprint, url_prefix="/api")
+    for exc_class, handler in source_app.error_handler_spec[None][None].items():
+        app.register_error_handler(exc_class, handler)
+    return app
+
+
+def _seed() -> dict:
+    user = User(email="budget@example.com", password="x", name="Budget",
+                display_name="Budget", is_active=True, profile_pic="",
+                last_session=datetime.utcnow())
+    db.session.add(user)
+    db.session.flush()
+
+    groups = [TaskGroup(user_id=user.id, title=f"Grupo {i}", color="#000000")
+              for i in range(SEED_GROUPS)]
+    db.session.add_all(groups)
+    db.session.flush()
+    for group in groups:
+        db.session.add_all(Task(user_id=user.id, task_group_id=group.id, title=f"Tarea {j}",
+                                color="#000000", status=False, recurrencia=0)
+                           for j in range(SEED_TASKS_PER_GROUP))
+
+    cal = Calendar(user_id=user.id, title="Calendario", color="#000000")
+    db.session.add(cal)
+    db.session.flush()
+    start = datetime(2026, 1, 1, 9)
+    db.session.add_all(Event(user_id=user.id, calendar_id=cal.id, title=f"Evento {i}",
+                             start_date=start + timedelta(days=i),
+                             end_date=start + timedelta(days=i, hours=1))
+                       for i in range(SEED_EVENTS))
+    db.session.commit()
+    return {"uid": user.id, "gid": groups[0].id, "cid": cal.id}
+
+
+def run_budgets(source_app) -> list[dict]:
+    """Ejecuta BUDGETS y devuelve [{method, path, status, statements, budget, ok, sql}]."""
+    from .routes import create_token, ensure_active_user
+
+    app = _budget_app(source_app)
+    results = []
+    with app.app_context():
+        db.create_all()
+        ids = _seed()
+        headers = {"Authorization": "Bearer " + create_token({"user_id": ids["uid"]})}
+        # Régimen estable: la comprobación de usuario activo ya está en caché
+        ensure_active_user(ids["uid"])
+        client = app.test_client()
+        engine = db.engine
+        for method, path, body, budget in BUDGETS:
+            path = path.format(**ids)
+            with count_queries(engine) as statements:
+                resp = client.open(path, method=method, json=body, headers=headers)
+            results.append({
+                "method": method, "path": path, "status": resp.status_code,
+                "statements": len(statements), "budget": budget,
+                "ok": resp.status_code < 400 and len(statements) <= budget,
+                "sql": statements,
+            })
+        db.session.remove()
+        engine.dispose()
+    return results
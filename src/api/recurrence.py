@@ -0,0 +1,316 @@
+"""
+Reglas de recurrencia (subconjunto de RRULE, RFC 5545) y expansión perezosa de ocurrencias.
+Formato admitido en `recurrence_rule`:
+  FREQ=DAILY|WEEKLY|MONTHLY;INTERVAL=n;COUNT=n;UNTIL=YYYYMMDD[THHMMSS[Z]];BYDAY=MO,WE
+BYDAY solo se admite con FREQ=WEEKLY. COUNT, INTERVAL y UNTIL están acotados
+(MAX_COUNT, MAX_INTERVAL, MAX_UNTIL_YEARS). Las excepciones (EXDATE) se guardan aparte en
+`recurrence_exdates` como inicios ISO separados por comas.
+"""
+import threading
+from calendar import monthrange
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
+
+from .cache import LRUCache
+
+FREQS = ("DAILY", "WEEKLY", "MONTHLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+# Tope de ocurrencias por expansión (series infinitas sin fin de ventana)
+MAX_OCCURRENCES = 5000
+# Límites de la regla: acotan lo que cuesta calcular el fin de la serie
+MAX_COUNT = 10000
+MAX_INTERVAL = 1000
+MAX_UNTIL_YEARS = 100
+
+
+def _parse_until(value: str) -> datetime:
+    value = value.strip().rstrip("Z")
+    try:
+        if "-" in value:
+            return datetime.fromisoformat(value)
+        if "T" in value:
+            return datetime.strptime(value, "%Y%m%dT%H%M%S")
+        # Solo fecha: incluye todo ese día
+        return datetime.strptime(value, "%Y%m%d").replace(hour=23, minute=59, second=59)
+    except ValueError as e:
+        raise ValueError(f"UNTIL inválido: {value}") from e
+
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    freq: str
+    interval: int = 1
+    count: Optional[int] = None
+    until: Optional[datetime] = None
+    byday: tuple = ()
+
+    @classmethod
+    def parse(cls, text: str) -> "RecurrenceRule":
+        """Parsea una RRULE del subconjunto soportado. Lanza ValueError si no puede."""
+        text = (text or "").strip()
+        if text.upper().startswith("RRULE:"):
+            text = text[6:]
+
+        parts = {}
+        for chunk in text.split(";"):
+            if not chunk.strip():
+                continue
+            if "=" not in chunk:
+                raise ValueError(f"Regla de recurrencia inválida: {chunk}")
+            key, value = chunk.split("=", 1)
+            parts[key.strip().upper()] = value.strip().upper()
+
+        freq = parts.pop("FREQ", None)
+        if freq not in FREQS:
+            raise ValueError("FREQ debe ser DAILY, WEEKLY o MONTHLY")
+
+        try:
+            interval = int(parts.pop("INTERVAL", 1))
+            count = int(parts.pop("COUNT")) if "COUNT" in parts else None
+        except ValueError:
+            raise ValueError("INTERVAL y COUNT deben ser enteros")
+        if interval < 1 or (count is not None and count < 1):
+            raise ValueError("INTERVAL y COUNT deben ser positivos")
+        if interval > MAX_INTERVAL or (count is not None and count > MAX_COUNT):
+            raise ValueError(f"INTERVAL no puede superar {MAX_INTERVAL} ni COUNT {MAX_COUNT}")
+
+        until = _parse_until(parts.pop("UNTIL")) if "UNTIL" in parts else None
+        if until is not None and until.year > datetime.utcnow().year + MAX_UNTIL_YEARS:
+            raise ValueError(f"UNTIL no puede estar a más de {MAX_UNTIL_YEARS} años")
+        if count is not None and until is not None:
+            raise ValueError("COUNT y UNTIL no pueden usarse a la vez")
+
+        byday = ()
+        if "BYDAY" in parts:
+            if freq != "WEEKLY":
+                raise ValueError("BYDAY solo se admite con FREQ=WEEKLY")
+            days = [d.strip() for d in parts.pop("BYDAY").split(",") if d.strip()]
+            if not days or any(d not in WEEKDAYS for d in days):
+                raise ValueError("BYDAY debe ser una lista de MO,TU,WE,TH,FR,SA,SU")
+            byday = tuple(sorted({WEEKDAYS.index(d) for d in days}))
+
+        if parts:
+            raise ValueError(
+                f"Parámetros de recurrencia no soportados: {', '.join(sorted(parts))}")
+        return cls(freq, interval, count, until, byday)
+
+    def __str__(self) -> str:
+        chunks = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            chunks.append(f"INTERVAL={self.interval}")
+        if self.count is not None:
+            chunks.append(f"COUNT={self.count}")
+        if self.until is not None:
+            chunks.append(f"UNTIL={self.until.strftime('%Y%m%dT%H%M%S')}")
+        if self.byday:
+            chunks.append("BYDAY=" + ",".join(WEEKDAYS[d] for d in self.byday))
+        return ";".join(chunks)
+
+
+# ---------- Excepciones (EXDATE) ----------
+
+def parse_exdates(text: Optional[str]) -> frozenset:
+    if not text:
+        return frozenset()
+    return frozenset(datetime.fromisoformat(v) for v in text.split(",") if v)
+
+
+def format_exdates(values: Iterable) -> Optional[str]:
+    """Normaliza una lista de fechas ISO (str o datetime) al formato almacenado."""
+    parsed = set()
+    for v in values or ():
+        if isinstance(v, datetime):
+            parsed.add(v)
+            continue
+        v = (v or "").strip().replace(" ", "T")
+        if not v:
+            continue
+        if "T" not in v:
+            v = f"{v}T00:00:00"
+        try:
+            parsed.add(datetime.fromisoformat(v))
+        except ValueError as e:
+            raise ValueError(f"Fecha de excepción inválida: {v}") from e
+    return ",".join(d.isoformat() for d in sorted(parsed)) or None
+
+
+def exdates_to_list(text: Optional[str]) -> list:
+    return [v for v in (text or "").split(",") if v]
+
+
+# ---------- Expansión ----------
+
+def _iter_starts(rule: RecurrenceRule, dtstart: datetime,
+                 not_before: Optional[datetime] = None) -> Iterator[tuple[int, datetime]]:
+    """
+    Genera (índice, inicio) de cada ocurrencia en orden. Para DAILY y WEEKLY
+    salta aritméticamente hasta `not_before` en vez de recorrer desde dtstart.
+    """
+    if rule.freq == "DAILY" or (rule.freq == "WEEKLY" and not rule.byday):
+        step = timedelta(days=rule.interval * (7 if rule.freq == "WEEKLY" else 1))
+        k = 0
+        if not_before is not None and not_before > dtstart:
+            k = (not_before - dtstart) // step
+        while True:
+            yield k, dtstart + k * step
+            k += 1
+
+    elif rule.freq == "WEEKLY":
+        week0 = dtstart - timedelta(days=dtstart.weekday())
+        first_week = [d for d in rule.byday if d >= dtstart.weekday()]
+        period = timedelta(weeks=rule.interval)
+        w = 0
+        if not_before is not None and not_before > week0:
+            w = (not_before - week0) // period
+        idx = len(first_week) + (w - 1) * len(rule.byday) if w > 0 else 0
+        while True:
+            base = week0 + w * period
+            for d in (first_week if w == 0 else rule.byday):
+                yield idx, base + timedelta(days=d)
+                idx += 1
+            w += 1
+
+    else:  # MONTHLY: mismo día del mes; los meses sin ese día se saltan (RFC 5545)
+        k = idx = 0
+        while True:
+            month0 = dtstart.month - 1 + k * rule.interval
+            year, month = dtstart.year + month0 // 12, month0 % 12 + 1
+            if year > 9999:
+                return
+            if dtstart.day <= monthrange(year, month)[1]:
+                yield idx, dtstart.replace(year=year, month=month)
+                idx += 1
+            k += 1
+
+
+def occurrences(rule: RecurrenceRule, dtstart: datetime,
+                not_before: Optional[datetime] = None) -> Iterator[datetime]:
+    """Inicios de la serie (sin aplicar excepciones), respetando COUNT/UNTIL."""
+    for idx, start in _iter_starts(rule, dtstart, not_before):
+        if rule.count is not None and idx >= rule.count:
+            return
+        if rule.until is not None and start > rule.until:
+            return
+        yield start
+
+
+def expand(rule: RecurrenceRule, dtstart: datetime, duration: timedelta,
+           window_start: Optional[datetime] = None, window_end: Optional[datetime] = None,
+           exdates: frozenset = frozenset()) -> Iterator[tuple[datetime, datetime]]:
+    """Genera perezosamente (inicio, fin) de las ocurrencias que se solapan con la ventana."""
+    # Sin cota si la resta se saldría de datetime (ventanas que empiezan en el año 1)
+    not_before = None
+    if window_start is not None and window_start - datetime.min > duration:
+        not_before = window_start - duration
+    produced = 0
+    for start in occurrences(rule, dtstart, not_before):
+        if window_end is not None and start >= window_end:
+            return
+        end = start + duration
+        if window_start is not None and end <= window_start:
+            continue
+        if start in exdates:
+            continue
+        yield start, end
+        produced += 1
+        if produced >= MAX_OCCURRENCES:
+            return
+
+
+def _last_start(rule: RecurrenceRule, dtstart: datetime) -> datetime:
+    """
+    Inicio de la última ocurrencia de una serie con COUNT o UNTIL (dtstart si no tiene
+    ninguna). Sin BYDAY se calcula directamente; con BYDAY se recorre, acotado por
+    MAX_COUNT / MAX_UNTIL_YEARS.
+    """
+    if rule.freq == "DAILY" or (rule.freq == "WEEKLY" and not rule.byday):
+        step = timedelta(days=rule.interval * (7 if rule.freq == "WEEKLY" else 1))
+        if rule.count is not None:
+            return dtstart + (rule.count - 1) * step
+        if rule.until < dtstart:
+            return dtstart
+        return dtstart + ((rule.until - dtstart) // step) * step
+
+    if rule.freq == "MONTHLY" and (rule.until is not None or dtstart.day <= 28):
+        # Hasta el día 28 ningún mes se salta: la ocurrencia n está n*INTERVAL meses después
+        if rule.count is not None:
+            k = rule.count - 1
+        else:
+            if rule.until < dtstart:
+                return dtstart
+            k = ((rule.until.year - dtstart.year) * 12
+                 + rule.until.month - dtstart.month) // rule.interval
+        # Con UNTIL se retrocede hasta un mes que tenga ese día y no pase de UNTIL
+        while k > 0:
+            month0 = dtstart.month - 1 + k * rule.interval
+            year, month = dtstart.year + month0 // 12, month0 % 12 + 1
+            if year > 9999:
+                raise OverflowError("fecha fuera de rango")
+            if dtstart.day <= monthrange(year, month)[1]:
+                start = dtstart.replace(year=year, month=month)
+                if rule.until is None or start <= rule.until:
+                    return start
+            k -= 1
+        return dtstart
+
+    last = dtstart
+    for last in occurrences(rule, dtstart):
+        pass
+    return last
+
+
+def series_end(rule: RecurrenceRule, dtstart: datetime, duration: timedelta) -> Optional[datetime]:
+    """
+    Fin de la última ocurrencia, o None si la serie no termina.
+    Lanza ValueError si la serie acaba fuera del rango de fechas representable.
+    """
+    if rule.count is None and rule.until is None:
+        return None
+    try:
+        return _last_start(rule, dtstart) + duration
+    except OverflowError:
+        raise ValueError("La serie de recurrencia termina fuera del rango de fechas admitido")
+
+
+# ---------- Caché de ventanas expandidas ----------
+
+class OccurrenceCache:
+    """
+    LRU de ventanas ya expandidas por objeto recurrente: (tipo, id) → {(regla, ventana): ocurrencias}.
+    La clave interna incluye la regla, el inicio y las excepciones, así que una edición
+    hecha desde otro proceso nunca sirve datos viejos; `invalidate` libera la entrada al editar.
+    """
+
+    def __init__(self, maxsize: int = 2048, windows_per_item: int = 16):
+        self._lru = LRUCache(maxsize)
+        self._windows_per_item = windows_per_item
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, obj_id: int, rule_text: str, exdates_text: Optional[str],
+            dtstart: datetime, duration: timedelta,
+            window_start: Optional[datetime], window_end: Optional[datetime]) -> tuple:
+        key = (rule_text, exdates_text, dtstart, duration, window_start, window_end)
+        windows = self._lru.get((kind, obj_id))
+        if windows is not None and key in windows:
+            return windows[key]
+
+        rule = RecurrenceRule.parse(rule_text)
+        result = tuple(expand(rule, dtstart, duration, window_start, window_end,
+                              parse_exdates(exdates_text)))
+        with self._lock:
+            windows = self._lru.get((kind, obj_id)) or {}
+            if len(windows) >= self._windows_per_item:
+                windows.pop(next(iter(windows)))
+            windows[key] = result
+            self._lru.set((kind, obj_id), windows)
+        return result
+
+    def invalidate(self, kind: str, obj_id: int) -> None:
+        self._lru.delete((kind, obj_id))
+
+    def stats(self) -> dict:
+        return self._lru.stats()
+
+
+occurrence_cache = OccurrenceCache()
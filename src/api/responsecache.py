@@ -0,0 +1,160 @@
+"""
+Caché de respuestas JSON serializadas para listados que cambian poco (calendarios, grupos).
+Se activa con conditional_get(..., cache=True): la clave es el ETag, que ya combina
+usuario, ruta + query string y la versión (DataVersion) de cada recurso del listado.
+
+Invalidación: las versiones son contadores de generación que changes.py sube en la
+misma transacción que cualquier escritura (rutas de eventos, calendarios, grupos,
+tareas, batch, importación...). Una escritura cambia la clave, así que una entrada
+antigua no se vuelve a leer nunca; solo ocupa sitio hasta que la echan el LRU o el TTL.
+Como las versiones viven en la base de datos, es correcto con varios workers aunque
+cada uno tenga su propia caché. Las versiones se leen antes que los datos, así que
+una entrada nunca contiene datos más antiguos que su clave.
+
+Backends (RESPONSE_CACHE en app.config o entorno):
+- "memory" (por defecto)  LRU por proceso
+- "sqlite"                fichero compartido por todos los workers de la máquina
+                          (RESPONSE_CACHE_PATH); un fallo del fichero cuenta como fallo de caché
+- "off"                   sin caché
+RESPONSE_CACHE_SIZE (entradas), RESPONSE_CACHE_TTL (segundos) y RESPONSE_CACHE_MAX_BODY
+(bytes; las respuestas mayores no se guardan).
+"""
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from flask import current_app
+
+from .cache import LRUCache
+
+DEFAULT_SIZE = 2048
+DEFAULT_TTL = 300
+DEFAULT_MAX_BODY = 256 * 1024
+# Cada cuántas escrituras se purgan caducadas y sobrantes en el backend SQLite
+PRUNE_EVERY = 200
+# Resolución del "último acceso" para el LRU de SQLite (evita una escritura por acierto)
+TOUCH_INTERVAL = 30
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = LRUCache(maxsize, ttl=ttl)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    def set(self, key: str, body: bytes) -> None:
+        self._cache.set(key, body)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class SQLiteBackend:
+    """LRU aproximado con TTL en un fichero SQLite (modo WAL), una conexión por hilo."""
+
+    def __init__(self, path: str, maxsize: int, ttl: float):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS response_cache ("
+                         "key TEXT PRIMARY KEY, body BLOB NOT NULL, "
+                         "expires REAL NOT NULL, accessed REAL NOT NULL)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT body, accessed FROM response_cache "
+                               "WHERE key = ? AND expires > ?", (key, now)).fetchone()
+            if row and now - row[1] > TOUCH_INTERVAL:
+                conn.execute("UPDATE response_cache SET accessed = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning("response cache (sqlite) get: %s", e)
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def set(self, key: str, body: bytes) -> None:
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute("INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?)",
+                         (key, body, now + self.ttl, now))
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._prune(conn, now)
+        except sqlite3.Error as e:
+            logger.warning("response cache (sqlite) set: %s", e)
+
+    def _prune(self, conn, now: float) -> None:
+        conn.execute("DELETE FROM response_cache WHERE expires <= ?", (now,))
+        conn.execute("DELETE FROM response_cache WHERE key IN ("
+                     "SELECT key FROM response_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                     (self.maxsize,))
+
+    def clear(self) -> None:
+        try:
+            self._conn().execute("DELETE FROM response_cache")
+        except sqlite3.Error as e:
+            logger.warning("response cache (sqlite) clear: %s", e)
+
+    def stats(self) -> dict:
+        try:
+            size = self._conn().execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        return {"backend": "sqlite", "path": self.path, "size": size, "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses}
+
+
+def _setting(app, name: str, default):
+    return type(default)(app.config.get(name, os.environ.get(name, default)))
+
+
+def response_cache():
+    """Backend configurado para la app actual (se crea la primera vez), o None si está desactivado."""
+    app = current_app
+    if "response_cache" not in app.extensions:
+        kind = str(_setting(app, "RESPONSE_CACHE", "memory")).lower()
+        size = _setting(app, "RESPONSE_CACHE_SIZE", DEFAULT_SIZE)
+        ttl = _setting(app, "RESPONSE_CACHE_TTL", float(DEFAULT_TTL))
+        if kind == "sqlite":
+            path = _setting(app, "RESPONSE_CACHE_PATH",
+                            os.path.join(tempfile.gettempdir(), "api-response-cache.sqlite3"))
+            backend = SQLiteBackend(path, size, ttl)
+        elif kind in ("off", "0", "false", "no"):
+            backend = None
+        else:
+            backend = MemoryBackend(size, ttl)
+        app.extensions["response_cache"] = backend
+    return app.extensions["response_cache"]
+
+
+def max_body() -> int:
+    return _setting(current_app, "RESPONSE_CACHE_MAX_BODY", DEFAULT_MAX_BODY)
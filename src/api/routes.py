@@ -1,23 +1,43 @@
 """
 API routes with secure password hashing and signed tokens (no extra installs).
 """
-from flask import request, jsonify, Blueprint, current_app
+from flask import request, jsonify, Blueprint, current_app, g
 from api.models import db, User
 from api.utils import APIException
-from werkzeug.security import check_password_hash
+from sqlalchemy import select
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 from functools import wraps
 from datetime import datetime   # ⬅️ agregado para last_session
+import hashlib
+import time
+from api.cache import LRUCache
+from api.hashing import needs_rehash
+from api.timing import timed
 
 api = Blueprint('api', __name__)
 
 # ------------------- Helpers -------------------
 
+# Tokens ya verificados: clave = sha256 del token, valor = (payload, emitido_en).
+# Evita recalcular HMAC + JSON en cada petición de un cliente que sondea varias rutas.
+TOKEN_CACHE_TTL = 60
+token_cache = LRUCache(maxsize=4096, ttl=TOKEN_CACHE_TTL)
+# user_id → is_active, para no consultar en cada petición si el usuario sigue activo.
+# Un usuario desactivado deja de poder usar su token como mucho ACTIVE_USER_TTL segundos después.
+ACTIVE_USER_TTL = 30
+active_user_cache = LRUCache(maxsize=4096, ttl=ACTIVE_USER_TTL)
+
 def _get_serializer():
     secret = current_app.config.get("SECRET_KEY")
     if not secret:
         raise RuntimeError("SECRET_KEY is missing; set FLASK_APP_KEY or app.config['SECRET_KEY']")
-    return URLSafeTimedSerializer(secret, salt="auth-token")
+    # Un serializer por app y secreto; si cambia el secreto se descartan los tokens cacheados
+    cached = current_app.extensions.get("auth_serializer")
+    if cached is None or cached[0] != secret:
+        cached = (secret, URLSafeTimedSerializer(secret, salt="auth-token"))
+        current_app.extensions["auth_serializer"] = cached
+        token_cache.clear()
+    return cached[1]
 
 def create_token(payload: dict) -> str:
     s = _get_serializer()
@@ -25,14 +45,57 @@ def create_token(payload: dict) -> str:
 
 def verify_token(token: str, max_age_seconds: int = 60 * 60 * 24) -> dict:
     s = _get_serializer()
+    key = hashlib.sha256(token.encode()).digest()
+    cached = token_cache.get(key)
+    if cached is not None:
+        payload, issued_at = cached
+        if time.time() - issued_at <= max_age_seconds:
+            return dict(payload)
     try:
-        return s.loads(token, max_age=max_age_seconds)
+        payload, signed_at = s.loads(token, max_age=max_age_seconds, return_timestamp=True)
     except SignatureExpired:
         raise APIException("Token expirado", 401)
     except BadSignature:
         raise APIException("Token inválido", 401)
+    issued_at = signed_at.timestamp()
+    # Nunca se guarda más allá de la caducidad del propio token
+    remaining = max_age_seconds - (time.time() - issued_at)
+    if remaining > 0:
+        token_cache.set(key, (payload, issued_at), ttl=min(TOKEN_CACHE_TTL, remaining))
+    return dict(payload)
+
+def load_current_user(user_id: int) -> User:
+    """
+    Usuario autenticado, cargado una sola vez por petición en g.current_user.
+    session.get usa el identity map: si otra parte de la petición ya lo cargó no hay consulta.
+    """
+    user = g.get("current_user")
+    if user is None or user.id != user_id:
+        user = db.session.get(User, user_id)
+        if not user or not user.is_active:
+            active_user_cache.delete(user_id)
+            raise APIException("Usuario no encontrado o inactivo", 401)
+        active_user_cache.set(user_id, True)
+        g.current_user = user
+    return user
+
+def ensure_active_user(user_id: int) -> None:
+    """Comprueba que el usuario del token existe y está activo (con caché entre peticiones)."""
+    if active_user_cache.get(user_id):
+        return
+    is_active = db.session.execute(select(User.is_active).where(User.id == user_id)).scalar()
+    if not is_active:
+        raise APIException("Usuario no encontrado o inactivo", 401)
+    active_user_cache.set(user_id, True)
+
+def token_required(fn=None, *, load_user: bool = False):
+    """
+    @token_required                   → auth_payload verificado y usuario activo
+    @token_required(load_user=True)   → además carga el User en g.current_user
+    """
+    if fn is None:
+        return lambda f: token_required(f, load_user=load_user)
 
-def token_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
         auth = request.headers.get("Authorization", "")
@@ -40,7 +103,12 @@ def token_required(fn):
         if len(parts) != 2 or parts[0].lower() != "bearer":
             raise APIException("Falta header Authorization Bearer", 401)
         token = parts[1]
-        payload = verify_token(token)
+        with timed("auth"):
+            payload = verify_token(token)
+            if load_user:
+                load_current_user(payload.get("user_id"))
+            else:
+                ensure_active_user(payload.get("user_id"))
         kwargs["auth_payload"] = payload
         return fn(*args, **kwargs)
     return wrapper
@@ -132,9 +200,14 @@ def login():
         raise APIException("Email y contraseña son requeridos", 400)
 
     user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.password, password):
+    if not user or not user.check_password(password):
         raise APIException("Credenciales inválidas", 401)
 
+    # Si cambió PASSWORD_HASH_METHOD, se aprovecha que tenemos la contraseña en claro
+    if needs_rehash(user.password):
+        user.set_password(password)
+        db.session.commit()
+
     token = create_token({"user_id": user.id, "email": user.email})
 
     return jsonify({
@@ -146,13 +219,16 @@ def login():
 # ------------------- Ruta protegida -------------------
 
 @api.route('/profile', methods=['GET'])
-@token_required
+@token_required(load_user=True)
 def profile(auth_payload):
-    user_id = auth_payload.get("user_id")
-    user = User.query.get(user_id)
-    if not user:
-        raise APIException("Usuario no encontrado", 404)
-    return jsonify({"user": user_to_public(user)}), 200
+    return jsonify({"user": user_to_public(g.current_user)}), 200
+
+
+@api.route('/auth/token-cache', methods=['GET'])
+@token_required
+def token_cache_stats(auth_payload):
+    """Aciertos/fallos de la caché de tokens verificados de este proceso."""
+    return jsonify({"token_cache": token_cache.stats()}), 200
 
 
 # ------------------- Recuperación de contraseña -------------------
@@ -0,0 +1,347 @@
+"""
+Mutaciones por lotes de eventos, tareas y grupos de tareas:
+- OPTIONS /api/batch → preflight CORS
+- POST    /api/batch → aplica creates/updates/deletes en una sola transacción
+
+Body JSON:
+{
+  "atomic": false,
+  "operations": [
+    {"op": "create", "type": "event", "data": {"title": "Clase", "start": "...", "end": "...", "calendar_id": 1}},
+    {"op": "update", "type": "task", "id": 12, "data": {"status": true}},
+    {"op": "delete", "type": "task_group", "id": 3}
+  ]
+}
+Respuesta 200 con un resultado por operación, en el mismo orden:
+{"results": [{"index": 0, "status": 201, "data": {...}}, {"index": 2, "status": 404, "error": "..."}]}
+Con "atomic": true, si alguna operación falla no se aplica ninguna (400).
+Crear o actualizar una tarea de un grupo que el mismo lote borra falla con 409.
+Un campo obligatorio que falta o queda a null (calendar_id de un evento, color de una
+tarea...) o un calendar_id/task_group_id que no es un entero falla solo en su operación (400).
+Con "check_conflicts": true los eventos que se solapen con otros (o con los del
+propio lote) fallan con 409 y la lista de "conflicts"; ver ConflictChecker.
+"""
+from datetime import datetime
+
+from flask import request, jsonify
+from sqlalchemy import delete
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .models import db, Event, Task, TaskGroup, Calendar
+from .routes import api, token_required
+from .routesEvent import (event_from_payload, event_changes_from_payload, event_preview,
+                          conflict_options, ConflictChecker)
+from .routesTasks import task_recurrence_changes
+from .recurrence import occurrence_cache
+from .changes import record_changes
+from .idempotency import idempotent
+from .utils import APIException
+
+MAX_OPERATIONS = 1000
+OPS = ("create", "update", "delete")
+MODELS = {"event": Event, "task": Task, "task_group": TaskGroup}
+# Padre que se puede indicar en data: tipo → (campo, filas de _load_owned, error si no es del usuario)
+PARENTS = {
+    "event": ("calendar_id", "calendar", "El grupo no existe o no pertenece al usuario"),
+    "task": ("task_group_id", "task_group", "Grupo no encontrado"),
+}
+
+
+# ---------- Helpers ----------
+
+def _parse_task_date(value):
+    if value is None or value == "":
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise APIException("Formato de fecha inválido, debe ser ISO", 400)
+
+
+def _task_from_payload(data: dict, user_id: int) -> Task:
+    title = data.get("title")
+    if not title:
+        raise APIException("Falta el campo 'title'", 400)
+    return Task(
+        user_id=user_id,
+        title=title,
+        status=bool(data.get("status", False)),
+        date=_parse_task_date(data.get("date")),
+        recurrencia=data.get("recurrencia"),
+        color=data.get("color"),
+        task_group_id=data.get("task_group_id"),
+        **_task_recurrence(data),
+    )
+
+
+def _task_changes_from_payload(task: Task, data: dict) -> dict:
+    changes = {}
+    if "title" in data:
+        if not data.get("title"):
+            raise APIException("El título no puede estar vacío", 400)
+        changes["title"] = data.get("title")
+    if "status" in data:
+        changes["status"] = bool(data.get("status"))
+    if "date" in data:
+        changes["date"] = _parse_task_date(data.get("date"))
+    for field in ("recurrencia", "color", "task_group_id"):
+        if field in data:
+            changes[field] = data.get(field)
+    changes.update(_task_recurrence(data))
+    return changes
+
+
+def _task_recurrence(data: dict) -> dict:
+    try:
+        return task_recurrence_changes(data)
+    except ValueError as e:
+        raise APIException(str(e), 400)
+
+
+def _group_from_payload(data: dict, user_id: int) -> TaskGroup:
+    title = (data.get("title") or "").strip()
+    if not title:
+        raise APIException("El título es requerido", 400)
+    # tasks=[] deja la colección cargada y evita un SELECT al serializar
+    return TaskGroup(user_id=user_id, title=title,
+                     color=(data.get("color") or "").strip() or None, tasks=[])
+
+
+def _group_changes_from_payload(group: TaskGroup, data: dict) -> dict:
+    changes = {}
+    if "title" in data:
+        title = (data.get("title") or "").strip()
+        if not title:
+            raise APIException("El título no puede estar vacío", 400)
+        changes["title"] = title
+    if "color" in data:
+        changes["color"] = (data.get("color") or "").strip() or None
+    return changes
+
+
+def _serialize(obj):
+    if isinstance(obj, TaskGroup):
+        return obj.serialize_with_tasks()
+    return obj.serialize()
+
+
+def _is_id(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _parent_id(kind: str, payload: dict):
+    """
+    Id del padre que trae data (None si no trae). Se valida por operación: un id que
+    no es entero no se puede buscar entre las filas del usuario.
+    """
+    if kind not in PARENTS:
+        return None
+    value = payload.get(PARENTS[kind][0])
+    if value is not None and not _is_id(value):
+        raise APIException(f"{PARENTS[kind][0]} debe ser un id entero", 400)
+    return value
+
+
+def _check_required(model, values: dict) -> None:
+    """
+    Columnas NOT NULL sin valor por defecto que `values` deja a NULL (p. ej. un evento
+    sin calendar_id). Se comprueba por operación: en el flush único fallaría todo el lote.
+    """
+    for column in model.__table__.columns:
+        if column.nullable or column.primary_key or column.default is not None \
+                or column.server_default is not None:
+            continue
+        if column.key in values and values[column.key] is None:
+            raise APIException(f"Falta el campo '{column.key}'", 400)
+
+
+def _parse_operations(data: dict) -> list:
+    operations = data.get("operations")
+    if not isinstance(operations, list) or not operations:
+        raise APIException("operations debe ser una lista no vacía", 400)
+    if len(operations) > MAX_OPERATIONS:
+        raise APIException(
+            f"Máximo {MAX_OPERATIONS} operaciones por lote", 400)
+
+    for i, op in enumerate(operations):
+        if not isinstance(op, dict):
+            raise APIException(f"Operación {i}: formato inválido", 400)
+        if op.get("op") not in OPS:
+            raise APIException(
+                f"Operación {i}: op debe ser create, update o delete", 400)
+        if op.get("type") not in MODELS:
+            raise APIException(
+                f"Operación {i}: type debe ser event, task o task_group", 400)
+        if op["op"] != "create" and not isinstance(op.get("id"), int):
+            raise APIException(f"Operación {i}: id es requerido", 400)
+        if op["op"] != "delete" and not isinstance(op.get("data", {}), dict):
+            raise APIException(f"Operación {i}: data debe ser un objeto", 400)
+    return operations
+
+
+def _load_owned(operations: list, user_id: int) -> dict:
+    """
+    Carga con una sola consulta IN por tipo todas las filas que el lote
+    referencia (por id o como calendar_id / task_group_id) y que pertenecen al usuario.
+    """
+    ids = {name: set() for name in MODELS}
+    calendar_ids = set()
+    for op in operations:
+        data = op.get("data") or {}
+        if op["op"] != "create":
+            ids[op["type"]].add(op["id"])
+        if op["type"] in PARENTS:
+            field, parent, _ = PARENTS[op["type"]]
+            # Los que no son enteros fallan en su operación (_parent_id)
+            if _is_id(data.get(field)):
+                (calendar_ids if parent == "calendar" else ids[parent]).add(data[field])
+
+    queries = {
+        "event": (Event, Event.query),
+        "task": (Task, Task.query),
+        "task_group": (TaskGroup, TaskGroup.query.options(selectinload(TaskGroup.tasks))),
+        "calendar": (Calendar, Calendar.query),
+    }
+    wanted = dict(ids, calendar=calendar_ids)
+    owned = {}
+    for name, (model, query) in queries.items():
+        owned[name] = {}
+        if wanted[name]:
+            rows = query.filter(model.user_id == user_id, model.id.in_(wanted[name])).all()
+            owned[name] = {row.id: row for row in rows}
+    return owned
+
+
+# ---------- Endpoints ----------
+
+@api.route("/batch", methods=["OPTIONS"])
+def batch_options():
+    return ("", 204)
+
+
+@api.route("/batch", methods=["POST"])
+@token_required
+@idempotent
+def apply_batch(auth_payload):
+    user_id = auth_payload.get("user_id")
+    data = request.get_json() or {}
+    atomic = bool(data.get("atomic"))
+    check_conflicts, conflict_scope = conflict_options(data)
+    operations = _parse_operations(data)
+    owned = _load_owned(operations, user_id)
+
+    results = [None] * len(operations)
+    touched = {}      # index → objeto creado/actualizado, para serializar tras el flush
+    to_delete = {name: set() for name in MODELS}
+    pending_events = []   # (index, evento, cambios) a aplicar tras comprobar conflictos
+
+    for i, op in enumerate(operations):
+        kind, action = op["type"], op["op"]
+        payload = op.get("data") or {}
+        try:
+            if action != "create":
+                obj = owned[kind].get(op["id"])
+                if obj is None or op["id"] in to_delete[kind]:
+                    raise APIException("No existe o no pertenece al usuario", 404)
+
+            parent_id = _parent_id(kind, payload)
+            if parent_id is not None and parent_id not in owned[PARENTS[kind][1]]:
+                raise APIException(PARENTS[kind][2], 404)
+
+            if action == "create":
+                builder = {"event": event_from_payload, "task": _task_from_payload,
+                           "task_group": _group_from_payload}[kind]
+                obj = builder(payload, user_id)
+                _check_required(MODELS[kind], {column.key: getattr(obj, column.key)
+                                               for column in MODELS[kind].__table__.columns})
+                results[i] = {"index": i, "status": 201}
+                if kind == "event" and check_conflicts:
+                    pending_events.append((i, obj, None))
+                    continue
+                db.session.add(obj)
+                touched[i] = obj
+            elif action == "update":
+                changes = {"event": event_changes_from_payload, "task": _task_changes_from_payload,
+                           "task_group": _group_changes_from_payload}[kind](obj, payload)
+                _check_required(MODELS[kind], changes)
+                occurrence_cache.invalidate(kind, obj.id)
+                results[i] = {"index": i, "status": 200}
+                if kind == "event" and check_conflicts:
+                    pending_events.append((i, obj, changes))
+                    continue
+                for attr, value in changes.items():
+                    setattr(obj, attr, value)
+                touched[i] = obj
+            else:
+                # Se borra con un DELETE masivo; lo sacamos de la sesión para
+                # que un update previo del mismo lote no se intente aplicar.
+                if kind == "task_group":
+                    # Sin sus tareas: el expunge en cascada se llevaría también las que
+                    # el lote mueve a otro grupo
+                    set_committed_value(obj, "tasks", [])
+                db.session.expunge(obj)
+                occurrence_cache.invalidate(kind, obj.id)
+                to_delete[kind].add(obj.id)
+                results[i] = {"index": i, "status": 200, "data": {"id": obj.id}}
+        except APIException as e:
+            results[i] = {"index": i, "status": e.status_code, "error": e.message}
+
+    # Una tarea creada o actualizada en un grupo que el lote borra desaparecería con el
+    # ON DELETE CASCADE: se rechaza en lugar de devolver datos de una fila borrada
+    if to_delete["task_group"]:
+        for i, obj in list(touched.items()):
+            if isinstance(obj, Task) and obj.task_group_id in to_delete["task_group"]:
+                db.session.expunge(obj)
+                del touched[i]
+                results[i] = {"index": i, "status": 409,
+                              "error": "El grupo de la tarea se borra en este mismo lote"}
+
+    if pending_events:
+        # Un único índice en memoria para todos los eventos del lote
+        previews = [obj if changes is None else event_preview(obj, changes)
+                    for _, obj, changes in pending_events]
+        # Los eventos actualizados siguen en el índice con su rango guardado hasta que
+        # se acepta su nueva versión: si la actualización falla, la fila no cambia
+        checker = ConflictChecker(user_id, previews, conflict_scope,
+                                  exclude_ids=to_delete["event"])
+        for (i, obj, changes), preview in zip(pending_events, previews):
+            if obj.id in to_delete["event"]:
+                continue
+            conflicts = checker.conflicts(preview)
+            if conflicts:
+                results[i] = {"index": i, "status": 409, "conflicts": conflicts,
+                              "error": "El evento se solapa con otros eventos"}
+                continue
+            checker.accept(preview)
+            if changes is None:
+                db.session.add(obj)
+            else:
+                for attr, value in changes.items():
+                    setattr(obj, attr, value)
+            touched[i] = obj
+
+    failed = [r for r in results if r["status"] >= 400]
+    if atomic and failed:
+        db.session.rollback()
+        raise APIException("El lote no se aplicó: hay operaciones inválidas", 400,
+                           payload={"results": results})
+
+    # Un único flush: los INSERT/UPDATE del mismo tipo se agrupan en executemany
+    db.session.flush()
+    for i, obj in touched.items():
+        results[i]["data"] = _serialize(obj)
+
+    # Las tareas de los grupos borrados las borra la base de datos (ON DELETE CASCADE)
+    for name in ("event", "task", "task_group"):
+        if to_delete[name]:
+            model = MODELS[name]
+            deleted_ids = db.session.execute(
+                delete(model).where(model.id.in_(to_delete[name]), model.user_id == user_id)
+                .returning(model.id),
+                execution_options={"synchronize_session": False}).scalars().all()
+            # Los DELETE masivos no pasan por el flush: se anotan a mano para /api/sync
+            record_changes(user_id, name, deleted_ids, "delete")
+    db.session.commit()
+
+    return jsonify({"results": results}), 200
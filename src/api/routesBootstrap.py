@@ -0,0 +1,166 @@
+"""
+Estado inicial de la app en una sola petición (GET /api/bootstrap?start=&end=).
+Sustituye a la cadena profile → calendars → task-groups → events → users/<id>/tasks
+que hacía el frontend al cargar: un solo token verificado y una sola ida y vuelta.
+
+Respuesta:
+{
+  "user":        {...},                 igual que /api/profile["user"]
+  "calendars":   [...],                 igual que /api/calendars
+  "task_groups": [...],                 igual que /api/task-groups (con sus tareas)
+  "tasks":       [...],                 igual que /api/users/<id>/tasks
+  "events":      [...],                 igual que /api/events?start=&end= (series expandidas)
+  "window":      {"start": "...", "end": "..."}
+}
+Sin start/end la ventana es el mes actual.
+
+Las secciones son independientes: cada una se lanza en un pool de hilos pequeño y
+compartido por el proceso (BOOTSTRAP_WORKERS, 0 = todo en el hilo de la petición), con
+su propio app context y su propia conexión del pool de SQLAlchemy. Con ?stream=1 cada
+sección se envía en cuanto termina (el orden de las claves del objeto puede variar);
+si una falla después de empezar a enviar, el objeto se cierra con "error" y sin el
+resto de secciones.
+Las consultas de los hilos no cuentan en el recuento por petición de /metrics.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from flask import current_app, g, json, jsonify, request, Response, stream_with_context
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+
+from .models import db, Task, TaskGroup, Calendar
+from .routes import api, token_required, user_to_public
+from .routesEvent import _parse_iso_datetime, window_events
+from .rowserialize import CALENDAR_ROWS, TASK_ROWS, TASK_GROUP_ROWS, groups_with_tasks
+from .pagination import keyset_order
+from .utils import APIException
+
+DEFAULT_WORKERS = 4
+MAX_WINDOW_DAYS = 366
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_pid = None
+_lock = threading.Lock()
+
+
+# ---------- Helpers ----------
+
+def _executor(app):
+    """Pool por proceso (tras el fork de gunicorn cada worker crea el suyo)."""
+    global _pool, _pool_pid
+    workers = int(app.config.get("BOOTSTRAP_WORKERS",
+                                 os.environ.get("BOOTSTRAP_WORKERS", DEFAULT_WORKERS)))
+    # Una sola conexión compartida (SQLite en memoria): no se puede usar desde varios hilos
+    if workers <= 0 or isinstance(db.engine.pool, (StaticPool, SingletonThreadPool)):
+        return None
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bootstrap")
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _in_app_context(app, fn, *args):
+    with app.app_context():
+        try:
+            return fn(*args)
+        finally:
+            db.session.remove()
+
+
+def _window() -> tuple[datetime, datetime]:
+    start_qs, end_qs = request.args.get("start"), request.args.get("end")
+    if bool(start_qs) != bool(end_qs):
+        raise APIException("start y end van juntos", 400)
+    if start_qs:
+        try:
+            start_dt, end_dt = _parse_iso_datetime(start_qs), _parse_iso_datetime(end_qs)
+        except ValueError as e:
+            raise APIException(str(e), 400)
+    else:
+        today = datetime.utcnow()
+        start_dt = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        end_dt = start_dt.replace(year=start_dt.year + start_dt.month // 12,
+                                  month=start_dt.month % 12 + 1)
+    if end_dt <= start_dt:
+        raise APIException("end debe ser posterior a start", 400)
+    if (end_dt - start_dt).days > MAX_WINDOW_DAYS:
+        raise APIException(f"La ventana no puede superar {MAX_WINDOW_DAYS} días", 400)
+    return start_dt, end_dt
+
+
+def _calendars(user_id: int) -> list:
+    rows = db.session.execute(CALENDAR_ROWS.select().where(Calendar.user_id == user_id)
+                              .order_by(Calendar.id.asc()))
+    return [CALENDAR_ROWS(r) for r in rows]
+
+
+def _task_groups(user_id: int) -> list:
+    return groups_with_tasks(TASK_GROUP_ROWS.select().where(TaskGroup.user_id == user_id)
+                             .order_by(TaskGroup.id.asc()))
+
+
+def _tasks(user_id: int) -> list:
+    q = keyset_order(Task.query.filter_by(user_id=user_id), Task.date, Task.id, nullable=True)
+    return [TASK_ROWS(t) for t in q.with_entities(*TASK_ROWS.columns)]
+
+
+# ---------- Endpoints ----------
+
+@api.route("/bootstrap", methods=["OPTIONS"])
+def bootstrap_options():
+    return ("", 204)
+
+
+@api.route("/bootstrap", methods=["GET"])
+@token_required(load_user=True)
+def bootstrap(auth_payload):
+    user_id = auth_payload.get("user_id")
+    start_dt, end_dt = _window()
+    stream = (request.args.get("stream") or "").lower() in ("1", "true", "yes")
+
+    head = {
+        "user": user_to_public(g.current_user),
+        "window": {"start": start_dt.isoformat(), "end": end_dt.isoformat()},
+    }
+    sections = {
+        "calendars": (_calendars, user_id),
+        "task_groups": (_task_groups, user_id),
+        "tasks": (_tasks, user_id),
+        "events": (window_events, user_id, start_dt, end_dt),
+    }
+
+    app = current_app._get_current_object()
+    pool = _executor(app)
+    if pool is None:
+        return jsonify({**head, **{k: fn(*args) for k, (fn, *args) in sections.items()}}), 200
+
+    futures = {pool.submit(_in_app_context, app, fn, *args): key
+               for key, (fn, *args) in sections.items()}
+    if not stream:
+        return jsonify({**head, **{futures[f]: f.result() for f in futures}}), 200
+
+    def generate():
+        try:
+            yield json.dumps(head)[:-1]   # sin la "}" final
+            for future in as_completed(futures):
+                try:
+                    section = future.result()
+                except Exception:
+                    # El 200 ya está enviado: se cierra el objeto con "error" en lugar de
+                    # dejar un JSON truncado, y el cliente repite la carga sin stream
+                    logger.exception("bootstrap: sección %s", futures[future])
+                    yield f', "error": {json.dumps(f"No se pudo cargar {futures[future]}")}}}'
+                    return
+                yield f", {json.dumps(futures[future])}: {json.dumps(section)}"
+            yield "}"
+        finally:
+            for future in futures:
+                future.cancel()
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
@@ -5,8 +5,7 @@ Endpoints de configuración de usuario:
 - GET     /api/config  → devuelve datos de configuración del usuario autenticado
 - PUT     /api/config  → actualiza display_name y/o name y, opcionalmente, la contraseña
 """
-from flask import request, jsonify
-from werkzeug.security import check_password_hash
+from flask import request, jsonify, g
 from .models import db, User
 from .routes import api, token_required
 from .utils import APIException
@@ -30,17 +29,14 @@ def config_options():
 
 
 @api.route("/config", methods=["GET"])
-@token_required
+@token_required(load_user=True)
 def get_config(auth_payload):
     """Devuelve la configuración del usuario autenticado."""
-    user = User.query.get(auth_payload.get("user_id"))
-    if not user:
-        raise APIException("Usuario no encontrado", 404)
-    return jsonify(_user_to_config(user)), 200
+    return jsonify(_user_to_config(g.current_user)), 200
 
 
 @api.route("/config", methods=["PUT"])
-@token_required
+@token_required(load_user=True)
 def update_config(auth_payload):
     """
     Actualiza la configuración del usuario.
@@ -53,9 +49,7 @@ def update_config(auth_payload):
     }
     """
     data = request.get_json() or {}
-    user = User.query.get(auth_payload.get("user_id"))
-    if not user:
-        raise APIException("Usuario no encontrado", 404)
+    user = g.current_user
 
     # Actualización de nombres (si vienen)
     if "display_name" in data:
@@ -76,7 +70,7 @@ def update_config(auth_payload):
         current_pw = (data.get("current_password") or "").strip()
         if not current_pw:
             raise APIException("Debes enviar la contraseña actual para cambiarla", 400)
-        if not check_password_hash(user.password, current_pw):
+        if not user.check_password(current_pw):
             raise APIException("La contraseña actual no es correcta", 401)
         user.set_password(new_pw)
 
@@ -3,17 +3,32 @@ Rutas de eventos (agenda/calendario) con soporte de rangos horarios.
 Se integran al mismo Blueprint `api` definido en routes.py.
 """
 from flask import request, jsonify, Blueprint
-from datetime import datetime, date, time
-from typing import Optional
+from datetime import datetime, date, time, timedelta
+from heapq import merge
+from types import SimpleNamespace
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, or_
 
 from .models import db, Event, Calendar
+from .pagination import (page_args, keyset_order, keyset_filter, paginated_response,
+                         stream_json_array, decode_cursor, STREAM_BATCH)
+from .recurrence import (RecurrenceRule, format_exdates, exdates_to_list, parse_exdates,
+                         series_end, expand, occurrence_cache)
+from .intervals import IntervalIndex
 # Reutilizamos el mismo blueprint y decorador de auth del módulo principal
 from .routes import api, token_required
+from .conditional import conditional_get
+from .idempotency import idempotent
+from .rowserialize import EVENT_ROWS, CALENDAR_ROWS, sparse_fields
 
 # ---------- Helpers ----------
 
 apiEvent = Blueprint('apiEvent', __name__)
 
+# Duración máxima de un evento (o de cada ocurrencia de una serie); ver validate_event_range
+MAX_EVENT_SPAN = timedelta(days=92)
+
 
 def _parse_iso_datetime(value: str) -> datetime:
     """
@@ -70,6 +85,18 @@ def _compose_datetimes_from_parts(payload: dict) -> Optional[tuple[datetime, dat
             "Partes de fecha/hora inválidas (usa ISO: YYYY-MM-DD y HH:MM)") from e
 
 
+def validate_event_range(start_dt: datetime, end_dt: datetime) -> None:
+    """
+    Reglas del rango de un evento, comunes a la API, el batch y la importación .ics.
+    La duración máxima (MAX_EVENT_SPAN) es la que permite acotar start_date por abajo
+    en las consultas de solape (events_in_range). Lanza ValueError.
+    """
+    if end_dt <= start_dt:
+        raise ValueError("La hora de fin debe ser posterior a la de inicio")
+    if end_dt - start_dt > MAX_EVENT_SPAN:
+        raise ValueError(f"Un evento no puede durar más de {MAX_EVENT_SPAN.days} días")
+
+
 def _get_datetimes(payload: dict) -> tuple[datetime, datetime]:
     """
     Prioriza campos ISO completos y luego partes separadas.
@@ -100,9 +127,9 @@ def _validate_ownership(calendar_id: Optional[int], user_id: int):
     """
     if not calendar_id:
         return
-    calendar = Calendar.query.filter_by(
-        id=calendar_id, user_id=user_id).first()
-    if not calendar:
+    # session.get reutiliza el identity map si el calendario ya se cargó en esta petición
+    calendar = db.session.get(Calendar, calendar_id)
+    if not calendar or calendar.user_id != user_id:
         from .utils import APIException
         raise APIException("El grupo no existe o no pertenece al usuario", 404)
 
@@ -119,6 +146,371 @@ def _normalize_all_day(start_dt: datetime, end_dt: datetime, is_all_day: bool) -
 
     return start_dt, end_dt
 
+
+def _recurrence_fields(rule_raw, exdates_raw, start_dt: datetime, end_dt: datetime) -> dict:
+    """
+    Normaliza regla y excepciones y calcula recurrence_end (fin de la última ocurrencia).
+    `exdates_raw` puede ser una lista de fechas ISO o el texto ya almacenado.
+    Lanza ValueError si la regla no es válida.
+    """
+    if not rule_raw:
+        return {"recurrence_rule": None, "recurrence_exdates": None, "recurrence_end": None}
+    if not isinstance(rule_raw, str):
+        raise ValueError("recurrence_rule debe ser un texto RRULE")
+    if isinstance(exdates_raw, str):
+        exdates_raw = exdates_to_list(exdates_raw)
+    elif exdates_raw is not None and not isinstance(exdates_raw, list):
+        raise ValueError("recurrence_exdates debe ser una lista de fechas ISO")
+
+    rule = RecurrenceRule.parse(rule_raw)
+    return {
+        "recurrence_rule": str(rule),
+        "recurrence_exdates": format_exdates(exdates_raw),
+        "recurrence_end": series_end(rule, start_dt, end_dt - start_dt),
+    }
+
+
+def event_from_payload(data: dict, user_id: int) -> Event:
+    """
+    Valida el body de creación y construye el Event (sin añadirlo a la sesión).
+    No valida la propiedad de calendar_id: eso lo hace quien llama.
+    """
+    from .utils import APIException
+
+    title = (data.get("title") or "").strip()
+    if not title:
+        raise APIException("El título es requerido", 400)
+
+    all_day = bool(data.get("all_day") if "all_day" in data else data.get("allDay"))
+
+    try:
+        start_dt, end_dt = _get_datetimes(data)
+        start_dt, end_dt = _normalize_all_day(start_dt, end_dt, all_day)
+        validate_event_range(start_dt, end_dt)
+    except ValueError as e:
+        raise APIException(str(e), 400)
+
+    try:
+        recurrence = _recurrence_fields(data.get("recurrence_rule"),
+                                        data.get("recurrence_exdates"), start_dt, end_dt)
+    except ValueError as e:
+        raise APIException(str(e), 400)
+
+    return Event(
+        **recurrence,
+        user_id=user_id,
+        calendar_id=data.get("calendar_id"),
+        title=title,
+        start_date=start_dt,
+        end_date=end_dt,
+        all_day=all_day,
+        description=(data.get("description") or "").strip() or None,
+        color=(data.get("color") or "").strip() or None,
+    )
+
+
+def event_changes_from_payload(ev: Event, data: dict) -> dict:
+    """
+    Valida un body de actualización parcial y devuelve {atributo: valor}
+    sin modificar el evento, para que un error no deje cambios a medias.
+    No valida la propiedad de calendar_id: eso lo hace quien llama.
+    """
+    from .utils import APIException
+
+    changes = {}
+    all_day = ev.all_day
+    if "all_day" in data:
+        all_day = bool(data.get("all_day"))
+    elif "allDay" in data:
+        all_day = bool(data.get("allDay"))
+    changes["all_day"] = all_day
+
+    # Campos opcionales
+    if "title" in data:
+        title = (data.get("title") or "").strip()
+        if not title:
+            raise APIException("El título no puede estar vacío", 400)
+        changes["title"] = title
+
+    # Soporta actualizar fecha/hora con ISO o partes
+    start_dt, end_dt = ev.start_date, ev.end_date
+    try:
+        if any(k in data for k in ("start_date", "end_date", "start", "end")):
+            start_raw = data.get("start_date") or data.get("start")
+            end_raw = data.get("end_date") or data.get("end")
+            if not start_raw or not end_raw:
+                raise APIException(
+                    "Para actualizar el rango envía start y end", 400)
+            start_dt = _parse_iso_datetime(start_raw)
+            end_dt = _parse_iso_datetime(end_raw)
+            start_dt, end_dt = _normalize_all_day(start_dt, end_dt, all_day)
+
+        elif any(k in data for k in ("date", "start_time", "end_time")):
+            parts = _compose_datetimes_from_parts(data)
+            if not parts:
+                raise APIException("Faltan date, start_time o end_time", 400)
+            start_dt, end_dt = _normalize_all_day(parts[0], parts[1], all_day)
+
+        # Solo si el body trae el rango: un evento guardado antes del límite de
+        # duración se puede seguir editando sin tocar sus fechas
+        if (start_dt, end_dt) != (ev.start_date, ev.end_date):
+            validate_event_range(start_dt, end_dt)
+    except ValueError as e:
+        raise APIException(str(e), 400)
+
+    if (start_dt, end_dt) != (ev.start_date, ev.end_date):
+        changes["start_date"], changes["end_date"] = start_dt, end_dt
+        changes["long_span"] = False
+
+    if "description" in data:
+        changes["description"] = (data.get("description") or "").strip() or None
+
+    if "color" in data:
+        changes["color"] = (data.get("color") or "").strip() or None
+
+    if "calendar_id" in data:
+        changes["calendar_id"] = data.get("calendar_id")
+
+    # La recurrencia depende también del rango: se recalcula si cambia cualquiera
+    if "recurrence_rule" in data or "recurrence_exdates" in data or \
+            (ev.recurrence_rule and "start_date" in changes):
+        rule_raw = data["recurrence_rule"] if "recurrence_rule" in data else ev.recurrence_rule
+        exdates_raw = data["recurrence_exdates"] if "recurrence_exdates" in data \
+            else ev.recurrence_exdates
+        try:
+            changes.update(_recurrence_fields(rule_raw, exdates_raw, start_dt, end_dt))
+        except ValueError as e:
+            raise APIException(str(e), 400)
+
+    return changes
+
+
+RANGE_MODES = ("overlap", "within")
+# Columnas que el listado lee de cada fila (cursor y expansión de series) aunque ?fields= no las pida
+EVENT_ROUTE_COLUMNS = ("id", "start_date", "end_date", "recurrence_rule", "recurrence_exdates")
+
+
+def events_in_range(user_id: int, start_dt: Optional[datetime] = None,
+                    end_dt: Optional[datetime] = None, mode: str = "overlap",
+                    recurring: Optional[bool] = None):
+    """
+    Query de eventos del usuario dentro de una ventana [start_dt, end_dt).
+    - "overlap": eventos que se solapan con la ventana (incluye los que cruzan
+      los bordes): start_date < end AND end_date > start. Como ningún evento dura
+      más de MAX_EVENT_SPAN, además start_date > start - MAX_EVENT_SPAN: el índice
+      (user_id, start_date) se recorre solo en ese tramo y no desde el primer evento.
+      Los guardados antes de ese límite (long_span) se leen del índice parcial
+      ix_event_user_long_span.
+    - "within": solo eventos contenidos por completo (comportamiento antiguo).
+    `flask explain-events` comprueba que el plan acota start_date por los dos lados.
+    `recurring` limita a eventos simples (False) o a series recurrentes (True);
+    para las series el solape se mide contra recurrence_end en lugar de end_date
+    (índice parcial ix_event_user_recurrence_end).
+    """
+    q = Event.query.filter(Event.user_id == user_id)
+    if recurring is False:
+        q = q.filter(Event.recurrence_rule.is_(None))
+    elif recurring:
+        series = [Event.recurrence_rule.isnot(None)]
+        if end_dt is not None:
+            series.append(Event.start_date < end_dt)
+        if start_dt is None:
+            return q.filter(*series)
+        # Por ix_event_user_recurrence_end: las series sin fin y las que terminan
+        # después de la ventana, sin recorrer las ya terminadas
+        return q.filter(or_(and_(*series, Event.recurrence_end.is_(None)),
+                            and_(*series, Event.recurrence_end > start_dt)))
+
+    if mode == "within":
+        if start_dt is not None:
+            q = q.filter(Event.start_date >= start_dt)
+        if end_dt is not None:
+            q = q.filter(Event.start_date < end_dt, Event.end_date <= end_dt)
+    else:
+        upper = (Event.start_date < end_dt,) if end_dt is not None else ()
+        if start_dt is None:
+            q = q.filter(*upper)
+        else:
+            # Los pocos eventos anteriores al límite que duran más (long_span) van por
+            # su propio índice parcial: cada rama del OR lleva sus cotas para que el
+            # planner use un índice por rama en lugar de recorrer uno entero
+            after = Event.end_date > start_dt
+            lower = max(start_dt, datetime.min + MAX_EVENT_SPAN) - MAX_EVENT_SPAN
+            q = q.filter(or_(and_(Event.start_date > lower, *upper, after),
+                             and_(Event.long_span, *upper, after)))
+    return q
+
+
+def event_occurrences(ev: Event, start_dt: Optional[datetime], end_dt: Optional[datetime]) -> tuple:
+    """(inicio, fin) de las ocurrencias de una serie dentro de la ventana, vía caché."""
+    return occurrence_cache.get("event", ev.id, ev.recurrence_rule, ev.recurrence_exdates,
+                                ev.start_date, ev.end_date - ev.start_date, start_dt, end_dt)
+
+
+def _expanded_occurrences(user_id: int, start_dt: datetime, end_dt: datetime,
+                          cursor: Optional[str], rows=EVENT_ROWS) -> list:
+    """
+    Expande las series recurrentes del usuario que tocan la ventana.
+    Devuelve tuplas (inicio, id, dict serializado) ordenadas como el listado.
+    `rows` debe seleccionar al menos EVENT_ROUTE_COLUMNS; recurrence_id va siempre.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    items = []
+    for ev in events_in_range(user_id, start_dt, end_dt, recurring=True) \
+            .with_entities(*rows.columns):
+        base = rows(ev)
+        for occ_start, occ_end in event_occurrences(ev, start_dt, end_dt):
+            if after and (occ_start, ev.id) <= after:
+                continue
+            item = dict(base, recurrence_id=occ_start.isoformat())
+            if "start_date" in base:
+                item["start_date"] = occ_start.isoformat()
+            if "end_date" in base:
+                item["end_date"] = occ_end.isoformat()
+            items.append((occ_start, ev.id, item))
+    items.sort(key=lambda t: (t[0], t[1]))
+    return items
+
+
+def _window_items(user_id: int, start_dt: datetime, end_dt: datetime,
+                  cursor: Optional[str] = None, rows=EVENT_ROWS, limit: int = 0,
+                  stream: bool = False):
+    """
+    Eventos simples de la ventana (ya ordenados por la BD) mezclados con las
+    ocurrencias expandidas de las series: iterador de (inicio, id, fila o dict)
+    en el orden del listado. Con `limit` se leen como mucho limit + 1 eventos simples.
+    """
+    q = events_in_range(user_id, start_dt, end_dt, recurring=False)
+    q = keyset_filter(q, Event.start_date, Event.id, cursor)
+    q = keyset_order(q, Event.start_date, Event.id).with_entities(*rows.columns)
+    occurrences = _expanded_occurrences(user_id, start_dt, end_dt, cursor, rows)
+    simple = q.limit(limit + 1) if limit else (q.yield_per(STREAM_BATCH) if stream else q)
+    return merge(((e.start_date, e.id, e) for e in simple), occurrences,
+                 key=lambda t: (t[0], t[1]))
+
+
+def _window_item(rows, item) -> dict:
+    return item[2] if isinstance(item[2], dict) else rows(item[2])
+
+
+def window_events(user_id: int, start_dt: datetime, end_dt: datetime) -> list:
+    """
+    Eventos que se solapan con la ventana, con las series expandidas: lo mismo que
+    devuelve GET /api/events?start=&end= sin paginar, como lista de dicts.
+    """
+    return [_window_item(EVENT_ROWS, item) for item in _window_items(user_id, start_dt, end_dt)]
+
+
+CONFLICT_SCOPES = ("calendar", "all")
+# Hasta dónde se comprueban las ocurrencias de una serie sin fin
+CONFLICT_HORIZON = timedelta(days=366)
+
+
+def _candidate_intervals(ev) -> list:
+    """Intervalos que ocuparía un evento (sus ocurrencias si es recurrente)."""
+    if not ev.recurrence_rule:
+        return [(ev.start_date, ev.end_date)]
+    rule = RecurrenceRule.parse(ev.recurrence_rule)
+    return list(expand(rule, ev.start_date, ev.end_date - ev.start_date, ev.start_date,
+                       ev.start_date + CONFLICT_HORIZON, parse_exdates(ev.recurrence_exdates)))
+
+
+def event_preview(ev: Event, changes: dict):
+    """Vista del evento con los cambios aplicados, sin tocar el objeto de la sesión."""
+    fields = ("id", "calendar_id", "title", "start_date", "end_date", "all_day",
+              "recurrence_rule", "recurrence_exdates")
+    return SimpleNamespace(**{f: changes.get(f, getattr(ev, f)) for f in fields})
+
+
+class ConflictChecker:
+    """
+    Detección de solapes para uno o muchos eventos con una sola carga por rango:
+    se indexan en memoria (IntervalIndex) los eventos existentes de la ventana que
+    cubre a todos los candidatos y cada candidato aceptado se añade al índice, de
+    modo que una importación masiva detecta también los solapes entre sus filas.
+    Los eventos de día completo no cuentan como conflicto.
+    scope="calendar" compara solo dentro del mismo calendario; "all", entre todos.
+    exclude_ids: eventos que no se cargan (p. ej. los que el lote borra). Un evento
+    que se actualiza sigue indexado con su rango guardado hasta que se acepta su
+    nueva versión; si se rechaza, sigue contando para los siguientes candidatos.
+    """
+
+    def __init__(self, user_id: int, candidates: Iterable, scope: str = "calendar",
+                 exclude_ids: Iterable[int] = ()):
+        self.scope = scope
+        self.index = IntervalIndex()
+        self._replaced = set()   # ids cuya versión guardada ya sustituyó un candidato
+        windows = [iv for c in candidates if not c.all_day for iv in _candidate_intervals(c)]
+        if not windows:
+            return
+
+        start_dt = min(s for s, _ in windows)
+        end_dt = max(e for _, e in windows)
+        exclude_ids = [i for i in exclude_ids if i]
+        items = []
+        for recurring in (False, True):
+            q = events_in_range(user_id, start_dt, end_dt, recurring=recurring) \
+                .filter(Event.all_day.isnot(True))
+            if exclude_ids:
+                q = q.filter(Event.id.notin_(exclude_ids))
+            for ev in q:
+                spans = event_occurrences(ev, start_dt, end_dt) if recurring \
+                    else [(ev.start_date, ev.end_date)]
+                items.extend((s, e, (True, self._entry(ev, s, e))) for s, e in spans)
+        self.index = IntervalIndex(items)
+
+    @staticmethod
+    def _entry(ev, start: datetime, end: datetime) -> dict:
+        return {"id": ev.id, "title": ev.title, "calendar_id": ev.calendar_id,
+                "start_date": start.isoformat(), "end_date": end.isoformat()}
+
+    def conflicts(self, ev) -> list:
+        """Eventos que se solapan con `ev` (una entrada por ocurrencia en conflicto)."""
+        if ev.all_day:
+            return []
+        found = {}
+        for start, end in _candidate_intervals(ev):
+            for stored, other in self.index.overlapping(start, end):
+                if other["id"] == ev.id and ev.id is not None:
+                    continue
+                if stored and other["id"] in self._replaced:
+                    continue
+                if self.scope == "calendar" and other["calendar_id"] != ev.calendar_id:
+                    continue
+                found[(other["id"], other["start_date"])] = other
+        return sorted(found.values(), key=lambda o: (o["start_date"], o["id"] or 0))
+
+    def accept(self, ev) -> None:
+        """Añade el evento al índice para comprobar los siguientes candidatos."""
+        if ev.id is not None:
+            self._replaced.add(ev.id)
+        if ev.all_day:
+            return
+        for start, end in _candidate_intervals(ev):
+            self.index.add(start, end, (False, self._entry(ev, start, end)))
+
+
+def conflict_options(data: dict) -> tuple[bool, str]:
+    """Lee check_conflicts / conflict_scope de la query string o del body."""
+    from .utils import APIException
+
+    raw = request.args.get("check_conflicts", data.get("check_conflicts"))
+    check = str(raw).lower() in ("1", "true", "yes") if raw is not None else False
+    scope = (request.args.get("conflict_scope") or data.get("conflict_scope")
+             or "calendar").strip().lower()
+    if scope not in CONFLICT_SCOPES:
+        raise APIException("conflict_scope debe ser 'calendar' o 'all'", 400)
+    return check, scope
+
+
+def _raise_on_conflicts(user_id: int, ev, scope: str):
+    from .utils import APIException
+
+    conflicts = ConflictChecker(user_id, [ev], scope, exclude_ids=[ev.id]).conflicts(ev)
+    if conflicts:
+        raise APIException("El evento se solapa con otros eventos", 409,
+                           payload={"conflicts": conflicts})
+
 # ---------- Endpoints ----------
 
 @api.route("/events", methods=["OPTIONS"])
@@ -130,37 +522,75 @@ def events_options(event_id=None):
 
 @api.route("/events", methods=["GET"])
 @token_required
+@conditional_get("event")
 def list_events(auth_payload):
     """
     Lista eventos del usuario autenticado.
     Filtros opcionales por rango:
       /api/events?start=2025-09-08&end=2025-09-09
       /api/events?start=2025-09-08T00:00&end=2025-09-08T23:59
+    Por defecto devuelve los eventos que se solapan con la ventana
+    (mode=overlap); con mode=within solo los contenidos por completo.
+    Paginación por cursor sobre (start_date, id):
+      /api/events?limit=200            → siguiente página en la cabecera X-Next-Cursor
+      /api/events?limit=200&cursor=... → continúa desde ese cursor
+      /api/events?stream=1             → array JSON en streaming (exportaciones grandes)
+    Con start y end (mode=overlap) las series recurrentes se expanden y se devuelve
+    una entrada por ocurrencia (con recurrence_id); expand=0 devuelve la serie tal cual.
+    Campos:
+      /api/events?fields=id,title,start_date,end_date,color,calendar_id
+                                       → solo esas claves (y solo esas columnas en el SELECT)
     """
+    from .utils import APIException
     user_id = auth_payload.get("user_id")
 
-    q = Event.query.filter_by(user_id=user_id)
+    mode = (request.args.get("mode") or "overlap").strip().lower()
+    if mode not in RANGE_MODES:
+        raise APIException("mode debe ser 'overlap' o 'within'", 400)
 
     start_qs = request.args.get("start")
     end_qs = request.args.get("end")
 
     try:
-        if start_qs:
-            start_dt = _parse_iso_datetime(start_qs)
-            q = q.filter(Event.start_date >= start_dt)
-        if end_qs:
-            end_dt = _parse_iso_datetime(end_qs)
-            q = q.filter(Event.end_date <= end_dt)
+        start_dt = _parse_iso_datetime(start_qs) if start_qs else None
+        end_dt = _parse_iso_datetime(end_qs) if end_qs else None
     except ValueError as e:
-        from .utils import APIException
         raise APIException(str(e), 400)
 
-    events = q.order_by(Event.start_date.asc()).all()
-    return jsonify([e.serialize() for e in events]), 200
+    limit, cursor, stream = page_args()
+    expand = mode == "overlap" and start_dt is not None and end_dt is not None \
+        and (request.args.get("expand") or "1").lower() not in ("0", "false", "no")
+
+    # Solo lectura: filas con las columnas de serialize() (o de ?fields=), sin instancias ORM
+    event_rows = sparse_fields(EVENT_ROWS, extra_columns=EVENT_ROUTE_COLUMNS)
+
+    if not expand:
+        q = events_in_range(user_id, start_dt, end_dt, mode)
+        q = keyset_filter(q, Event.start_date, Event.id, cursor)
+        q = keyset_order(q, Event.start_date, Event.id).with_entities(*event_rows.columns)
+        if stream:
+            return stream_json_array(q.yield_per(STREAM_BATCH), event_rows)
+        if limit:
+            return paginated_response(q.limit(limit + 1), lambda e: (e.start_date, e.id),
+                                      event_rows, limit)
+        return jsonify([event_rows(e) for e in q]), 200
+
+    # Misma mezcla que window_events (bootstrap), con cursor, límite y ?fields=
+    items = _window_items(user_id, start_dt, end_dt, cursor, event_rows, limit, stream)
+
+    def serialize(item):
+        return _window_item(event_rows, item)
+
+    if stream:
+        return stream_json_array(items, serialize)
+    if limit:
+        return paginated_response(items, lambda t: (t[0], t[1]), serialize, limit)
+    return jsonify([serialize(item) for item in items]), 200
 
 
 @api.route("/events", methods=["POST"])
 @token_required
+@idempotent
 def create_event(auth_payload):
     """
     Crea un evento del usuario.
@@ -181,42 +611,19 @@ def create_event(auth_payload):
          "start_time": "10:00",
          "end_time": "13:00"
        }
+    Con ?check_conflicts=true responde 409 con la lista de eventos que se solapan
+    (conflict_scope=calendar por defecto, o all para todos los calendarios).
     """
-    from .utils import APIException
-
     user_id = auth_payload.get("user_id")
     data = request.get_json() or {}
 
-    title = (data.get("title") or "").strip()
-    if not title:
-        raise APIException("El título es requerido", 400)
-    
-    all_day = bool(data.get("all_day") if "all_day" in data else data.get("allDay"))
-
+    ev = event_from_payload(data, user_id)
+    _validate_ownership(ev.calendar_id, user_id)
 
-    try:
-        start_dt, end_dt = _get_datetimes(data)
-        start_dt, end_dt = _normalize_all_day(start_dt, end_dt, all_day)
-    except ValueError as e:
-        raise APIException(str(e), 400)
+    check, scope = conflict_options(data)
+    if check:
+        _raise_on_conflicts(user_id, ev, scope)
 
-    if end_dt <= start_dt:
-        raise APIException(
-            "La hora de fin debe ser posterior a la de inicio", 400)
-
-    calendar_id = data.get("calendar_id")
-    _validate_ownership(calendar_id, user_id)
-
-    ev = Event(
-        user_id=user_id,
-        calendar_id=calendar_id,
-        title=title,
-        start_date=start_dt,
-        end_date=end_dt,
-        all_day=all_day,
-        description=(data.get("description") or "").strip() or None,
-        color=(data.get("color") or "").strip() or None,
-    )
     db.session.add(ev)
     db.session.commit()
     return jsonify(ev.serialize()), 201
@@ -244,60 +651,19 @@ def update_event(auth_payload, event_id: int):
     ev = Event.query.filter_by(id=event_id, user_id=user_id).first()
     if not ev:
         raise APIException("Evento no encontrado", 404)
-    
-    all_day = ev.all_day
-    if "all_day" in data:
-        all_day = bool(data.get("all_day"))
-    elif "allDay" in data:
-        all_day = bool(data.get("allDay"))
 
-    # Campos opcionales
-    if "title" in data:
-        title = (data.get("title") or "").strip()
-        if not title:
-            raise APIException("El título no puede estar vacío", 400)
-        ev.title = title
+    changes = event_changes_from_payload(ev, data)
+    if "calendar_id" in changes:
+        _validate_ownership(changes["calendar_id"], user_id)
 
-    # Soporta actualizar fecha/hora con ISO o partes
-    try:
-        if any(k in data for k in ("start_date", "end_date", "start", "end")):
-            start_raw = data.get("start_date") or data.get("start")
-            end_raw = data.get("end_date") or data.get("end")
-            if not start_raw or not end_raw:
-                raise APIException(
-                    "Para actualizar el rango envía start y end", 400)
-            start_dt = _parse_iso_datetime(start_raw)
-            end_dt = _parse_iso_datetime(end_raw)
-            start_dt, end_dt = _normalize_all_day(start_dt, end_dt, all_day)
-            ev.start_date, ev.end_date = start_dt, end_dt
+    check, scope = conflict_options(data)
+    if check:
+        _raise_on_conflicts(user_id, event_preview(ev, changes), scope)
 
-        elif any(k in data for k in ("date", "start_time", "end_time")):
-            parts = _compose_datetimes_from_parts(data)
-            if not parts:
-                raise APIException("Faltan date, start_time o end_time", 400)
-            start_dt, end_dt = _normalize_all_day(parts[0], parts[1], all_day)
-            ev.start_date, ev.end_date = start_dt, end_dt
-
-    except ValueError as e:
-        raise APIException(str(e), 400)
-
-    if ev.end_date <= ev.start_date:
-        raise APIException(
-            "La hora de fin debe ser posterior a la de inicio", 400)
-
-    if "description" in data:
-        ev.description = (data.get("description") or "").strip() or None
-
-    if "color" in data:
-        ev.color = (data.get("color") or "").strip() or None
-
-    if "calendar_id" in data:
-        gid = data.get("calendar_id")
-        _validate_ownership(gid, user_id)
-        ev.calendar_id = gid
+    for attr, value in changes.items():
+        setattr(ev, attr, value)
+    occurrence_cache.invalidate("event", ev.id)
 
-    ev.all_day = all_day
-    
     db.session.commit()
     return jsonify(ev.serialize()), 200
 
@@ -312,6 +678,7 @@ def delete_event(auth_payload, event_id: int):
     if not ev:
         raise APIException("Evento no encontrado", 404)
 
+    occurrence_cache.invalidate("event", ev.id)
     db.session.delete(ev)
     db.session.commit()
     return jsonify({"message": "Evento eliminado"}), 200
@@ -328,14 +695,16 @@ def calendars_options(calendar_id=None):
 
 @api.route("/calendars", methods=["GET"])
 @token_required
+@conditional_get("calendar", cache=True)
 def list_calendars(auth_payload):
     """
     Lista todos los calendarios del usuario autenticado.
     """
     user_id = auth_payload.get("user_id")
-    calendars = Calendar.query.filter_by(
-        user_id=user_id).order_by(Calendar.id.asc()).all()
-    return jsonify([c.serialize() for c in calendars]), 200
+    calendar_rows = sparse_fields(CALENDAR_ROWS)
+    rows = db.session.execute(calendar_rows.select().where(Calendar.user_id == user_id)
+                              .order_by(Calendar.id.asc()))
+    return jsonify([calendar_rows(r) for r in rows]), 200
 
 
 @api.route("/calendars/<int:calendar_id>", methods=["GET"])
@@ -356,6 +725,7 @@ def get_calendar(auth_payload, calendar_id: int):
 
 @api.route("/calendars", methods=["POST"])
 @token_required
+@idempotent
 def create_calendar(auth_payload):
     """
     Crea un calendario para el usuario autenticado.
@@ -396,9 +766,7 @@ def update_calendar(auth_payload, calendar_id: int):
     from .utils import APIException
     user_id = auth_payload.get("user_id")
     data = request.get_json() or {}
-    print(data)
     cal = Calendar.query.filter_by(id=calendar_id, user_id=user_id).first()
-    print(cal)
     if not cal:
         raise APIException("Calendario no encontrado", 404)
 
@@ -419,17 +787,21 @@ def update_calendar(auth_payload, calendar_id: int):
 @token_required
 def delete_calendar(auth_payload, calendar_id: int):
     """
-    Elimina un calendario (y opcionalmente sus eventos).
+    Elimina un calendario; sus eventos los borra la base de datos (ON DELETE CASCADE).
+    Con ?background=1 los eventos se borran por lotes en segundo plano (purge.py) y se
+    responde 202 enseguida.
     """
     from .utils import APIException
+    from .purge import purge_in_background
     user_id = auth_payload.get("user_id")
 
     cal = Calendar.query.filter_by(id=calendar_id, user_id=user_id).first()
     if not cal:
         raise APIException("Calendario no encontrado", 404)
 
-    # Si quieres eliminar también los eventos asociados, descomenta:
-    # Event.query.filter_by(calendar_id=calendar_id, user_id=user_id).delete()
+    if (request.args.get("background") or "").lower() in ("1", "true", "yes"):
+        purge_in_background("calendar", calendar_id)
+        return jsonify({"message": "Borrando calendario en segundo plano"}), 202
 
     db.session.delete(cal)
     db.session.commit()
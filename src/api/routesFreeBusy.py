@@ -0,0 +1,202 @@
+"""
+Disponibilidad del usuario calculada en el servidor:
+- GET /api/freebusy?start=&end=&calendars=1,2         → intervalos ocupados ya unidos
+- GET /api/free-slots?duration=60&start=&end=&count=5 → próximos huecos libres
+
+Ambos leen solo la ventana pedida (consulta por rango sobre los índices de event/task),
+expanden eventos y tareas recurrentes y unen los intervalos con un barrido O(n log n).
+Opcionales: include_tasks=1 cuenta las tareas pendientes con fecha como ocupadas
+(task_minutes, por defecto 30, es lo que dura cada una).
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+from flask import request, jsonify
+
+from .models import Event, Task
+from .routes import api, token_required
+from .routesEvent import _parse_iso_datetime, events_in_range, event_occurrences
+from .recurrence import occurrence_cache
+from .intervals import merge_intervals, clip, free_slots
+from .utils import APIException
+
+DEFAULT_TASK_MINUTES = 30
+DEFAULT_SLOT_COUNT = 5
+MAX_SLOT_COUNT = 50
+DEFAULT_SEARCH_DAYS = 14
+MAX_WINDOW_DAYS = 366
+# duration, step y task_minutes: nada puede durar más que la ventana más larga
+MAX_MINUTES = MAX_WINDOW_DAYS * 24 * 60
+
+
+# ---------- Helpers ----------
+
+def _int_arg(name: str, default: Optional[int] = None) -> Optional[int]:
+    raw = request.args.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        raise APIException(f"{name} debe ser un entero", 400)
+
+
+def _minutes_arg(name: str, default: Optional[int] = None) -> Optional[int]:
+    """Entero de minutos entre 1 y MAX_MINUTES (None si no viene y no hay default)."""
+    minutes = _int_arg(name, default)
+    if minutes is not None and not 1 <= minutes <= MAX_MINUTES:
+        raise APIException(f"{name} debe estar entre 1 y {MAX_MINUTES} minutos", 400)
+    return minutes
+
+
+def _datetime_arg(name: str, default: Optional[datetime] = None) -> Optional[datetime]:
+    raw = request.args.get(name)
+    if not raw:
+        return default
+    try:
+        return _parse_iso_datetime(raw)
+    except ValueError as e:
+        raise APIException(str(e), 400)
+
+
+def _calendar_ids_arg() -> Optional[list[int]]:
+    raw = (request.args.get("calendars") or "").strip()
+    if not raw:
+        return None
+    try:
+        return [int(x) for x in raw.split(",") if x.strip()]
+    except ValueError:
+        raise APIException("calendars debe ser una lista de ids separados por comas", 400)
+
+
+def _validate_window(start_dt: datetime, end_dt: datetime):
+    if end_dt <= start_dt:
+        raise APIException("end debe ser posterior a start", 400)
+    if end_dt - start_dt > timedelta(days=MAX_WINDOW_DAYS):
+        raise APIException(f"La ventana no puede superar {MAX_WINDOW_DAYS} días", 400)
+    # Margen para sumar (o restar) cualquier duración admitida sin salirse de datetime
+    if end_dt > datetime.max - timedelta(minutes=MAX_MINUTES):
+        raise APIException("end fuera del rango de fechas admitido", 400)
+    if start_dt < datetime.min + timedelta(minutes=MAX_MINUTES):
+        raise APIException("start fuera del rango de fechas admitido", 400)
+
+
+def _whole_days(start: datetime, end: datetime) -> tuple[datetime, datetime]:
+    """Un evento de día completo ocupa desde las 00:00 hasta las 00:00 del día siguiente."""
+    day_start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end = end.replace(hour=0, minute=0, second=0, microsecond=0)
+    if day_end < end or day_end == day_start:
+        day_end += timedelta(days=1)
+    return day_start, day_end
+
+
+def busy_intervals(user_id: int, start_dt: datetime, end_dt: datetime,
+                   calendar_ids: Optional[list[int]] = None, include_tasks: bool = False,
+                   task_duration: timedelta = timedelta(minutes=DEFAULT_TASK_MINUTES)) -> list:
+    """Intervalos ocupados del usuario en la ventana, unidos y recortados a ella."""
+    # Un evento de día completo puede empezar antes de la ventana (por la hora): margen de un día
+    fetch_start, fetch_end = start_dt - timedelta(days=1), end_dt + timedelta(days=1)
+    intervals = []
+
+    def add(start, end, all_day):
+        intervals.append(_whole_days(start, end) if all_day else (start, end))
+
+    for recurring in (False, True):
+        q = events_in_range(user_id, fetch_start, fetch_end, recurring=recurring)
+        if calendar_ids is not None:
+            q = q.filter(Event.calendar_id.in_(calendar_ids))
+        for ev in q:
+            if recurring:
+                for occ_start, occ_end in event_occurrences(ev, fetch_start, fetch_end):
+                    add(occ_start, occ_end, ev.all_day)
+            else:
+                add(ev.start_date, ev.end_date, ev.all_day)
+
+    if include_tasks:
+        pending = Task.query.filter(Task.user_id == user_id, Task.status.isnot(True))
+        dated = pending.filter(Task.recurrence_rule.is_(None),
+                               Task.date >= start_dt - task_duration, Task.date < end_dt)
+        for task in dated:
+            intervals.append((task.date, task.date + task_duration))
+        series = pending.filter(Task.recurrence_rule.isnot(None), Task.date < end_dt)
+        for task in series:
+            intervals.extend(occurrence_cache.get(
+                "task", task.id, task.recurrence_rule, task.recurrence_exdates,
+                task.date, task_duration, start_dt, end_dt))
+
+    return clip(merge_intervals(intervals), start_dt, end_dt)
+
+
+def _busy_args() -> dict:
+    task_minutes = _minutes_arg("task_minutes", DEFAULT_TASK_MINUTES)
+    return {
+        "calendar_ids": _calendar_ids_arg(),
+        "include_tasks": (request.args.get("include_tasks") or "").lower() in ("1", "true", "yes"),
+        "task_duration": timedelta(minutes=task_minutes),
+    }
+
+
+# ---------- Endpoints ----------
+
+@api.route("/freebusy", methods=["OPTIONS"])
+@api.route("/free-slots", methods=["OPTIONS"])
+def freebusy_options():
+    return ("", 204)
+
+
+@api.route("/freebusy", methods=["GET"])
+@token_required
+def get_freebusy(auth_payload):
+    """
+    /api/freebusy?start=2025-09-08&end=2025-09-15&calendars=1,2
+    → {"start": ..., "end": ..., "busy": [{"start": ..., "end": ...}, ...]}
+    """
+    user_id = auth_payload.get("user_id")
+    start_dt = _datetime_arg("start")
+    end_dt = _datetime_arg("end")
+    if not start_dt or not end_dt:
+        raise APIException("start y end son requeridos", 400)
+    _validate_window(start_dt, end_dt)
+
+    busy = busy_intervals(user_id, start_dt, end_dt, **_busy_args())
+    return jsonify({
+        "start": start_dt.isoformat(),
+        "end": end_dt.isoformat(),
+        "busy": [{"start": s.isoformat(), "end": e.isoformat()} for s, e in busy],
+    }), 200
+
+
+@api.route("/free-slots", methods=["GET"])
+@token_required
+def get_free_slots(auth_payload):
+    """
+    /api/free-slots?duration=60&count=5[&start=...&end=...&step=30]
+    duration y step en minutos; por defecto busca desde ahora y durante 14 días.
+    → {"duration": 60, "slots": [{"start": ..., "end": ...}, ...]}
+    """
+    user_id = auth_payload.get("user_id")
+    duration = _minutes_arg("duration")
+    if duration is None:
+        raise APIException("duration (minutos) es requerido", 400)
+    count = _int_arg("count", DEFAULT_SLOT_COUNT)
+    if count < 1 or count > MAX_SLOT_COUNT:
+        raise APIException(f"count debe estar entre 1 y {MAX_SLOT_COUNT}", 400)
+    step = _minutes_arg("step", duration)
+
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    start_dt = _datetime_arg("start", now)
+    try:
+        end_dt = _datetime_arg("end", start_dt + timedelta(days=DEFAULT_SEARCH_DAYS))
+    except OverflowError:
+        raise APIException("start fuera del rango de fechas admitido", 400)
+    _validate_window(start_dt, end_dt)
+
+    busy = busy_intervals(user_id, start_dt, end_dt, **_busy_args())
+    slots = []
+    for slot_start, slot_end in free_slots(busy, start_dt, end_dt,
+                                           timedelta(minutes=duration), timedelta(minutes=step)):
+        slots.append({"start": slot_start.isoformat(), "end": slot_end.isoformat()})
+        if len(slots) >= count:
+            break
+
+    return jsonify({"duration": duration, "slots": slots}), 200
@@ -0,0 +1,252 @@
+"""
+Exportación e importación de calendarios en formato iCalendar (.ics):
+- GET  /api/calendars/<id>/export.ics → VCALENDAR en streaming desde un cursor de servidor
+- POST /api/calendars/<id>/import     → importa un .ics (multipart "file" o body text/calendar)
+
+La importación lee el fichero línea a línea, valida cada VEVENT con las mismas reglas que
+POST /api/events y los inserta por lotes de IMPORT_BATCH con un único INSERT ... RETURNING
+(executemany). Los VEVENT que no se pueden importar se devuelven en "skipped" (como
+mucho MAX_REPORTED_ERRORS; "skipped_total" los cuenta todos).
+
+El UID de cada VEVENT se guarda en event.ical_uid: los que ya están en el calendario (o
+se repiten en el fichero) se saltan, así que importar dos veces el mismo fichero no
+duplica nada (los VEVENT sin UID se importan siempre). Las excepciones de una serie
+(RECURRENCE-ID) comparten UID y no se importan.
+Con ?check_conflicts=1 (y conflict_scope) los VEVENT que se solapan con eventos
+existentes o con otros del fichero se saltan con su lista de "conflicts": se usa el
+mismo ConflictChecker que POST /api/events y /api/batch, con una sola carga para todo
+el fichero (que en ese caso se lee entero antes de insertar).
+"""
+import io
+from datetime import datetime, time, timedelta
+from types import SimpleNamespace
+
+from flask import Response, request, jsonify, stream_with_context
+from sqlalchemy import insert, select
+
+from .models import db, Event, Calendar
+from .routes import api, token_required
+from .routesEvent import (_parse_iso_datetime, _recurrence_fields, validate_event_range,
+                          conflict_options, ConflictChecker)
+from .pagination import STREAM_BATCH
+from .conditional import conditional_get
+from .changes import record_changes
+from .ical import calendar_lines, iter_vevents, to_iso, parse_duration, unescape_text
+from .utils import APIException
+
+IMPORT_BATCH = 500
+MAX_IMPORT_EVENTS = 50000
+MAX_REPORTED_ERRORS = 100
+STATUSES = {"CONFIRMED": "confirmed", "TENTATIVE": "tentative", "CANCELLED": "cancelled"}
+# VEVENT con hora y sin DTEND ni DURATION: en iCalendar dura 0, aquí no se admite
+DEFAULT_DURATION = timedelta(hours=1)
+
+
+# ---------- Helpers ----------
+
+def _owned_calendar(calendar_id: int, user_id: int) -> Calendar:
+    cal = Calendar.query.filter_by(id=calendar_id, user_id=user_id).first()
+    if not cal:
+        raise APIException("Calendario no encontrado", 404)
+    return cal
+
+
+def _text(props: dict, name: str):
+    if name not in props:
+        return None
+    value = unescape_text(props[name][1]).strip()
+    return value or None
+
+
+def _ical_datetime(prop) -> tuple[datetime, bool]:
+    params, value = prop
+    iso, date_only = to_iso(value)
+    return _parse_iso_datetime(iso), date_only or params.get("VALUE", "").upper() == "DATE"
+
+
+def event_row_from_vevent(props: dict, user_id: int, calendar_id: int) -> tuple[dict, list]:
+    """
+    Convierte un VEVENT en la fila a insertar en event. Devuelve (fila, avisos).
+    Lanza ValueError si el VEVENT no tiene las fechas mínimas.
+    """
+    warnings = []
+    if "DTSTART" not in props:
+        raise ValueError("Falta DTSTART")
+    start_dt, all_day = _ical_datetime(props["DTSTART"])
+
+    if "DTEND" in props:
+        end_dt, _ = _ical_datetime(props["DTEND"])
+    elif "DURATION" in props and parse_duration(props["DURATION"][1]) is not None:
+        end_dt = start_dt + parse_duration(props["DURATION"][1])
+    elif all_day:
+        end_dt = start_dt + timedelta(days=1)
+    else:
+        end_dt = start_dt + DEFAULT_DURATION
+        warnings.append(f"Sin DTEND ni DURATION: se importa con {DEFAULT_DURATION.seconds // 3600} h de duración")
+
+    if all_day:
+        # El DTEND de día completo es exclusivo en iCalendar; aquí se guarda hasta las
+        # 23:59:59 del último día, como hace _normalize_all_day al crear por la API
+        last_day = max((end_dt - timedelta(days=1)).date(), start_dt.date())
+        start_dt = datetime.combine(start_dt.date(), time())
+        end_dt = datetime.combine(last_day, time(23, 59, 59))
+    # Las mismas reglas que al crear por la API (fin posterior al inicio, duración máxima)
+    validate_event_range(start_dt, end_dt)
+
+    recurrence = {"recurrence_rule": None, "recurrence_exdates": None, "recurrence_end": None}
+    if "RRULE" in props:
+        exdates = []
+        for _, value in props.get("EXDATE", []):
+            exdates.extend(to_iso(v)[0] for v in value.split(",") if v.strip())
+        try:
+            recurrence = _recurrence_fields(props["RRULE"][1], exdates, start_dt, end_dt)
+        except ValueError as e:
+            warnings.append(f"Recurrencia no soportada, se importa solo la primera ocurrencia: {e}")
+
+    status = (_text(props, "STATUS") or "").upper()
+    color = _text(props, "COLOR")
+    uid = _text(props, "UID")
+    row = {
+        "user_id": user_id,
+        "calendar_id": calendar_id,
+        "ical_uid": uid[:255] if uid else None,
+        "title": (_text(props, "SUMMARY") or "(Sin título)")[:200],
+        "start_date": start_dt,
+        "end_date": end_dt,
+        "all_day": all_day,
+        "description": _text(props, "DESCRIPTION"),
+        "color": color[:50] if color else None,
+        "status": STATUSES.get(status, "confirmed"),
+        **recurrence,
+    }
+    return row, warnings
+
+
+class _Report:
+    """Saltados y avisos de una importación; las listas se cortan en MAX_REPORTED_ERRORS."""
+
+    def __init__(self):
+        self.skipped, self.skipped_total, self.warnings = [], 0, []
+
+    def skip(self, index: int, uid, error: str, **extra) -> None:
+        self.skipped_total += 1
+        if len(self.skipped) < MAX_REPORTED_ERRORS:
+            self.skipped.append({"index": index, "uid": uid, "error": error, **extra})
+
+    def warn(self, index: int, uid, warnings: list) -> None:
+        if warnings and len(self.warnings) < MAX_REPORTED_ERRORS:
+            self.warnings.extend({"index": index, "uid": uid, "warning": w} for w in warnings)
+
+
+def _vevent_rows(user_id: int, calendar_id: int, report: _Report):
+    """(índice, uid, fila) de los VEVENT válidos y no importados ya, en orden del fichero."""
+    seen = set(db.session.scalars(
+        select(Event.ical_uid).where(Event.calendar_id == calendar_id,
+                                     Event.ical_uid.isnot(None))))
+    for index, props in enumerate(iter_vevents(_ics_lines())):
+        if index >= MAX_IMPORT_EVENTS:
+            raise APIException(
+                f"El fichero supera el máximo de {MAX_IMPORT_EVENTS} eventos", 413)
+        uid = _text(props, "UID")
+        try:
+            row, row_warnings = event_row_from_vevent(props, user_id, calendar_id)
+        except ValueError as e:
+            report.skip(index, uid, str(e))
+            continue
+        if row["ical_uid"] is not None:
+            if row["ical_uid"] in seen:
+                report.skip(index, uid, "Ya importado (mismo UID)")
+                continue
+            seen.add(row["ical_uid"])
+        report.warn(index, uid, row_warnings)
+        yield index, uid, row
+
+
+def _without_conflicts(user_id: int, rows, scope: str, report: _Report) -> list:
+    """Filas que no se solapan con eventos existentes ni con las anteriores del fichero."""
+    rows = list(rows)
+    previews = [SimpleNamespace(id=None, **row) for _, _, row in rows]
+    checker = ConflictChecker(user_id, previews, scope)
+    accepted = []
+    for (index, uid, row), preview in zip(rows, previews):
+        conflicts = checker.conflicts(preview)
+        if conflicts:
+            report.skip(index, uid, "El evento se solapa con otros eventos", conflicts=conflicts)
+            continue
+        checker.accept(preview)
+        accepted.append((index, uid, row))
+    return accepted
+
+
+def _insert_rows(user_id: int, rows: list) -> int:
+    ids = db.session.scalars(insert(Event).returning(Event.id), rows).all()
+    record_changes(user_id, "event", ids, "upsert")
+    return len(ids)
+
+
+def _ics_lines():
+    """Líneas del .ics subido, sin leerlo entero: multipart "file" o el body tal cual."""
+    upload = request.files.get("file")
+    raw = upload.stream if upload else io.BufferedReader(request.stream)
+    return io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace", newline="")
+
+
+# ---------- Endpoints ----------
+
+@api.route("/calendars/<int:calendar_id>/export.ics", methods=["OPTIONS"])
+@api.route("/calendars/<int:calendar_id>/import", methods=["OPTIONS"])
+def ical_options(calendar_id: int):
+    return ("", 204)
+
+
+@api.route("/calendars/<int:calendar_id>/export.ics", methods=["GET"])
+@token_required
+@conditional_get("event", "calendar")
+def export_calendar(auth_payload, calendar_id: int):
+    user_id = auth_payload.get("user_id")
+    cal = _owned_calendar(calendar_id, user_id)
+
+    events = Event.query.filter_by(user_id=user_id, calendar_id=calendar_id) \
+        .order_by(Event.id.asc()).yield_per(STREAM_BATCH)
+    lines = calendar_lines(events, cal.title, request.host)
+
+    resp = Response(stream_with_context(lines), mimetype="text/calendar")
+    resp.headers["Content-Disposition"] = f'attachment; filename="calendar-{calendar_id}.ics"'
+    return resp
+
+
+@api.route("/calendars/<int:calendar_id>/import", methods=["POST"])
+@token_required
+def import_calendar(auth_payload, calendar_id: int):
+    """
+    curl -H "Authorization: Bearer ..." -F file=@agenda.ics /api/calendars/1/import
+    → {"imported": 1200, "skipped": [{"index": 7, "uid": "...", "error": "..."}],
+       "skipped_total": 1, "warnings": [...]}
+    ?check_conflicts=1&conflict_scope=calendar|all salta los que se solapan.
+    Todo o nada a nivel de base de datos: si falla un lote no se importa ninguno.
+    """
+    user_id = auth_payload.get("user_id")
+    _owned_calendar(calendar_id, user_id)
+    check_conflicts, conflict_scope = conflict_options({})
+
+    report = _Report()
+    imported, batch = 0, []
+    try:
+        rows = _vevent_rows(user_id, calendar_id, report)
+        if check_conflicts:
+            rows = _without_conflicts(user_id, rows, conflict_scope, report)
+        for _, _, row in rows:
+            batch.append(row)
+            if len(batch) >= IMPORT_BATCH:
+                imported += _insert_rows(user_id, batch)
+                batch = []
+        if batch:
+            imported += _insert_rows(user_id, batch)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return jsonify({"imported": imported,
+                    "skipped": sorted(report.skipped, key=lambda item: item["index"]),
+                    "skipped_total": report.skipped_total, "warnings": report.warnings}), 200
@@ -4,8 +4,13 @@ Rutas para la barra lateral:
 - TaskGroups (grupos de tareas)
 """
 from flask import request, jsonify, Blueprint
+from sqlalchemy.orm import selectinload
 from .models import db, Calendar, TaskGroup
 from .routes import api, token_required
+from .conditional import conditional_get
+from .idempotency import idempotent
+from .rowserialize import groups_with_tasks, sparse_groups_args
+from .purge import purge_in_background
 from .utils import APIException
 
 # ---------- Helpers ----------
@@ -14,16 +19,16 @@ lateral = Blueprint('apiLateral', __name__)
 
 
 def _validate_calendar_ownership(calendar_id: int, user_id: int) -> Calendar:
-    cal = Calendar.query.filter_by(id=calendar_id, user_id=user_id).first()
-    if not cal:
+    cal = db.session.get(Calendar, calendar_id)
+    if not cal or cal.user_id != user_id:
         raise APIException(
             "El calendario no existe o no pertenece al usuario", 404)
     return cal
 
 
 def _validate_taskgroup_ownership(group_id: int, user_id: int) -> TaskGroup:
-    tg = TaskGroup.query.filter_by(id=group_id, user_id=user_id).first()
-    if not tg:
+    tg = db.session.get(TaskGroup, group_id)
+    if not tg or tg.user_id != user_id:
         raise APIException("El grupo no existe o no pertenece al usuario", 404)
     return tg
 
@@ -37,15 +42,20 @@ def taskgroups_options(group_id=None):
 
 @api.route("/task-groups", methods=["GET"])
 @token_required
+@conditional_get("task_group", "task", cache=True)
 def list_task_groups(auth_payload):
     user_id = auth_payload.get("user_id")
-    groups = TaskGroup.query.filter_by(
-        user_id=user_id).order_by(TaskGroup.id.asc()).all()
-    return jsonify([g.serialize_with_tasks() for g in groups]), 200
+    # Solo lectura: grupos y sus tareas como filas (dos consultas, sin instancias ORM).
+    # ?fields=, ?task_fields= e ?include= (vacío → sin tareas, una sola consulta)
+    groups_rows, tasks_rows, include_tasks = sparse_groups_args()
+    return jsonify(groups_with_tasks(
+        groups_rows.select().where(TaskGroup.user_id == user_id).order_by(TaskGroup.id.asc()),
+        groups_rows, tasks_rows, include_tasks)), 200
 
 
 @api.route("/task-groups", methods=["POST"])
 @token_required
+@idempotent
 def create_task_group(auth_payload):
     user_id = auth_payload.get("user_id")
     data = request.get_json() or {}
@@ -57,10 +67,13 @@ def create_task_group(auth_payload):
     if not color:
         raise APIException("El color es requerido", 400)
 
-    tg = TaskGroup(user_id=user_id, title=title, color=color)
+    # tasks=[] evita la carga perezosa de la colección (vacía) al serializar
+    tg = TaskGroup(user_id=user_id, title=title, color=color, tasks=[])
     db.session.add(tg)
+    db.session.flush()
+    result = tg.serialize_with_tasks()
     db.session.commit()
-    return jsonify(tg.serialize_with_tasks()), 201
+    return jsonify(result), 201
 
 
 @api.route("/task-groups/<int:group_id>", methods=["PUT", "PATCH"])
@@ -69,7 +82,8 @@ def update_task_group(auth_payload, group_id: int):
     user_id = auth_payload.get("user_id")
     data = request.get_json() or {}
 
-    tg = TaskGroup.query.filter_by(id=group_id, user_id=user_id).first()
+    tg = TaskGroup.query.filter_by(id=group_id, user_id=user_id) \
+        .options(selectinload(TaskGroup.tasks)).first()
     if not tg:
         raise APIException("Grupo no encontrado", 404)
 
@@ -82,8 +96,11 @@ def update_task_group(auth_payload, group_id: int):
     if "color" in data:
         tg.color = (data.get("color") or "").strip() or None
 
+    # Se serializa antes del commit para no recargar el grupo y sus tareas expirados
+    db.session.flush()
+    result = tg.serialize_with_tasks()
     db.session.commit()
-    return jsonify(tg.serialize_with_tasks()), 200
+    return jsonify(result), 200
 
 @api.route("/task-groups/<int:group_id>", methods=["DELETE"])
 @token_required
@@ -93,6 +110,11 @@ def delete_task_group(auth_payload, group_id: int):
     if not tg:
         raise APIException("Grupo no encontrado", 404)
 
+    # Las tareas las borra la base de datos (ON DELETE CASCADE); ver purge.py
+    if (request.args.get("background") or "").lower() in ("1", "true", "yes"):
+        purge_in_background("task_group", group_id)
+        return jsonify({"message": "Borrando grupo en segundo plano"}), 202
+
     db.session.delete(tg)
     db.session.commit()
     return jsonify({"message": "Grupo eliminado"}), 200
@@ -0,0 +1,137 @@
+"""
+Sincronización incremental:
+- GET /api/sync                → estado completo + cursor
+- GET /api/sync?since=<cursor> → solo lo que cambió después de ese cursor
+
+Respuesta:
+{
+  "cursor": "42", "has_more": false, "full": false,
+  "calendars":   {"upserted": [...], "deleted": [3]},
+  "task_groups": {"upserted": [...], "deleted": []},
+  "tasks":       {"upserted": [...], "deleted": []},
+  "events":      {"upserted": [...], "deleted": [17, 18]}
+}
+Con has_more=true hay que volver a pedir con el nuevo cursor. Los eventos recurrentes
+se devuelven como serie (sin expandir). Al borrar un calendario o un grupo, el cliente
+debe descartar también sus eventos/tareas aunque no lleguen lápidas individuales.
+"""
+from flask import request, jsonify
+from sqlalchemy import select
+
+from .models import db, User, Event, Task, TaskGroup, Calendar, ChangeLog
+from .routes import api, token_required
+from .utils import APIException
+
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 5000
+# entidad del ChangeLog → (modelo, clave en la respuesta)
+ENTITIES = {
+    "calendar": (Calendar, "calendars"),
+    "task_group": (TaskGroup, "task_groups"),
+    "task": (Task, "tasks"),
+    "event": (Event, "events"),
+}
+
+
+# ---------- Helpers ----------
+
+def _empty_payload() -> dict:
+    return {key: {"upserted": [], "deleted": []} for _, key in ENTITIES.values()}
+
+
+def _full_snapshot(user_id: int) -> dict:
+    payload = _empty_payload()
+    for model, key in ENTITIES.values():
+        rows = model.query.filter_by(user_id=user_id).order_by(model.id.asc())
+        payload[key]["upserted"] = [row.serialize() for row in rows]
+    return payload
+
+
+def _changes_since(user_id: int, since: int, limit: int) -> tuple[dict, int, bool]:
+    """
+    Lee como mucho `limit` entradas del ChangeLog posteriores a `since` sin partir
+    una misma secuencia entre dos páginas, y las reduce a la última operación por entidad.
+    """
+    rows = ChangeLog.query.filter(ChangeLog.user_id == user_id, ChangeLog.seq > since) \
+        .order_by(ChangeLog.seq.asc(), ChangeLog.id.asc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    if has_more:
+        boundary = rows[limit].seq
+        kept = [r for r in rows if r.seq < boundary]
+        if not kept:
+            # Una sola secuencia con más de `limit` entradas: se envía completa
+            kept = ChangeLog.query.filter_by(user_id=user_id, seq=boundary) \
+                .order_by(ChangeLog.id.asc()).all()
+        rows = kept
+    cursor = rows[-1].seq if rows else since
+
+    latest = {}
+    for row in rows:
+        latest[(row.entity, row.entity_id)] = row.op
+
+    payload = _empty_payload()
+    upserts = {entity: [] for entity in ENTITIES}
+    for (entity, entity_id), op in latest.items():
+        if entity not in ENTITIES:
+            continue
+        if op == "delete":
+            payload[ENTITIES[entity][1]]["deleted"].append(entity_id)
+        else:
+            upserts[entity].append(entity_id)
+
+    # Una consulta IN por tipo para el estado actual de lo modificado
+    for entity, ids in upserts.items():
+        if not ids:
+            continue
+        model, key = ENTITIES[entity]
+        found = {row.id: row for row in model.query.filter(
+            model.user_id == user_id, model.id.in_(ids))}
+        for entity_id in ids:
+            if entity_id in found:
+                payload[key]["upserted"].append(found[entity_id].serialize())
+            else:
+                payload[key]["deleted"].append(entity_id)
+
+    for section in payload.values():
+        section["upserted"].sort(key=lambda item: item["id"])
+        section["deleted"].sort()
+    return payload, cursor, has_more
+
+
+# ---------- Endpoints ----------
+
+@api.route("/sync", methods=["OPTIONS"])
+def sync_options():
+    return ("", 204)
+
+
+@api.route("/sync", methods=["GET"])
+@token_required
+def sync(auth_payload):
+    user_id = auth_payload.get("user_id")
+
+    since_qs = request.args.get("since")
+    try:
+        limit = int(request.args.get("limit", DEFAULT_LIMIT))
+        since = int(since_qs) if since_qs else None
+    except ValueError:
+        raise APIException("since y limit deben ser enteros", 400)
+    if limit < 1 or limit > MAX_LIMIT:
+        raise APIException(f"limit debe estar entre 1 y {MAX_LIMIT}", 400)
+
+    current = db.session.execute(
+        select(User.sync_seq).where(User.id == user_id)).scalar()
+    if current is None:
+        raise APIException("Usuario no encontrado", 404)
+
+    if since is None or since < 0:
+        payload, cursor, has_more = _full_snapshot(user_id), current, False
+        full = True
+    elif since > current:
+        raise APIException("Cursor inválido", 400)
+    else:
+        payload, cursor, has_more = _changes_since(user_id, since, limit)
+        full = False
+
+    return jsonify({"cursor": str(cursor), "has_more": has_more, "full": full,
+                    **payload}), 200
@@ -1,8 +1,16 @@
 import os
 from flask import Flask, request, jsonify, url_for, Blueprint
+from sqlalchemy.orm import selectinload
 from api.models import db, User, Task, TaskGroup
 from datetime import datetime
 from .routes import api
+from .conditional import conditional_get
+from .idempotency import idempotent
+from .rowserialize import TASK_ROWS, groups_with_tasks, sparse_fields, sparse_groups_args
+from .recurrence import RecurrenceRule, format_exdates, exdates_to_list, occurrence_cache
+from .purge import purge_in_background
+from .pagination import (page_args, keyset_order, keyset_filter, paginated_response,
+                         stream_json_array, STREAM_BATCH)
 
 # Handle/serialize errors like a JSON object
 task = Blueprint('task', __name__)
@@ -10,33 +18,76 @@ task = Blueprint('task', __name__)
 
 # AQUI EMPIEZAN MIS RUTAS! --->
 
+
+def task_recurrence_changes(data: dict) -> dict:
+    """
+    Lee recurrence_rule / recurrence_exdates del body y los normaliza.
+    Devuelve solo los campos presentes; lanza ValueError si no son válidos.
+    """
+    changes = {}
+    if "recurrence_rule" in data:
+        rule_raw = data.get("recurrence_rule")
+        if rule_raw and not isinstance(rule_raw, str):
+            raise ValueError("recurrence_rule debe ser un texto RRULE")
+        changes["recurrence_rule"] = str(RecurrenceRule.parse(rule_raw)) if rule_raw else None
+    if "recurrence_exdates" in data:
+        exdates_raw = data.get("recurrence_exdates")
+        if isinstance(exdates_raw, str):
+            exdates_raw = exdates_to_list(exdates_raw)
+        elif exdates_raw is not None and not isinstance(exdates_raw, list):
+            raise ValueError("recurrence_exdates debe ser una lista de fechas ISO")
+        changes["recurrence_exdates"] = format_exdates(exdates_raw)
+    return changes
+
 # Endpoints
 
 
 #  Obtener todas las tareas de un usuario
 
 @api.route("/users/<int:user_id>/tasks", methods=["GET"])
+@conditional_get("task")
 def get_user_tasks(user_id):
-    tasks = Task.query.filter_by(user_id=user_id).all()
-    return jsonify([task.serialize() for task in tasks]), 200
+    # Paginación opcional por cursor sobre (date, id) y ?stream=1 para volcados grandes
+    limit, cursor, stream = page_args()
+
+    q = Task.query.filter_by(user_id=user_id)
+    q = keyset_filter(q, Task.date, Task.id, cursor, nullable=True)
+    q = keyset_order(q, Task.date, Task.id, nullable=True)
+    # Filas de solo lectura, sin instancias ORM; ?fields= limita columnas y claves
+    rows = sparse_fields(TASK_ROWS, extra_columns=("id", "date"))
+    q = q.with_entities(*rows.columns)
+
+    if stream:
+        return stream_json_array(q.yield_per(STREAM_BATCH), rows)
+    if limit:
+        return paginated_response(q.limit(limit + 1), lambda t: (t.date, t.id), rows, limit)
+
+    return jsonify([rows(t) for t in q]), 200
 
 
 # Crear nueva tarea para un usuario
 
 @api.route("/users/<int:user_id>/tasks", methods=["POST"])
+@idempotent
 def create_task(user_id):
     data = request.get_json()
 
     if "title" not in data:
         return jsonify({"error": "Falta el campo 'title'"}), 400
 
+    try:
+        recurrence = task_recurrence_changes(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     new_task = Task(
         user_id=user_id,
         title=data["title"],
         status=data.get("status", False),
         date=data.get("date"),
         recurrencia=data.get("recurrencia"),
-        color=data.get("color")
+        color=data.get("color"),
+        **recurrence
     )
 
     db.session.add(new_task)
@@ -53,6 +104,7 @@ def delete_task(user_id, task_id):
     if not task:
         return jsonify({"error": "Tarea no encontrada"}), 404
 
+    occurrence_cache.invalidate("task", task.id)
     db.session.delete(task)
     db.session.commit()
     return jsonify({"msg": "Tarea eliminada correctamente"}), 200
@@ -89,6 +141,13 @@ def update_task(user_id, task_id):
     task.recurrencia = data.get("recurrencia", task.recurrencia)
     task.color = data.get("color", task.color)
 
+    try:
+        for attr, value in task_recurrence_changes(data).items():
+            setattr(task, attr, value)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    occurrence_cache.invalidate("task", task.id)
+
     db.session.commit()
     return jsonify(task.serialize()), 200
 
@@ -99,12 +158,16 @@ def update_task(user_id, task_id):
 
 
 @api.route("/users/<int:user_id>/groups", methods=["GET"])
+@conditional_get("task_group", "task", cache=True)
 def get_user_groups(user_id):
-    groups = TaskGroup.query.filter_by(user_id=user_id).all()
-    return jsonify([g.serialize_with_tasks() for g in groups]), 200
+    groups_rows, tasks_rows, include_tasks = sparse_groups_args()
+    groups = groups_with_tasks(groups_rows.select().where(TaskGroup.user_id == user_id)
+                               .order_by(TaskGroup.id), groups_rows, tasks_rows, include_tasks)
+    return jsonify(groups), 200
 
 # Crear un nuevo grupo para un usuario
 @api.route("/users/<int:user_id>/groups", methods=["POST"])
+@idempotent
 def create_group(user_id):
     data = request.get_json()
     if "title" not in data:
@@ -113,26 +176,34 @@ def create_group(user_id):
     new_group = TaskGroup(
         user_id=user_id,
         title=data["title"],
-        color=data.get("color")
+        color=data.get("color"),
+        tasks=[]
     )
 
     db.session.add(new_group)
+    db.session.flush()
+    result = new_group.serialize_with_tasks()
     db.session.commit()
-    return jsonify(new_group.serialize_with_tasks()), 201
+    return jsonify(result), 201
 
 
 # Obtener un grupo específico con sus tareas
 @api.route("/users/<int:user_id>/groups/<int:task_group_id>", methods=["GET"])
+@conditional_get("task_group", "task")
 def get_group(user_id, task_group_id):
-    group = TaskGroup.query.filter_by(id=task_group_id, user_id=user_id).first()
-    if not group:
+    groups_rows, tasks_rows, include_tasks = sparse_groups_args()
+    groups = groups_with_tasks(groups_rows.select()
+                               .where(TaskGroup.id == task_group_id, TaskGroup.user_id == user_id),
+                               groups_rows, tasks_rows, include_tasks)
+    if not groups:
         return jsonify({"error": "Grupo no encontrado"}), 404
 
-    return jsonify(group.serialize_with_tasks()), 200
+    return jsonify(groups[0]), 200
 
 
 # Crear una nueva tarea dentro de un grupo
 @api.route("/users/<int:user_id>/groups/<int:task_group_id>/tasks", methods=["POST"])
+@idempotent
 def create_task_in_group(user_id, task_group_id):
     group = TaskGroup.query.filter_by(id=task_group_id, user_id=user_id).first()
     if not group:
@@ -146,6 +217,11 @@ def create_task_in_group(user_id, task_group_id):
     date_str = data.get("date")
     task_date = datetime.fromisoformat(date_str) if date_str else None
 
+    try:
+        recurrence = task_recurrence_changes(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     # Crear la tarea
     new_task = Task(
         user_id=user_id,
@@ -154,7 +230,8 @@ def create_task_in_group(user_id, task_group_id):
         date=task_date,
         recurrencia=data.get("recurrencia"),
         color=data.get("color"),
-        task_group_id=group.id
+        task_group_id=group.id,
+        **recurrence
     )
 
     db.session.add(new_task)
@@ -166,7 +243,8 @@ def create_task_in_group(user_id, task_group_id):
 
 @api.route("/users/<int:user_id>/groups/<int:task_group_id>", methods=["PUT"])
 def update_group(user_id, task_group_id):
-    group = TaskGroup.query.filter_by(id=task_group_id, user_id=user_id).first()
+    group = TaskGroup.query.filter_by(id=task_group_id, user_id=user_id) \
+        .options(selectinload(TaskGroup.tasks)).first()
     if not group:
         return jsonify({"error": "Grupo no encontrado"}), 404
 
@@ -175,17 +253,23 @@ def update_group(user_id, task_group_id):
     group.title = data.get("title", group.title)
     group.color = data.get("color", group.color)
 
+    db.session.flush()
+    result = group.serialize_with_tasks()
     db.session.commit()
-    return jsonify(group.serialize_with_tasks()), 200
+    return jsonify(result), 200
 
 
-# Eliminar un grupo y sus tasks/events por cascade
+# Eliminar un grupo y sus tasks (ON DELETE CASCADE en la base de datos; ?background=1 por lotes)
 @api.route("/users/<int:user_id>/groups/<int:task_group_id>", methods=["DELETE"])
 def delete_group(user_id, task_group_id):
     group = TaskGroup.query.filter_by(id=task_group_id, user_id=user_id).first()
     if not group:
         return jsonify({"error": "Grupo no encontrado"}), 404
 
+    if (request.args.get("background") or "").lower() in ("1", "true", "yes"):
+        purge_in_background("task_group", task_group_id)
+        return jsonify({"msg": "Borrando grupo en segundo plano"}), 202
+
     db.session.delete(group)
     db.session.commit()
     return jsonify({"msg": "Grupo eliminado correctamente"}), 200
@@ -217,6 +301,13 @@ def update_task_in_group(user_id, task_group_id, task_id):
     task.recurrencia = data.get("recurrencia", task.recurrencia)
     task.color = data.get("color", task.color)
 
+    try:
+        for attr, value in task_recurrence_changes(data).items():
+            setattr(task, attr, value)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    occurrence_cache.invalidate("task", task.id)
+
     db.session.commit()
     return jsonify(task.serialize()), 200
 
@@ -231,6 +322,7 @@ def delete_task_in_group(user_id, task_group_id, task_id):
     if not task:
         return jsonify({"error": "Tarea no encontrada"}), 404
 
+    occurrence_cache.invalidate("task", task.id)
     db.session.delete(task)
     db.session.commit()
 
@@ -0,0 +1,238 @@
+"""
+Camino rápido de solo lectura para los listados: se seleccionan únicamente las columnas
+que usa Model.serialize() y cada fila (tupla) se convierte a dict con un itemgetter
+preparado una sola vez por modelo. Sin instancias ORM: ni identity map, ni estado de
+instrumentación, ni objetos que el GC tenga que recorrer después.
+
+    q = Event.query.filter(...)
+    rows = q.with_entities(*EVENT_ROWS.columns)      # mismos filtros/orden, filas Core
+    [EVENT_ROWS(r) for r in rows]                     # == [e.serialize() for e in q]
+
+Las filas tienen los mismos atributos que el modelo (r.id, r.start_date...), así que
+funcionan con los helpers de paginación y recurrencia. La salida tiene que ser idéntica
+a serialize(): `flask verify-row-serializers` compara ambos caminos byte a byte y el
+despliegue (render_build.sh) falla si no coinciden. Si se cambia un serialize() hay que
+cambiar aquí su lista de campos.
+
+?fields=id,title,start_date (sparse_fields) usa un subconjunto: solo se seleccionan
+esas columnas (más las que necesite la ruta para cursores o recurrencia, que no se
+emiten) y solo se devuelven esas claves. Así description (Text sin límite) no sale
+de la base de datos si no se pide.
+"""
+import json
+from operator import itemgetter
+
+from flask import request
+from sqlalchemy import select
+
+from .utils import APIException
+
+from .models import db, Event, Task, TaskGroup, Calendar
+from .recurrence import exdates_to_list
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+class RowSerializer:
+    """
+    fields: [(clave del dict, columna del modelo, conversor o None)] en el orden de
+    serialize(). Cada columna se selecciona una sola vez aunque la usen varias claves.
+    """
+
+    def __init__(self, model, fields: list, extra_columns: tuple = ()):
+        self.model = model
+        self.fields = fields
+        self.keys = tuple(key for key, _, _ in fields)
+        names = []
+        for column in [column for _, column, _ in fields] + list(extra_columns):
+            if column not in names:
+                names.append(column)
+        self.columns = tuple(getattr(model, name) for name in names)
+        self._subsets = {}
+
+        # Por fila: un itemgetter (en C) saca los valores en el orden de las claves y
+        # solo se recorre en Python la lista de campos con conversor
+        indexes = [names.index(column) for _, column, _ in fields]
+        if len(indexes) > 1:
+            self._values = itemgetter(*indexes)
+        else:   # itemgetter con un índice no devuelve tupla, y sin índices no existe
+            self._values = lambda row: tuple(row[i] for i in indexes)
+        self._converters = tuple((key, convert) for key, _, convert in fields if convert is not None)
+
+    def __call__(self, row) -> dict:
+        item = dict(zip(self.keys, self._values(row)))
+        for key, convert in self._converters:
+            item[key] = convert(item[key])
+        return item
+
+    def subset(self, keys, extra_columns: tuple = ()) -> "RowSerializer":
+        """
+        Serializador con solo `keys` (en el orden de serialize()). `extra_columns` se
+        seleccionan para que la ruta pueda leerlas de la fila (r.id...) pero no se emiten.
+        """
+        cache_key = (frozenset(keys), tuple(extra_columns))
+        serializer = self._subsets.get(cache_key)
+        if serializer is None:
+            fields = [f for f in self.fields if f[0] in keys]
+            serializer = self._subsets[cache_key] = RowSerializer(self.model, fields, extra_columns)
+        return serializer
+
+    def select(self):
+        return select(*self.columns)
+
+
+EVENT_ROWS = RowSerializer(Event, [
+    ("id", "id", None),
+    ("user_id", "user_id", None),
+    ("calendar_id", "calendar_id", None),
+    ("title", "title", None),
+    ("start_date", "start_date", _iso),
+    ("end_date", "end_date", _iso),
+    ("all_day", "all_day", None),
+    ("description", "description", None),
+    ("color", "color", None),
+    ("google_event_id", "google_event_id", None),
+    ("status", "status", None),
+    ("recurrence_rule", "recurrence_rule", None),
+    ("recurrence_exdates", "recurrence_exdates", exdates_to_list),
+])
+
+TASK_ROWS = RowSerializer(Task, [
+    ("id", "id", None),
+    ("user_id", "user_id", None),
+    ("task_group_id", "task_group_id", None),
+    ("title", "title", None),
+    ("status", "status", None),
+    ("date", "date", _iso),
+    ("recurrencia", "recurrencia", None),
+    ("color", "color", None),
+    ("recurrence_rule", "recurrence_rule", None),
+    ("recurrence_exdates", "recurrence_exdates", exdates_to_list),
+])
+
+TASK_GROUP_ROWS = RowSerializer(TaskGroup, [
+    ("id", "id", None),
+    ("user_id", "user_id", None),
+    ("title", "title", None),
+    ("color", "color", None),
+])
+
+CALENDAR_ROWS = RowSerializer(Calendar, [
+    ("id", "id", None),
+    ("user_id", "user_id", None),
+    ("title", "title", None),
+    ("color", "color", None),
+])
+
+SERIALIZERS = (EVENT_ROWS, TASK_ROWS, TASK_GROUP_ROWS, CALENDAR_ROWS)
+
+
+def sparse_fields(serializer: RowSerializer, arg: str = "fields",
+                  extra_columns: tuple = ()) -> RowSerializer:
+    """
+    Lee ?fields=a,b,c y devuelve el serializador reducido (o el completo si no viene).
+    `extra_columns`: columnas que la ruta necesita aunque no se pidan (ver subset()).
+    """
+    raw = request.args.get(arg)
+    if raw is None:
+        return serializer.subset(serializer.keys, extra_columns) if extra_columns else serializer
+    keys = {k.strip() for k in raw.split(",") if k.strip()}
+    unknown = keys - set(serializer.keys)
+    if unknown or not keys:
+        raise APIException(f"{arg} admite: {', '.join(serializer.keys)}", 400,
+                           payload={"unknown": sorted(unknown)})
+    return serializer.subset(keys, extra_columns)
+
+
+def include_arg(*allowed: str, default: tuple = ()) -> set:
+    """?include=tasks → {"tasks"}; ?include= (vacío) → set(); sin parámetro → default."""
+    raw = request.args.get("include")
+    if raw is None:
+        return set(default)
+    values = {v.strip() for v in raw.split(",") if v.strip() and v.strip() != "none"}
+    unknown = values - set(allowed)
+    if unknown:
+        raise APIException(f"include admite: {', '.join(allowed)}", 400,
+                           payload={"unknown": sorted(unknown)})
+    return values
+
+
+def groups_with_tasks(stmt, groups_rows: RowSerializer = TASK_GROUP_ROWS,
+                      tasks_rows: RowSerializer = TASK_ROWS, include_tasks: bool = True) -> list:
+    """
+    Equivalente a [g.serialize_with_tasks() for g in grupos] con dos consultas:
+    `stmt` es un select de groups_rows.columns ya filtrado y ordenado, que debe incluir
+    TaskGroup.id. Con include_tasks=False no se consultan las tareas ni se emite "tasks".
+    """
+    by_id = {}
+    for row in db.session.execute(stmt):
+        by_id[row.id] = groups_rows(row)
+    groups = list(by_id.values())
+    if not groups or not include_tasks:
+        return groups
+    for group in groups:
+        group["tasks"] = []
+    tasks = select(Task.task_group_id, *tasks_rows.columns) \
+        .where(Task.task_group_id.in_(list(by_id))).order_by(Task.id)
+    for row in db.session.execute(tasks):
+        by_id[row[0]]["tasks"].append(tasks_rows(row[1:]))
+    return groups
+
+
+def sparse_groups_args() -> tuple:
+    """
+    Parámetros comunes de los endpoints de grupos: ?fields= (del grupo), ?task_fields=
+    y ?include=tasks (por defecto; ?include= vacío no carga las tareas).
+    Devuelve (serializador de grupo, serializador de tarea, incluir tareas).
+    """
+    groups_rows = sparse_fields(TASK_GROUP_ROWS, extra_columns=("id",))
+    tasks_rows = sparse_fields(TASK_ROWS, "task_fields")
+    include_tasks = "tasks" in include_arg("tasks", default=("tasks",))
+    return groups_rows, tasks_rows, include_tasks
+
+
+def _verify_model(model, orm_serialize, fast_serialize, batch: int) -> tuple:
+    checked, mismatched = 0, []
+    last_id = 0
+    while True:
+        objects = model.query.filter(model.id > last_id).order_by(model.id).limit(batch).all()
+        if not objects:
+            break
+        ids = [obj.id for obj in objects]
+        fast = fast_serialize(ids)
+        for obj, item in zip(objects, fast):
+            expected = json.dumps(orm_serialize(obj), sort_keys=False, default=str)
+            if expected != json.dumps(item, sort_keys=False, default=str):
+                mismatched.append(obj.id)
+        mismatched += ids[len(fast):]
+        checked += len(objects)
+        last_id = ids[-1]
+        db.session.expunge_all()
+    return checked, mismatched
+
+
+def verify(batch: int = 1000) -> dict:
+    """
+    Serializa cada fila por los dos caminos (ORM + serialize() y filas + RowSerializer)
+    y compara el JSON resultante, sin ordenar claves. Incluye grupos con sus tareas.
+    Devuelve {nombre: (filas comprobadas, [ids distintos])}.
+    """
+    results = {}
+    for serializer in SERIALIZERS:
+        pk = serializer.model.id
+
+        def fast(ids, serializer=serializer, pk=pk):
+            rows = db.session.execute(serializer.select().where(pk.in_(ids)).order_by(pk))
+            return [serializer(row) for row in rows]
+
+        results[serializer.model.__tablename__] = _verify_model(
+            serializer.model, lambda obj: obj.serialize(), fast, batch)
+
+    results["task_group+tasks"] = _verify_model(
+        TaskGroup, lambda obj: obj.serialize_with_tasks(),
+        lambda ids: groups_with_tasks(
+            TASK_GROUP_ROWS.select().where(TaskGroup.id.in_(ids)).order_by(TaskGroup.id)),
+        batch)
+    return results
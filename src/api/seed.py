@@ -0,0 +1,221 @@
+"""
+Generador de datos sintéticos para pruebas de carga (`flask seed`).
+Crea usuarios con una distribución realista de calendarios, eventos (cortos en horario
+laboral, de día completo, de varios días y series semanales), grupos de tareas y tareas.
+
+Todo se inserta sin pasar por el ORM:
+- Postgres (psycopg2): COPY ... FROM STDIN en CSV
+- resto (SQLite...):    executemany por lotes
+Los ids se asignan aquí (a partir del máximo actual de cada tabla) para enlazar hijos con
+padres sin RETURNING; en Postgres se reajustan las secuencias al terminar.
+Con la misma semilla se generan exactamente los mismos datos.
+"""
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import func, select, text
+
+from .models import User, Calendar, Event, TaskGroup, Task
+from .recurrence import RecurrenceRule, series_end
+
+USER_CHUNK = 500
+DEFAULT_BATCH = 10000
+COLORS = ("#3498db", "#e74c3c", "#2ecc71", "#f1c40f", "#9b59b6", "#1abc9c", "#e67e22", "#34495e")
+CALENDAR_NAMES = ("Personal", "Trabajo", "Familia", "Deporte", "Estudios", "Viajes")
+GROUP_NAMES = ("Casa", "Trabajo", "Compras", "Proyectos", "Recados")
+EVENT_WORDS = ("Reunión", "Llamada", "Revisión", "Comida", "Clase", "Entreno", "Cita", "Demo")
+DURATIONS = (15, 30, 30, 45, 60, 60, 60, 90, 120, 180)
+# Las tablas se escriben en este orden para respetar las claves foráneas
+TABLES = (User, Calendar, TaskGroup, Event, Task)
+
+
+class BulkWriter:
+    """
+    Escribe filas (tuplas) en una tabla con COPY en Postgres o executemany en otro caso.
+    Sin COPY se asume un driver con paramstyle qmark (sqlite3) o format (psycopg2, pymysql).
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        driver = conn.dialect.driver
+        self.copy = conn.dialect.name == "postgresql" and driver == "psycopg2"
+
+    def write(self, model, columns: tuple, rows: list) -> None:
+        if not rows:
+            return
+        table = model.__table__
+        if self.copy:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(["\\N" if v is None else v for v in row])
+            buffer.seek(0)
+            cols = ", ".join(f'"{c}"' for c in columns)
+            cursor = self.conn.connection.dbapi_connection.cursor()
+            cursor.copy_expert(
+                f'COPY "{table.name}" ({cols}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')', buffer)
+            cursor.close()
+        else:
+            # executemany directo del driver con tuplas: evita construir un dict por fila.
+            # Se aplican los bind processors de cada tipo (p. ej. DateTime en SQLite).
+            dialect = self.conn.dialect
+            processors = [table.c[c].type.dialect_impl(dialect).bind_processor(dialect) for c in columns]
+            if any(processors):
+                rows = [tuple(p(v) if p else v for p, v in zip(processors, row)) for row in rows]
+            marks = ", ".join(["?" if dialect.paramstyle == "qmark" else "%s"] * len(columns))
+            cols = ", ".join(dialect.identifier_preparer.quote(c) for c in columns)
+            self.conn.exec_driver_sql(
+                f"INSERT INTO {dialect.identifier_preparer.quote(table.name)} ({cols}) VALUES ({marks})",
+                rows)
+
+    def reset_sequences(self) -> None:
+        if self.conn.dialect.name != "postgresql":
+            return
+        for model in TABLES:
+            name = model.__table__.name
+            self.conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('\"{name}\"', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM \"{name}\"), 1))"))
+
+
+class _Generator:
+    COLUMNS = {
+        User: ("id", "email", "password", "name", "display_name", "is_active", "signup_date",
+               "profile_pic", "rol", "last_session", "status", "sync_seq"),
+        Calendar: ("id", "user_id", "title", "color", "updated_at"),
+        TaskGroup: ("id", "user_id", "title", "color", "updated_at"),
+        Event: ("id", "user_id", "calendar_id", "title", "start_date", "end_date", "description",
+                "color", "all_day", "status", "recurrence_rule", "recurrence_exdates",
+                "recurrence_end", "updated_at"),
+        Task: ("id", "user_id", "task_group_id", "title", "status", "date", "recurrencia",
+               "color", "recurrence_rule", "recurrence_exdates", "updated_at"),
+    }
+
+    def __init__(self, rng: random.Random, next_ids: dict, password_hash: str,
+                 events_per_user: float, tasks_per_user: float, now: datetime):
+        self.rng = rng
+        self.next_ids = next_ids
+        self.password_hash = password_hash
+        self.events_per_user = events_per_user
+        self.tasks_per_user = tasks_per_user
+        self.now = now
+        self.rows = {model: [] for model in TABLES}
+
+    def _id(self, model) -> int:
+        value = self.next_ids[model]
+        self.next_ids[model] += 1
+        return value
+
+    def _count(self, mean: float) -> int:
+        """Cola larga: la mayoría de usuarios con pocos elementos y algunos con muchos."""
+        return int(self.rng.expovariate(1 / mean)) if mean > 0 else 0
+
+    def user(self, n: int) -> None:
+        rng, now = self.rng, self.now
+        user_id = self._id(User)
+        signup = now - timedelta(days=rng.randint(0, 3 * 365))
+        self.rows[User].append((
+            user_id, f"seed{user_id}@example.com", self.password_hash, f"Usuario {n}",
+            f"user{user_id}", True, signup, "", "user",
+            signup + timedelta(days=rng.randint(0, (now - signup).days or 1)), True, 0))
+
+        calendars = [self._calendar(user_id, name)
+                     for name in rng.sample(CALENDAR_NAMES, rng.choice((1, 1, 2, 2, 3, 4)))]
+        for _ in range(self._count(self.events_per_user)):
+            self._event(user_id, rng.choice(calendars))
+
+        groups = [self._group(user_id, name)
+                  for name in rng.sample(GROUP_NAMES, rng.choice((0, 1, 2, 2, 3)))]
+        for _ in range(self._count(self.tasks_per_user)):
+            self._task(user_id, groups)
+
+    def _calendar(self, user_id: int, name: str) -> int:
+        cal_id = self._id(Calendar)
+        self.rows[Calendar].append((cal_id, user_id, name, self.rng.choice(COLORS), self.now))
+        return cal_id
+
+    def _group(self, user_id: int, name: str) -> int:
+        group_id = self._id(TaskGroup)
+        self.rows[TaskGroup].append((group_id, user_id, name, self.rng.choice(COLORS), self.now))
+        return group_id
+
+    def _event(self, user_id: int, calendar_id: int) -> None:
+        rng = self.rng
+        day = (self.now - timedelta(days=365) + timedelta(days=rng.randint(0, 730))) \
+            .replace(hour=0, minute=0, second=0, microsecond=0)
+        kind = rng.random()
+        all_day, rule, rule_end = False, None, None
+        if kind < 0.10:     # día completo (a veces varios días)
+            all_day = True
+            start = day
+            end = day + timedelta(days=rng.choice((0, 0, 0, 1, 2)), hours=23, minutes=59, seconds=59)
+        elif kind < 0.13:   # largo: congresos, viajes
+            start = day + timedelta(hours=rng.randint(6, 20))
+            end = start + timedelta(days=rng.randint(2, 14))
+        else:               # normal, en horario laboral
+            start = day + timedelta(hours=rng.randint(8, 18), minutes=rng.choice((0, 15, 30, 45)))
+            end = start + timedelta(minutes=rng.choice(DURATIONS))
+            if kind < 0.16:  # serie semanal
+                parsed = RecurrenceRule.parse(f"FREQ=WEEKLY;COUNT={rng.randint(4, 20)}")
+                rule, rule_end = str(parsed), series_end(parsed, start, end - start)
+        self.rows[Event].append((
+            self._id(Event), user_id, calendar_id, f"{rng.choice(EVENT_WORDS)} {rng.randint(1, 999)}",
+            start, end, None, None, all_day, "confirmed", rule, None, rule_end, self.now))
+
+    def _task(self, user_id: int, groups: list) -> None:
+        rng = self.rng
+        group_id = rng.choice(groups) if groups and rng.random() < 0.7 else None
+        date = None
+        if rng.random() < 0.6:
+            date = (self.now + timedelta(days=rng.randint(-60, 60))) \
+                .replace(hour=rng.randint(8, 20), minute=0, second=0, microsecond=0)
+        self.rows[Task].append((
+            self._id(Task), user_id, group_id, f"Tarea {rng.randint(1, 9999)}",
+            rng.random() < 0.3, date, 0, rng.choice(COLORS), None, None, self.now))
+
+
+def _next_ids(conn) -> dict:
+    return {model: (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+            for model in TABLES}
+
+
+def seed_database(engine, users: int, events_per_user: float = 150, tasks_per_user: float = 25,
+                  password_hash: str = "", seed: int = 42, batch: int = DEFAULT_BATCH,
+                  now: Optional[datetime] = None,
+                  progress: Optional[Callable[[str], None]] = None) -> dict:
+    """
+    Inserta `users` usuarios con sus datos y devuelve el número de filas por tabla.
+    Cada bloque de USER_CHUNK usuarios va en su propia transacción.
+    """
+    rng = random.Random(seed)
+    now = (now or datetime.utcnow()).replace(microsecond=0)
+    totals = {model.__tablename__: 0 for model in TABLES}
+    started = time.monotonic()
+
+    with engine.begin() as conn:
+        next_ids = _next_ids(conn)
+
+    for chunk_start in range(0, users, USER_CHUNK):
+        gen = _Generator(rng, next_ids, password_hash, events_per_user, tasks_per_user, now)
+        for n in range(chunk_start, min(chunk_start + USER_CHUNK, users)):
+            gen.user(n + 1)
+        with engine.begin() as conn:
+            writer = BulkWriter(conn)
+            for model in TABLES:
+                rows = gen.rows[model]
+                for i in range(0, len(rows), batch):
+                    writer.write(model, _Generator.COLUMNS[model], rows[i:i + batch])
+                totals[model.__tablename__] += len(rows)
+        if progress:
+            elapsed = time.monotonic() - started
+            done = sum(totals.values())
+            progress(f"{min(chunk_start + USER_CHUNK, users)}/{users} usuarios, "
+                     f"{done} filas, {done / elapsed if elapsed else 0:.0f} filas/s")
+
+    with engine.begin() as conn:
+        BulkWriter(conn).reset_sequences()
+    return totals
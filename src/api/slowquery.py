@@ -0,0 +1,104 @@
+"""
+Registro de consultas lentas con su plan de ejecución.
+Con SLOW_QUERY_MS > 0 (app.config o entorno) cada sentencia que tarde más se escribe
+como una línea JSON en SLOW_QUERY_LOG (rotado por tamaño), con sus parámetros, el
+endpoint que la lanzó y, para los SELECT, el resultado de EXPLAIN (Postgres) o
+EXPLAIN QUERY PLAN (SQLite). Así un índice que falta aparece en cuanto llega la carga.
+"""
+import json
+import logging
+import os
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MAX_PARAM_CHARS = 2000
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+
+logger = logging.getLogger("api.slow_queries")
+
+
+def _setting(app, name: str, default):
+    return type(default)(app.config.get(name, os.environ.get(name, default)))
+
+
+def _explain(conn, cursor, statement: str, parameters) -> list:
+    """
+    Plan de la sentencia con un cursor DB-API aparte (no dispara eventos del engine).
+    En Postgres un error aborta la transacción entera, así que el EXPLAIN va dentro de
+    un SAVEPOINT (SQL directo: conn.begin_nested() volvería a pasar por los eventos del
+    engine y por el estado transaccional de la sesión, a mitad de una sentencia).
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect == "postgresql":
+        prefix = "EXPLAIN "
+    else:
+        return []
+    savepoint = dialect == "postgresql"
+    explain_cursor = cursor.connection.cursor()
+    try:
+        if savepoint:
+            explain_cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            explain_cursor.execute(prefix + statement, parameters)
+            plan = [str(row[-1]) for row in explain_cursor.fetchall()]
+        except Exception as e:   # el plan es informativo: nunca debe romper la petición
+            if savepoint:
+                explain_cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            plan = [f"EXPLAIN falló: {e}"]
+        if savepoint:
+            explain_cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    except Exception as e:
+        return [f"EXPLAIN falló: {e}"]
+    finally:
+        explain_cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+
+def setup_slow_query_log(app):
+    threshold_ms = _setting(app, "SLOW_QUERY_MS", 0.0)
+    if threshold_ms <= 0:
+        return
+    path = _setting(app, "SLOW_QUERY_LOG",
+                    os.path.join(tempfile.gettempdir(), "slow_queries.log"))
+    with_explain = str(_setting(app, "SLOW_QUERY_EXPLAIN", "1")).lower() in ("1", "true", "yes")
+
+    if not logger.handlers:
+        handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("slow_query_start")
+        if not started:
+            return
+        elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+        if elapsed_ms < threshold_ms:
+            return
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "duration_ms": round(elapsed_ms, 2),
+            "statement": " ".join(statement.split()),
+            "parameters": json.dumps(parameters, default=str)[:MAX_PARAM_CHARS],
+            "executemany": executemany,
+            "endpoint": f"{request.method} {request.path}" if has_request_context() else None,
+        }
+        if with_explain and not executemany and statement.lstrip()[:6].upper() == "SELECT":
+            entry["plan"] = _explain(conn, cursor, statement, parameters)
+        logger.info(json.dumps(entry, ensure_ascii=False))
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", after_cursor_execute)
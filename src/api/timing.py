@@ -0,0 +1,92 @@
+"""
+Cabecera Server-Timing (opcional) para ver desde las devtools del navegador en qué
+se va el tiempo de cada petición. Se activa con SERVER_TIMING=1 (app.config o entorno).
+Entradas:
+- auth       verificación del token y comprobación de usuario activo
+- db         tiempo en la base de datos (lo mide metrics.py con eventos del engine)
+- serialize  codificación JSON de la respuesta
+- app        el resto: lógica de la ruta y Model.serialize(). Las consultas hechas dentro
+             de un bloque timed() (p. ej. las de auth) están en su entrada y en db, así
+             que solo se descuentan una vez
+- total      desde before_request hasta after_request
+En respuestas en streaming solo se cuenta hasta que empieza el envío.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
+
+
+def timing_enabled(app=None) -> bool:
+    app = app or current_app
+    value = app.config.get("SERVER_TIMING", os.environ.get("SERVER_TIMING", ""))
+    return str(value).lower() in ("1", "true", "yes")
+
+
+def _timings():
+    return g.get("server_timing") if has_request_context() else None
+
+
+def add_timing(name: str, seconds: float) -> None:
+    timings = _timings()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def timed(name: str):
+    """Suma la duración del bloque a la entrada `name` (no hace nada si está desactivado)."""
+    if _timings() is None:
+        yield
+        return
+    started = time.perf_counter()
+    db_started = g.get("metrics_db_time", 0.0)
+    try:
+        yield
+    finally:
+        add_timing(name, time.perf_counter() - started)
+        g.server_timing_db_inside = g.get("server_timing_db_inside", 0.0) \
+            + g.get("metrics_db_time", 0.0) - db_started
+
+
+class TimingJSONProvider(DefaultJSONProvider):
+    """Proveedor JSON de Flask que mide la codificación de jsonify() como "serialize"."""
+
+    def dumps(self, obj, **kwargs):
+        with timed("serialize"):
+            return super().dumps(obj, **kwargs)
+
+
+def _header(timings: dict, statements: int) -> str:
+    entries = []
+    for name, seconds in timings.items():
+        entry = f"{name};dur={seconds * 1000:.2f}"
+        if name == "db":
+            entry += f';desc="{statements} queries"'
+        entries.append(entry)
+    return ", ".join(entries)
+
+
+def setup_timing(app):
+    if not timing_enabled(app):
+        return
+    app.json = TimingJSONProvider(app)
+
+    @app.before_request
+    def _start_server_timing():
+        g.server_timing = {}
+        g.server_timing_start = time.perf_counter()
+
+    @app.after_request
+    def _add_server_timing(response):
+        timings = g.get("server_timing")
+        if timings is None:
+            return response
+        total = time.perf_counter() - g.server_timing_start
+        db_time = g.get("metrics_db_time", 0.0)
+        rest = total - db_time - sum(timings.values()) + g.get("server_timing_db_inside", 0.0)
+        ordered = {**timings, "db": db_time, "app": max(rest, 0.0), "total": total}
+        response.headers["Server-Timing"] = _header(ordered, g.get("metrics_statements", 0))
+        return response
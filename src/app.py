@@ -2,16 +2,27 @@
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
 import os
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, jsonify, request
 from flask_migrate import Migrate
 from flask_swagger import swagger
 from flask_cors import CORS
 import api.routesConfig
+import api.routesBatch
+import api.routesFreeBusy
+import api.routesSync
+import api.routesIcal
+import api.routesBootstrap
+import api.changes
 from api.utils import APIException, generate_sitemap
 from api.models import db
 from api.routes import api
 from api.admin import setup_admin
 from api.commands import setup_commands
+from api.metrics import setup_metrics
+from api.timing import setup_timing
+from api.slowquery import setup_slow_query_log
+from api.compression import setup_compression
+from api.assets import AssetManifest
 from api.routesEvent import apiEvent
 from api.routesTasks import task
 from api.routesLateral import lateral
@@ -22,6 +33,8 @@ ENV = "development" if os.getenv("FLASK_DEBUG") == "1" else "production"
 # Static folder (for frontend build)
 static_file_dir = os.path.join(os.path.dirname(
     os.path.realpath(__file__)), '../dist/')
+# Manifiesto en memoria de dist/ (se construye una vez al arrancar)
+static_assets = AssetManifest(static_file_dir)
 app = Flask(__name__)
 app.url_map.strict_slashes = False
 
@@ -51,6 +64,16 @@ setup_admin(app)
 # Add CLI commands
 setup_commands(app)
 
+# Métricas por endpoint en /metrics
+setup_metrics(app)
+
+# Opcionales: cabecera Server-Timing (SERVER_TIMING=1) y log de consultas lentas (SLOW_QUERY_MS)
+setup_timing(app)
+setup_slow_query_log(app)
+
+# Compresión gzip/brotli de las respuestas de /api (después de métricas y timing para que midan lo enviado)
+setup_compression(app)
+
 # Register API blueprint
 app.register_blueprint(api, url_prefix='/api')
 app.register_blueprint(apiEvent, url_prefix='/api')
@@ -69,11 +92,7 @@ def handle_invalid_usage(error):
 
 @app.errorhandler(Exception)
 def handle_unexpected_error(err):
-    try:
-        import traceback
-        print("UNHANDLED ERROR:", traceback.format_exc())
-    except Exception:
-        pass
+    app.logger.exception("Unhandled error on %s %s", request.method, request.path)
     return jsonify({"message": "Internal Server Error", "detail": str(err)}), 500
 
 # Generate sitemap with all your endpoints
@@ -83,18 +102,14 @@ def handle_unexpected_error(err):
 def sitemap():
     if ENV == "development":
         return generate_sitemap(app)
-    return send_from_directory(static_file_dir, 'index.html')
+    return static_assets.response('index.html')
 
-# Any other endpoint will try to serve it like a static file
+# Any other endpoint will try to serve it like a static file (SPA: index.html if missing)
 
 
 @app.route('/<path:path>', methods=['GET'])
 def serve_any_other_file(path):
-    if not os.path.isfile(os.path.join(static_file_dir, path)):
-        path = 'index.html'
-    response = send_from_directory(static_file_dir, path)
-    response.cache_control.max_age = 0  # avoid cache memory
-    return response
+    return static_assets.response(path)
 
 
 # @app.route('/assets/<path:filename>')